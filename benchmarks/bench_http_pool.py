@@ -0,0 +1,141 @@
+"""
+Connection reuse benchmark for the trust API probe client.
+
+Starts a local keep-alive HTTP stub serving the probed artifacts, then runs
+the same number of domain evaluations three ways:
+
+  per-fetch   a new client for every fetch (the original sync probes)
+  per-eval    one client per evaluation (no process-wide pool)
+  pooled      one shared pooled client (what the API lifespan owns)
+
+The stub counts accepted TCP connections, i.e. handshakes. Over HTTPS every
+one of those would additionally cost a TLS handshake.
+
+Usage:
+  python benchmarks/bench_http_pool.py [--evals 50]
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httpx
+
+from trust_api.pool import PoolConfig
+from trust_api.probes import run_probes
+
+
+class _Stub(ThreadingHTTPServer):
+    daemon_threads = True
+    connections = 0
+
+    def get_request(self):
+        conn = super().get_request()
+        with _lock:
+            _Stub.connections += 1
+        return conn
+
+
+_lock = threading.Lock()
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def _reply(self, body: bool) -> None:
+        data = b"{}" if not self.path.startswith("/dumps/") else b""
+        status = 200 if data else 404
+        self.send_response(status)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        if body:
+            self.wfile.write(data)
+
+    def do_HEAD(self):
+        self._reply(body=False)
+
+    def do_GET(self):
+        self._reply(body=True)
+
+    def log_message(self, *args):
+        pass
+
+
+class _ToStub(httpx.AsyncBaseTransport):
+    """Route https://<domain>/... to the local stub, keeping the inner pool."""
+
+    def __init__(self, inner: httpx.AsyncBaseTransport, port: int):
+        self.inner = inner
+        self.port = port
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        request.url = request.url.copy_with(scheme="http", host="127.0.0.1", port=self.port)
+        return await self.inner.handle_async_request(request)
+
+    async def aclose(self) -> None:
+        await self.inner.aclose()
+
+
+def _client(port: int, config: PoolConfig) -> httpx.AsyncClient:
+    inner = httpx.AsyncHTTPTransport(limits=config.limits())
+    return httpx.AsyncClient(transport=_ToStub(inner, port), follow_redirects=True)
+
+
+async def _per_fetch(port: int, evals: int, config: PoolConfig) -> None:
+    # Emulate one client per fetch by limiting each client to a single request.
+    class _OneShot(httpx.AsyncBaseTransport):
+        async def handle_async_request(self, request):
+            async with _client(port, config) as c:
+                r = await c.send(httpx.Request(request.method, request.url, headers=request.headers))
+                await r.aread()
+                return httpx.Response(r.status_code, headers=r.headers, content=r.content)
+
+    async with httpx.AsyncClient(transport=_OneShot()) as c:
+        for i in range(evals):
+            await run_probes("bench.test", c)
+
+
+async def _per_eval(port: int, evals: int, config: PoolConfig) -> None:
+    for i in range(evals):
+        async with _client(port, config) as c:
+            await run_probes("bench.test", c)
+
+
+async def _pooled(port: int, evals: int, config: PoolConfig) -> None:
+    async with _client(port, config) as c:
+        for i in range(evals):
+            await run_probes("bench.test", c)
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--evals", type=int, default=50)
+    args = ap.parse_args()
+
+    server = _Stub(("127.0.0.1", 0), _Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    port = server.server_address[1]
+    config = PoolConfig(http2=False)
+
+    rows = []
+    for name, fn in (("per-fetch", _per_fetch), ("per-eval", _per_eval), ("pooled", _pooled)):
+        before = _Stub.connections
+        t0 = time.perf_counter()
+        asyncio.run(fn(port, args.evals, config))
+        dt = time.perf_counter() - t0
+        rows.append((name, _Stub.connections - before, dt))
+
+    server.shutdown()
+
+    baseline = rows[0][1] / args.evals
+    print(f"{'mode':<10} {'conns':>7} {'conns/eval':>11} {'saved/eval':>11} {'ms/eval':>8}")
+    for name, conns, dt in rows:
+        per = conns / args.evals
+        print(f"{name:<10} {conns:>7} {per:>11.2f} {baseline - per:>11.2f} {1000 * dt / args.evals:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""
+Minisign verification micro-benchmark.
+
+Verifies the repository's signed v2 inventory repeatedly with:
+
+  native      tfws2.minisign with the best installed Ed25519 backend
+  python      tfws2.minisign forced onto the pure-Python fallback
+  cli         the minisign binary (skipped when not in PATH)
+
+Usage:
+  python benchmarks/bench_minisign.py [--n 200]
+"""
+from __future__ import annotations
+
+import argparse
+import shutil
+import time
+from pathlib import Path
+
+from tfws2 import _ed25519, minisign
+from tfws2.minisign_verify import verify_minisign_detached
+
+ROOT = Path(__file__).resolve().parents[1]
+PUB = ROOT / "v2" / "keys" / "minisign.pub"
+MSG = ROOT / "v2" / "inventory.sha256"
+SIG = ROOT / "v2" / "inventory.sha256.minisig"
+
+
+def _time(fn, n: int) -> float:
+    fn()
+    t0 = time.perf_counter()
+    for _ in range(n):
+        ok, info = fn()
+        assert ok, info
+    return (time.perf_counter() - t0) / n
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--n", type=int, default=200)
+    args = ap.parse_args()
+
+    pk = minisign.parse_public_key(PUB.read_bytes())
+    sig = minisign.parse_signature(SIG.read_bytes())
+    msg = MSG.read_bytes()
+
+    rows = [
+        (f"native ({minisign.BACKEND}, bytes)", lambda: minisign.verify(pk, msg, sig)),
+        (f"native ({minisign.BACKEND}, files)", lambda: verify_minisign_detached(str(PUB), str(MSG), str(SIG))),
+    ]
+
+    def pure():
+        saved = minisign._ed25519_verify
+        minisign._ed25519_verify = _ed25519.verify
+        try:
+            return minisign.verify(pk, msg, sig)
+        finally:
+            minisign._ed25519_verify = saved
+
+    rows.append(("python (bytes)", pure))
+    if shutil.which("minisign"):
+        rows.append(("cli (subprocess)", lambda: verify_minisign_detached(str(PUB), str(MSG), str(SIG), backend="cli")))
+
+    print(f"{'mode':<32} {'us/verify':>10} {'verify/s':>10}")
+    for name, fn in rows:
+        n = args.n if not name.startswith(("python", "cli")) else max(1, args.n // 10)
+        dt = _time(fn, n)
+        print(f"{name:<32} {dt * 1e6:>10.1f} {1 / dt:>10.0f}")
+    if not shutil.which("minisign"):
+        print("(minisign binary not in PATH; cli row skipped)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+Agent policy decision benchmark.
+
+Decides a synthetic batch of trust-states against the default playground
+policy with:
+
+  interpreted  the policy dict re-read per decision (old playground behaviour)
+  compiled     CompiledPolicy.decide_batch (action names)
+  columnar     CompiledPolicy.decide_columns over pre-encoded NumPy columns
+               (skipped when NumPy is not installed)
+
+Usage:
+  python benchmarks/bench_policy.py [--n 200000]
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import time
+from pathlib import Path
+
+from tfws2.policy import compile_policy
+
+ROOT = Path(__file__).resolve().parents[1]
+POLICY = ROOT / "playground" / "policies" / "default-policy.json"
+
+CODES = ["well_known_present", "signature_fail", "inventory_tamper", "rollback_suspected",
+         "missing_signatures", "well_known_missing", "incidents_open", "key_epoch_invalid"]
+RESULTS = ["pass", "pass", "pass", "fail", "warn", "unknown"]
+
+
+def _states(n: int):
+    rng = random.Random(1)
+    return [
+        {
+            "score": {"grade": rng.choice("AABBCDF"), "confidence": rng.random()},
+            "signals": [{"code": c, "result": rng.choice(RESULTS)} for c in rng.sample(CODES, 6)],
+        }
+        for _ in range(n)
+    ]
+
+
+def _interpreted(ts, policy):
+    # the pre-compiler loop: prefix scan of observed codes per policy entry
+    codes = [f"{s['code']}:{s['result']}" for s in ts["signals"]]
+    for name in ("block_on", "quarantine_on", "warn_on"):
+        for c in policy.get(name, []):
+            for o in codes:
+                if o.startswith(c + ":") and not o.endswith(":pass"):
+                    return name
+    return "allow"
+
+
+def _rate(label: str, n: int, fn) -> None:
+    t0 = time.perf_counter()
+    fn()
+    dt = time.perf_counter() - t0
+    print(f"{label:<28} {dt * 1e9 / n:>10.0f} {n / dt:>14,.0f}")
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--n", type=int, default=200_000)
+    args = ap.parse_args()
+
+    policy = json.loads(POLICY.read_text(encoding="utf-8"))
+    compiled = compile_policy(policy)
+    states = _states(args.n)
+
+    print(f"{'mode':<28} {'ns/decision':>10} {'decisions/s':>14}")
+    _rate("interpreted", args.n, lambda: [_interpreted(ts, policy) for ts in states])
+    _rate("compiled", args.n, lambda: compiled.decide_batch(states))
+    try:
+        import numpy  # noqa: F401
+    except ImportError:
+        print("(numpy not installed; columnar rows skipped)")
+        return
+    columns = compiled.encode(states)
+    _rate("columnar encode", args.n, lambda: compiled.encode(states))
+    _rate("columnar decide", args.n, lambda: compiled.decide_columns(*columns))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,274 @@
+"""
+Synthetic fixtures for the benchmark suite.
+
+Everything is generated from a seed, so two runs with the same sizes
+measure the same work: file trees, inventories, key histories,
+trust-states, a minisign keypair with signatures, and a local HTTP stub
+serving a TFWS site with configurable latency. Nothing touches the
+network.
+"""
+from __future__ import annotations
+
+import base64
+import hashlib
+import json
+import multiprocessing
+import os
+import random
+import time
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from tfws2.inventory import InventoryWriter
+
+KEY_ID = b"\x42\x45\x4e\x43\x48\x30\x30\x31"
+EPOCH0 = datetime(2024, 1, 1, tzinfo=timezone.utc)
+FIXED_MTIME = 1_700_000_000
+
+
+def _z(t: datetime) -> str:
+    return t.strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def make_tree(root: Path, files: int, seed: int = 1, per_dir: int = 200, size: int = 512) -> Path:
+    """
+    `files` small files, `per_dir` per directory, all with one fixed mtime
+    (outside hashwalk's racy window, so incremental runs can use the cache).
+    Reused when already complete.
+    """
+    marker = root / ".complete"
+    if marker.exists():
+        return root
+    rng = random.Random(seed)
+    for i in range(files):
+        d = root / f"d{i // per_dir:05d}"
+        if i % per_dir == 0:
+            d.mkdir(parents=True, exist_ok=True)
+        f = d / f"f{i:07d}.txt"
+        f.write_bytes(rng.randbytes(rng.randint(size // 2, size)))
+        os.utime(f, (FIXED_MTIME, FIXED_MTIME))
+    marker.write_text(str(files))
+    return root
+
+
+def make_inventories(workdir: Path, entries: int, seed: int = 1) -> Tuple[str, str]:
+    """
+    (current, candidate) json inventories of `entries` paths. The candidate
+    changes 1% of hashes, drops 0.5% of paths and adds as many new ones.
+    """
+    cur = workdir / f"inv-{entries}-cur.json"
+    cand = workdir / f"inv-{entries}-cand.json"
+    if cur.exists() and cand.exists():
+        return str(cur), str(cand)
+    rng = random.Random(seed)
+    paths = [f"site/p{i // 1000:04d}/page{i:07d}.html" for i in range(entries)]
+    digests = [hashlib.sha256(p.encode()).hexdigest() for p in paths]
+    dropped = set(rng.sample(range(entries), entries // 200))
+    changed = set(rng.sample(range(entries), entries // 100))
+    with InventoryWriter(str(cur), count=entries) as w:
+        for p, h in zip(paths, digests):
+            w.write(p, h)
+    added = sorted(f"site/new/page{i:07d}.html" for i in range(len(dropped)))
+    rows = [(p, hashlib.sha256(h.encode()).hexdigest() if i in changed else h)
+            for i, (p, h) in enumerate(zip(paths, digests)) if i not in dropped]
+    rows += [(p, hashlib.sha256(p.encode()).hexdigest()) for p in added]
+    rows.sort()
+    with InventoryWriter(str(cand), count=len(rows)) as w:
+        for p, h in rows:
+            w.write(p, h)
+    return str(cur), str(cand)
+
+
+def make_key_history(path: Path, kids: int, epochs: int = 3, seed: int = 1) -> List[Tuple[str, str]]:
+    """
+    key-history.json with `kids` key ids of `epochs` yearly epochs each
+    (every 50th kid revoked). Returns the (kid, time) pairs worth querying.
+    """
+    rng = random.Random(seed)
+    keys = []
+    for k in range(kids):
+        kid = f"K{k:06d}"
+        for e in range(epochs):
+            start = EPOCH0 + timedelta(days=365 * e + rng.randint(0, 30))
+            entry = {"kid": kid, "pubkey_path": f"/keys/{kid}.pub", "not_before": _z(start), "status": "active"}
+            if e < epochs - 1:
+                entry["not_after"] = _z(start + timedelta(days=330))
+                entry["status"] = "retired"
+            elif k % 50 == 0:
+                entry["status"] = "revoked"
+            keys.append(entry)
+    path.write_text(json.dumps({"schema_version": "2.0", "keys": keys}), encoding="utf-8")
+    span = 365 * epochs * 86400
+    return [
+        (f"K{rng.randrange(kids + kids // 20):06d}", _z(EPOCH0 + timedelta(seconds=rng.randrange(span))))
+        for _ in range(10_000)
+    ]
+
+
+CODES = ["well_known_present", "signature_fail", "inventory_tamper", "rollback_suspected",
+         "missing_signatures", "well_known_missing", "incidents_open", "key_epoch_invalid"]
+RESULTS = ["pass", "pass", "pass", "fail", "warn", "unknown"]
+
+
+def make_trust_states(n: int, seed: int = 1) -> List[Dict]:
+    rng = random.Random(seed)
+    return [
+        {
+            "subject": {"type": "domain", "id": f"site{i}.bench.test"},
+            "score": {"grade": rng.choice("AABBCDF"), "confidence": rng.random()},
+            "signals": [{"code": c, "result": rng.choice(RESULTS)} for c in rng.sample(CODES, 6)],
+        }
+        for i in range(n)
+    ]
+
+
+class Signer:
+    """A generated minisign keypair (needs the `cryptography` package)."""
+
+    def __init__(self):
+        try:
+            from cryptography.hazmat.primitives.asymmetric.ed25519 import Ed25519PrivateKey
+        except ImportError:
+            raise SystemExit("signature fixtures require cryptography (pip install 'tfws2[fast]')")
+        self._sk = Ed25519PrivateKey.generate()
+        raw = self._sk.public_key().public_bytes_raw()
+        self.public_key = b"untrusted comment: bench key\n" + base64.b64encode(b"Ed" + KEY_ID + raw) + b"\n"
+
+    def sign(self, message: bytes, prehashed: bool = True) -> bytes:
+        alg = b"ED" if prehashed else b"Ed"
+        sig = self._sk.sign(hashlib.blake2b(message).digest() if prehashed else message)
+        trusted = f"timestamp:{int(time.time())}\tfile:bench".encode()
+        glob = self._sk.sign(sig + trusted)
+        return (b"untrusted comment: bench signature\n" + base64.b64encode(alg + KEY_ID + sig) + b"\n"
+                + b"trusted comment: " + trusted + b"\n" + base64.b64encode(glob) + b"\n")
+
+
+def make_signed_file(workdir: Path, signer: Signer, size: int, seed: int = 1) -> Tuple[str, str, str]:
+    """(pubkey, message, signature) paths for a `size`-byte message, prehashed."""
+    pub, msg, sig = workdir / "bench.pub", workdir / f"msg-{size}.bin", workdir / f"msg-{size}.bin.minisig"
+    data = random.Random(seed).randbytes(size)
+    pub.write_bytes(signer.public_key)
+    msg.write_bytes(data)
+    sig.write_bytes(signer.sign(data))
+    return str(pub), str(msg), str(sig)
+
+
+def site_files(signer: Signer, inventory_entries: int = 1000) -> Dict[str, bytes]:
+    """The artifacts the trust API probes, for a fully signed site."""
+    inv = json.dumps({
+        "schema_version": "2.0", "root": ".", "algo": "sha256", "count": inventory_entries,
+        "files": [{"path": f"p{i}.html", "sha256": hashlib.sha256(str(i).encode()).hexdigest()}
+                  for i in range(inventory_entries)],
+    }, indent=2).encode()
+    return {
+        "/.well-known/ai-trust-hub.json": b'{"schema_version": "2.0"}',
+        "/.well-known/minisign.pub": signer.public_key,
+        "/.well-known/key-history.json": b'{"schema_version": "2.0", "keys": []}',
+        "/dumps/sha256.json": inv,
+        "/dumps/sha256.json.minisig": signer.sign(inv),
+    }
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True  # headers and body are separate writes
+    files: Dict[str, bytes] = {}
+    latency = 0.0
+
+    def _reply(self, body: bool) -> None:
+        if self.latency:
+            time.sleep(self.latency)
+        data = self.files.get(self.path.split("?", 1)[0])
+        self.send_response(200 if data is not None else 404)
+        self.send_header("Content-Length", str(len(data or b"")))
+        self.end_headers()
+        if body and data:
+            self.wfile.write(data)
+
+    def do_HEAD(self):
+        self._reply(body=False)
+
+    def do_GET(self):
+        self._reply(body=True)
+
+    def log_message(self, *args):
+        pass
+
+
+class _StubHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 1024
+
+
+def _serve(files: Dict[str, bytes], latency: float, conn) -> None:
+    _StubHandler.files = files
+    _StubHandler.latency = latency
+    server = _StubHTTPServer(("127.0.0.1", 0), _StubHandler)
+    conn.send(server.server_address[1])
+    conn.close()
+    server.serve_forever()
+
+
+class StubServer:
+    """
+    Keep-alive HTTP/1.1 server on 127.0.0.1 answering every host with the
+    same site, after `latency` seconds per request.
+
+    It runs in a child process: in-process server threads would compete
+    with the client's event loop for the GIL and skew every number.
+    """
+
+    def __init__(self, files: Dict[str, bytes], latency: float = 0.0):
+        self.files = dict(files)
+        self.latency = latency
+        self.port = 0
+        self._proc: Optional[multiprocessing.Process] = None
+
+    def start(self) -> "StubServer":
+        parent, child = multiprocessing.Pipe(duplex=False)
+        self._proc = multiprocessing.Process(target=_serve, args=(self.files, self.latency, child), daemon=True)
+        self._proc.start()
+        child.close()
+        self.port = parent.recv()
+        parent.close()
+        return self
+
+    def stop(self) -> None:
+        if self._proc is not None:
+            self._proc.terminate()
+            self._proc.join()
+            self._proc = None
+
+    def __enter__(self) -> "StubServer":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+
+def routed_client(port: int, limits=None):
+    """
+    httpx.AsyncClient sending every https://<domain>/... request to the stub.
+    Pass the service's httpx.Limits: httpcore's pool bookkeeping grows with
+    the number of idle connections and would otherwise dominate the timing.
+    """
+    import httpx
+
+    class ToStub(httpx.AsyncBaseTransport):
+        def __init__(self):
+            self.inner = httpx.AsyncHTTPTransport(limits=limits or httpx.Limits())
+
+        async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+            request.url = request.url.copy_with(scheme="http", host="127.0.0.1", port=port)
+            return await self.inner.handle_async_request(request)
+
+        async def aclose(self) -> None:
+            await self.inner.aclose()
+
+    return httpx.AsyncClient(transport=ToStub(), follow_redirects=True)
+
+
+def cpu_count() -> int:
+    return len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else (os.cpu_count() or 1)
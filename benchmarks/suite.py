@@ -0,0 +1,287 @@
+"""
+Benchmark suite with saved baselines.
+
+Times the hot paths of the toolchain and the API on synthetic fixtures
+(benchmarks/fixtures.py), so results do not depend on the network or on
+the repository's own artifacts:
+
+  hashwalk            inventory of a generated tree (--files files)
+  hashwalk_warm       the same with a warm incremental cache
+  simulate_rollback   diff of two inventories of --entries paths
+  minisign_verify     verify_minisign_detached of a 4 MiB prehashed file
+  key_epoch_batch     KeyHistoryIndex.check_many over 10k (kid, time) pairs
+  key_epoch_call      check_key_epoch() one pair at a time
+  decide              CompiledPolicy.decide_batch over --entries trust-states
+  api_domain_miss     GET /api/v1/trust/domain/{domain}, probes against a
+                      local stub with --latency ms per artifact, through a
+                      pool with the service's PoolConfig limits
+  api_domain_hit      the same for a cached domain
+
+Each case runs once to warm up, then --repeat times; the best time counts.
+--save writes the results as a baseline; --compare checks them against
+one and exits 1 when any case got slower than --threshold (a fraction).
+Without a file name both use benchmarks/baselines/<machine tag>.json, the
+reference baseline committed for this OS, CPU architecture, usable CPU
+count and Python. A baseline with a different tag is not compared against.
+
+Usage:
+  python benchmarks/suite.py [--entries 100000] [--files 10000] [--save [base.json]]
+  python benchmarks/suite.py --compare [base.json] [--threshold 0.2] [--only decide api]
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import platform
+import shutil
+import sys
+import tempfile
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+import fixtures as fx
+
+ROOT = Path(__file__).resolve().parents[1]
+BASELINES = Path(__file__).resolve().parent / "baselines"
+POLICY = ROOT / "playground" / "policies" / "default-policy.json"
+
+Setup = Callable[["Context"], Tuple[int, Callable[[], None]]]
+CASES: Dict[str, Setup] = {}
+
+
+def case(name: str):
+    def register(fn: Setup) -> Setup:
+        CASES[name] = fn
+        return fn
+    return register
+
+
+@dataclass
+class Context:
+    workdir: Path
+    entries: int
+    files: int
+    latency: float
+    jobs: int
+    _signer: Optional[fx.Signer] = None
+
+    @property
+    def signer(self) -> fx.Signer:
+        if self._signer is None:
+            self._signer = fx.Signer()
+        return self._signer
+
+
+# -- cases -----------------------------------------------------------------
+
+@case("hashwalk")
+def _hashwalk(ctx: Context):
+    from tfws2.hashwalk import hashwalk
+
+    tree = fx.make_tree(ctx.workdir / f"tree-{ctx.files}", ctx.files)
+    out = str(ctx.workdir / "hashwalk.json")
+    return ctx.files, lambda: hashwalk(str(tree), out, jobs=ctx.jobs)
+
+
+@case("hashwalk_warm")
+def _hashwalk_warm(ctx: Context):
+    from tfws2.hashwalk import hashwalk
+
+    tree = fx.make_tree(ctx.workdir / f"tree-{ctx.files}", ctx.files)
+    out, cache = str(ctx.workdir / "hashwalk-warm.json"), str(ctx.workdir / f"hashwalk-{ctx.files}.db")
+    hashwalk(str(tree), out, jobs=ctx.jobs, cache_path=cache)
+    return ctx.files, lambda: hashwalk(str(tree), out, jobs=ctx.jobs, cache_path=cache)
+
+
+@case("simulate_rollback")
+def _rollback(ctx: Context):
+    from tfws2.sim.rollback import simulate_rollback
+
+    cur, cand = fx.make_inventories(ctx.workdir, ctx.entries)
+    return ctx.entries, lambda: simulate_rollback(cur, cand)
+
+
+@case("minisign_verify")
+def _minisign(ctx: Context):
+    from tfws2.minisign_verify import verify_minisign_detached
+
+    pub, msg, sig = fx.make_signed_file(ctx.workdir, ctx.signer, 4 * 1024 * 1024)
+
+    def run() -> None:
+        ok, info = verify_minisign_detached(pub, msg, sig)
+        assert ok, info
+
+    return 1, run
+
+
+@case("key_epoch_batch")
+def _key_epoch_batch(ctx: Context):
+    from tfws2.key_epoch import KeyHistoryIndex
+
+    pairs = fx.make_key_history(ctx.workdir / "key-history.json", kids=max(1, ctx.entries // 100))
+    index = KeyHistoryIndex(ctx.workdir / "key-history.json")
+    return len(pairs), lambda: index.check_many(pairs)
+
+
+@case("key_epoch_call")
+def _key_epoch_call(ctx: Context):
+    from tfws2.key_epoch import check_key_epoch
+
+    path = ctx.workdir / "key-history-call.json"
+    pairs = fx.make_key_history(path, kids=max(1, ctx.entries // 100))
+
+    def run() -> None:
+        for kid, at in pairs:
+            check_key_epoch(str(path), kid, at)
+
+    return len(pairs), run
+
+
+@case("decide")
+def _decide(ctx: Context):
+    from tfws2.policy import load_policy
+
+    policy = load_policy(POLICY)
+    states = fx.make_trust_states(ctx.entries)
+    return len(states), lambda: policy.decide_batch(states)
+
+
+def _api_case(ctx: Context, hit: bool, requests: int, concurrency: int = 32):
+    import httpx
+    from trust_api.app import app
+    from trust_api.pool import PoolConfig
+
+    stub = fx.StubServer(fx.site_files(ctx.signer), latency=ctx.latency).start()
+    rounds = [0]
+
+    async def run() -> None:
+        rounds[0] += 1
+        async with app.router.lifespan_context(app):
+            pooled, app.state.http = app.state.http, fx.routed_client(stub.port, PoolConfig.from_env().limits())
+            transport = httpx.ASGITransport(app=app)
+            sem = asyncio.Semaphore(concurrency)
+            try:
+                async with httpx.AsyncClient(transport=transport, base_url="http://bench") as c:
+                    if hit:
+                        (await c.get("/api/v1/trust/domain/hot.bench.test")).raise_for_status()
+
+                    async def one(i: int) -> None:
+                        domain = "hot.bench.test" if hit else f"d{i}.r{rounds[0]}.bench.test"
+                        async with sem:
+                            r = await c.get(f"/api/v1/trust/domain/{domain}")
+                        r.raise_for_status()
+
+                    await asyncio.gather(*(one(i) for i in range(requests)))
+            finally:
+                await app.state.http.aclose()
+                app.state.http = pooled
+
+    return requests, lambda: asyncio.run(run())
+
+
+@case("api_domain_miss")
+def _api_miss(ctx: Context):
+    return _api_case(ctx, hit=False, requests=100)
+
+
+@case("api_domain_hit")
+def _api_hit(ctx: Context):
+    return _api_case(ctx, hit=True, requests=2000)
+
+
+# -- runner ----------------------------------------------------------------
+
+def run_case(name: str, ctx: Context, repeat: int) -> Dict[str, float]:
+    ops, fn = CASES[name](ctx)
+    fn()
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return {"ops": ops, "seconds": best, "us_per_op": 1e6 * best / ops, "ops_per_sec": ops / best}
+
+
+def compare(results: Dict[str, Dict[str, float]], baseline: Dict[str, Dict[str, float]], threshold: float) -> List[str]:
+    """Names of cases more than `threshold` slower per op than the baseline."""
+    slower = []
+    for name, r in results.items():
+        base = baseline.get(name)
+        if base and r["us_per_op"] > base["us_per_op"] * (1 + threshold):
+            slower.append(name)
+    return slower
+
+
+def machine_tag() -> str:
+    major, minor, _ = platform.python_version_tuple()
+    return f"{platform.system().lower()}-{platform.machine().lower()}-py{major}{minor}-{fx.cpu_count()}cpu"
+
+
+def load_baseline(path: str) -> Dict[str, Dict[str, float]]:
+    """A baseline's results; exits when it was taken on another kind of machine."""
+    data = json.loads(Path(path).read_text(encoding="utf-8"))
+    tag = data.get("meta", {}).get("tag")
+    if tag != machine_tag():
+        sys.exit(f"{path} was recorded on {tag}, this machine is {machine_tag()}; "
+                 f"save a baseline here with --save and compare against that")
+    return data["results"]
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--entries", type=int, default=100_000, help="inventory paths, trust-states (10k to 1M)")
+    ap.add_argument("--files", type=int, default=10_000, help="files in the hashwalk tree")
+    ap.add_argument("--latency", type=float, default=5.0, help="stub server latency per request, ms")
+    ap.add_argument("--jobs", type=int, default=fx.cpu_count(), help="hashwalk worker threads")
+    ap.add_argument("--repeat", type=int, default=3)
+    ap.add_argument("--only", nargs="*", default=None, help="case name prefixes to run")
+    ap.add_argument("--workdir", default=None, help="keep generated fixtures here between runs")
+    default_baseline = str(BASELINES / f"{machine_tag()}.json")
+    ap.add_argument("--save", nargs="?", const=default_baseline, default=None,
+                    help=f"write results to this baseline file (default {default_baseline})")
+    ap.add_argument("--compare", nargs="?", const=default_baseline, default=None,
+                    help=f"baseline file to check results against (default {default_baseline})")
+    ap.add_argument("--threshold", type=float, default=0.2, help="allowed slowdown per op vs. the baseline")
+    args = ap.parse_args()
+
+    names = [n for n in CASES if not args.only or any(n.startswith(p) for p in args.only)]
+    baseline = load_baseline(args.compare) if args.compare else {}
+
+    workdir = Path(args.workdir) if args.workdir else Path(tempfile.mkdtemp(prefix="tfws2-bench-"))
+    workdir.mkdir(parents=True, exist_ok=True)
+    ctx = Context(workdir, args.entries, args.files, args.latency / 1000, args.jobs)
+
+    results: Dict[str, Dict[str, float]] = {}
+    print(f"{'case':<20} {'ops':>8} {'best s':>9} {'us/op':>10} {'ops/s':>12} {'vs base':>8}")
+    try:
+        for name in names:
+            try:
+                r = results[name] = run_case(name, ctx, args.repeat)
+            except ImportError as e:
+                print(f"{name:<20} skipped ({e})")
+                continue
+            base = baseline.get(name)
+            delta = f"{r['us_per_op'] / base['us_per_op'] - 1:+.1%}" if base else ""
+            print(f"{name:<20} {r['ops']:>8} {r['seconds']:>9.4f} {r['us_per_op']:>10.2f} {r['ops_per_sec']:>12.0f} {delta:>8}")
+    finally:
+        if not args.workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    if args.save:
+        meta = {"tag": machine_tag(), "python": platform.python_version(), "machine": platform.machine(),
+                "cpus": fx.cpu_count(), "entries": args.entries, "files": args.files, "latency_ms": args.latency,
+                "jobs": args.jobs}
+        Path(args.save).parent.mkdir(parents=True, exist_ok=True)
+        Path(args.save).write_text(json.dumps({"meta": meta, "results": results}, indent=2) + "\n", encoding="utf-8")
+
+    slower = compare(results, baseline, args.threshold)
+    if slower:
+        print(f"REGRESSION (> {args.threshold:.0%} slower than {args.compare}): " + ", ".join(slower))
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,40 @@
+import asyncio
+
+import httpx
+import pytest
+
+from trust_api.app import app
+
+
+@pytest.fixture
+def with_mock_client():
+    """run(handler, use): await use(client) on a client whose requests `handler` answers."""
+
+    def run(handler, use):
+        async def main():
+            async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+                return await use(client)
+
+        return asyncio.run(main())
+
+    return run
+
+
+@pytest.fixture
+def with_api():
+    """run(handler, use): await use(api) inside the app's lifespan, with probes answered by `handler`."""
+
+    def run(handler, use):
+        async def main():
+            async with app.router.lifespan_context(app):
+                app.state.http = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+                try:
+                    transport = httpx.ASGITransport(app=app)
+                    async with httpx.AsyncClient(transport=transport, base_url="http://test") as api:
+                        return await use(api)
+                finally:
+                    await app.state.http.aclose()
+
+        return asyncio.run(main())
+
+    return run
@@ -1,14 +1,87 @@
+import asyncio
 import json
+import time
 from pathlib import Path
+
+import httpx
 from jsonschema import Draft202012Validator
 
-from trust_api.app import build_trust_state_for_domain
+from trust_api import probes
+from trust_api.app import (
+    _construction_errors,
+    _schema_errors,
+    build_trust_state_for_domain_async,
+    score_from_signals,
+)
+from trust_api.probes import SIGNALS, run_probes
 
 ROOT = Path(__file__).resolve().parents[3]
 SCHEMA = json.loads((ROOT / "schemas" / "trust-state.schema.json").read_text(encoding="utf-8"))
 
-def test_generated_trust_state_is_schema_valid():
-    payload = build_trust_state_for_domain("example.com")
+def test_generated_trust_state_is_schema_valid(with_mock_client):
+    def handler(request):
+        # well-known files present, no signed inventory
+        return httpx.Response(200, content=b"{}") if request.url.path.startswith("/.well-known/") else httpx.Response(404)
+
+    payload = with_mock_client(handler, lambda client: build_trust_state_for_domain_async("example.com", client))
     v = Draft202012Validator(SCHEMA)
     errors = list(v.iter_errors(payload))
     assert not errors, errors
+
+
+def test_probes_share_one_deadline(with_mock_client):
+    async def slow(request):
+        await asyncio.sleep(5)
+        return httpx.Response(200)
+
+    t0 = time.perf_counter()
+    payload = with_mock_client(slow, lambda client: build_trust_state_for_domain_async("slow.example", client, deadline=0.2))
+    assert time.perf_counter() - t0 < 2
+    probed = [s for s in payload["signals"] if s["code"] not in ("schema_valid", "key_epoch_valid")]
+    assert all(s["result"] == "unknown" for s in probed)
+
+
+def test_inventory_probe_verifies_streamed_inventory(monkeypatch, with_mock_client):
+    hashers = []
+    real = probes.MessageHasher.for_signature
+    monkeypatch.setattr(probes.MessageHasher, "for_signature", lambda sig: hashers.append(real(sig)) or hashers[-1])
+
+    files = {
+        "/.well-known/minisign.pub": (ROOT / "v2" / "keys" / "minisign.pub").read_bytes(),
+        "/dumps/sha256.json": (ROOT / "v2" / "inventory.sha256").read_bytes(),
+        "/dumps/sha256.json.minisig": (ROOT / "v2" / "inventory.sha256.minisig").read_bytes(),
+    }
+
+    def serve(tampered):
+        def handler(request):
+            body = files.get(request.url.path)
+            if body is None:
+                return httpx.Response(404)
+            if tampered and request.url.path == "/dumps/sha256.json":
+                body += b"\n"
+            return httpx.Response(200, content=body)
+        return handler
+
+    async def inventory_signed(client):
+        return (await run_probes("signed.example", client))["inventory_signed"]
+
+    assert with_mock_client(serve(False), inventory_signed)[0] == "pass"
+    assert with_mock_client(serve(True), inventory_signed)[0] == "fail"
+    # the signature is prehashed, so no raw inventory bytes were kept
+    assert len(hashers) == 2 and all(h._raw is None for h in hashers)
+
+
+def test_fast_validation_catches_what_full_validation_catches():
+    signals = [{"code": s.code, "weight": s.weight, "result": "unknown", "evidence": list(s.evidence)} for s in SIGNALS]
+    payload = {
+        "schema_version": "2.0",
+        "subject": {"type": "domain", "id": "example.com"},
+        "computed_at": "2025-01-01T00:00:00Z",
+        "valid_until": "2025-01-08T00:00:00Z",
+        "score": score_from_signals(signals),
+        "signals": signals,
+    }
+    assert _construction_errors(payload) == [] and _schema_errors(payload) == []
+
+    signals[1]["result"] = "maybe"
+    assert _construction_errors(payload) and _schema_errors(payload)
@@ -0,0 +1,48 @@
+import asyncio
+
+from trust_api import batch
+from trust_api.batch import host_key, score_batch
+
+
+def test_batch_bounds_concurrency_per_host():
+    active = {}
+    peak = {}
+
+    async def evaluate(domain):
+        key = host_key(domain)
+        active[key] = active.get(key, 0) + 1
+        peak[key] = max(peak.get(key, 0), active[key])
+        await asyncio.sleep(0.01)
+        active[key] -= 1
+        return {"subject": {"id": domain}}
+
+    domains = [f"site{i % 3}.example" for i in range(60)] + ["bad"]
+
+    async def run():
+        return [r async for r in score_batch(domains, evaluate, concurrency=16, per_host=2)]
+
+    results = asyncio.run(run())
+    assert len(results) == len(domains)
+    assert sum(r["status"] == "error" for r in results) == 1
+    assert max(peak.values()) <= 2
+
+
+def test_host_key_never_groups_unrelated_sites_under_a_public_suffix(monkeypatch):
+    monkeypatch.setattr(batch, "_psl", False)  # without publicsuffixlist: full hostnames
+    assert host_key("A.Example.co.uk.") == "a.example.co.uk"
+    assert host_key("a.example.co.uk") != host_key("b.other.co.uk")
+
+
+def test_a_busy_host_does_not_hold_up_other_hosts():
+    async def evaluate(domain):
+        await asyncio.sleep(0.01)
+        return {"subject": {"id": domain}}
+
+    domains = ["a.x.example"] * 10 + ["b.y.example"]
+
+    async def run():
+        return [r["domain"] async for r in score_batch(domains, evaluate, concurrency=2, per_host=1)]
+
+    order = asyncio.run(run())
+    assert sorted(order) == sorted(domains)
+    assert order.index("b.y.example") < 2
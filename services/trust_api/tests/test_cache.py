@@ -0,0 +1,91 @@
+import asyncio
+
+import httpx
+
+from trust_api.cache import HIT, MISS, STALE, RevalidatingTransport, TrustStateCache
+
+
+def test_concurrent_misses_share_one_computation():
+    calls = 0
+
+    async def compute():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.05)
+        return {"valid_until": "2999-01-01T00:00:00Z", "n": calls}
+
+    async def run():
+        cache = TrustStateCache(ttl=60)
+        first = await asyncio.gather(*[cache.get("example.com", compute) for _ in range(10)])
+        again = await cache.get("example.com", compute)
+        return first, again
+
+    first, again = asyncio.run(run())
+    assert calls == 1
+    assert all(status == MISS for _, status, _ in first)
+    assert again[1] == HIT
+
+
+def test_stale_entry_is_served_and_refreshed_in_background():
+    calls = 0
+
+    async def compute():
+        nonlocal calls
+        calls += 1
+        return {"n": calls}
+
+    async def run():
+        cache = TrustStateCache(ttl=0, stale_ttl=60)
+        await cache.get("example.com", compute)
+        payload, status, _ = await cache.get("example.com", compute)
+        await asyncio.sleep(0)
+        await asyncio.sleep(0)
+        return payload, status, cache._entries["example.com"].payload
+
+    payload, status, refreshed = asyncio.run(run())
+    assert status == STALE
+    assert payload == {"n": 1}
+    assert refreshed == {"n": 2}
+
+
+def test_unchanged_artifact_is_revalidated_with_304():
+    seen = []
+
+    def handler(request):
+        seen.append(request.headers.get("If-None-Match"))
+        if request.headers.get("If-None-Match") == '"v1"':
+            return httpx.Response(304)
+        return httpx.Response(200, headers={"ETag": '"v1"'}, content=b"pubkey")
+
+    async def run():
+        transport = RevalidatingTransport(httpx.MockTransport(handler))
+        async with httpx.AsyncClient(transport=transport) as client:
+            a = await client.get("https://example.com/.well-known/minisign.pub")
+            b = await client.get("https://example.com/.well-known/minisign.pub")
+        return a, b
+
+    a, b = asyncio.run(run())
+    assert seen == [None, '"v1"']
+    assert (a.status_code, a.content) == (200, b"pubkey")
+    assert (b.status_code, b.content) == (200, b"pubkey")
+
+
+def test_remembered_bodies_are_evicted_past_the_byte_budget():
+    def handler(request):
+        if request.headers.get("If-None-Match"):
+            return httpx.Response(304)
+        return httpx.Response(200, headers={"ETag": '"v1"'}, content=b"x" * 400)
+
+    async def run():
+        transport = RevalidatingTransport(httpx.MockTransport(handler), max_bytes=1000)
+        async with httpx.AsyncClient(transport=transport) as client:
+            for name in ("a", "b", "c"):
+                await client.get(f"https://example.com/{name}")
+            b = await client.get("https://example.com/b")  # revalidated, now most recently used
+            await client.get("https://example.com/d")
+        return transport, b
+
+    transport, b = asyncio.run(run())
+    assert b.content == b"x" * 400
+    assert transport.bytes == 800
+    assert [url for _, url in transport._seen] == ["https://example.com/b", "https://example.com/d"]
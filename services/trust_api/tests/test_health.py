@@ -0,0 +1,85 @@
+import httpx
+import pytest
+
+from trust_api import health as health_mod
+from trust_api.health import HealthConfig, HostHealth
+from trust_api.probes import run_probes
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def probe(with_mock_client):
+    def run(health, handler):
+        sent = []
+
+        def record(request):
+            sent.append(request.url.path)
+            return handler(request)
+
+        return with_mock_client(record, lambda client: run_probes("dead.example", client, health=health)), sent
+
+    return run
+
+
+def test_breaker_opens_after_timeouts_and_half_opens_with_one_trial(monkeypatch, probe):
+    clock = Clock()
+    monkeypatch.setattr(health_mod.time, "monotonic", clock)
+    health = HostHealth(HealthConfig(failure_threshold=3, open_for=30, max_open_for=100))
+
+    def timeout(request):
+        raise httpx.ReadTimeout("slow", request=request)
+
+    # the third timeout opens the circuit; the remaining requests are not sent
+    results, sent = probe(health, timeout)
+    assert len(sent) == 3 and health.degraded("dead.example") and health.open_circuits() == 1
+    assert results["well_known_present"][0] == "unknown"
+
+    # while open nothing is sent
+    results, sent = probe(health, timeout)
+    assert sent == []
+    assert "circuit_open" in results["inventory_signed"][1][0]
+
+    # after open_for one trial goes out; its failure re-opens for twice as long
+    clock.now += 31
+    _, sent = probe(health, timeout)
+    assert len(sent) == 1
+    clock.now += 31
+    _, sent = probe(health, timeout)
+    assert sent == []
+
+    # an answered trial closes the circuit and the other requests follow it
+    clock.now += 31
+    _, sent = probe(health, lambda r: httpx.Response(404))
+    assert len(sent) == 4 and not health.degraded("dead.example")
+
+
+def test_unreachable_hosts_and_404s_are_negative_cached(monkeypatch, probe):
+    clock = Clock()
+    monkeypatch.setattr(health_mod.time, "monotonic", clock)
+    health = HostHealth(HealthConfig(negative_ttl=60))
+
+    def refused(request):
+        raise httpx.ConnectError("refused", request=request)
+
+    # the first refused connection marks the host unreachable for the rest
+    _, sent = probe(health, refused)
+    assert len(sent) == 1
+    results, sent = probe(health, refused)
+    assert sent == [] and results["minisign_pubkey_present"][0] == "unknown"
+    assert health.degraded("dead.example")
+
+    clock.now += 61
+    _, sent = probe(health, lambda r: httpx.Response(404))
+    assert len(sent) == 4
+    results, sent = probe(health, lambda r: httpx.Response(404))
+    assert sent == [] and results["well_known_present"][0] == "fail"
+    clock.now += 61
+    _, sent = probe(health, lambda r: httpx.Response(404))
+    assert len(sent) == 4
@@ -0,0 +1,53 @@
+import asyncio
+
+import httpx
+from fastapi.testclient import TestClient
+
+from trust_api import metrics
+from trust_api.app import app
+from trust_api.pool import CountingTransport, PoolStats
+
+
+def test_metrics_endpoint_and_server_timing(monkeypatch):
+    monkeypatch.setattr(metrics, "SERVER_TIMING", True)
+
+    def handler(request):
+        return httpx.Response(404)
+
+    with TestClient(app) as c:
+        app.state.http = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        r1 = c.get("/api/v1/trust/domain/metrics.example")
+        r2 = c.get("/api/v1/trust/domain/metrics.example")
+        text = c.get("/metrics").text
+
+    assert (r1.headers["X-Cache"], r2.headers["X-Cache"]) == ("MISS", "HIT")
+    timing = r1.headers["Server-Timing"]
+    assert "probe_inventory_signed;dur=" in timing and "validate;dur=" in timing and "total;dur=" in timing
+    assert "probe_" not in r2.headers["Server-Timing"]
+
+    assert 'tfws_probe_duration_seconds_count{probe="well_known_present"}' in text
+    assert 'tfws_signal_results_total{signal="key_history_present",result="fail"}' in text
+    assert 'tfws_cache_lookups_total{status="HIT"}' in text
+    assert 'tfws_http_requests_total{route="/api/v1/trust/domain/{domain}",status="200"}' in text
+    assert "tfws_http_pool_requests_in_flight 0" in text
+    assert "metrics.example" not in text
+
+
+def test_pool_stats_count_requests_until_their_body_is_closed():
+    stats = PoolStats()
+
+    class Body(httpx.AsyncByteStream):
+        async def __aiter__(self):
+            yield b"x" * 10
+
+    async def run():
+        transport = CountingTransport(httpx.MockTransport(lambda r: httpx.Response(200, stream=Body())), stats)
+        async with httpx.AsyncClient(transport=transport) as client:
+            async with client.stream("GET", "https://example.com/a") as r:
+                during = stats.in_flight
+                await r.aread()
+            await client.get("https://example.com/b")
+        return during
+
+    assert asyncio.run(run()) == 1
+    assert (stats.in_flight, stats.sent) == (0, 2)
@@ -0,0 +1,99 @@
+import asyncio
+
+import httpx
+
+from trust_api.app import app
+from trust_api.cache import HIT, TrustStateCache
+from trust_api import scheduler
+from trust_api.scheduler import RefreshScheduler, SchedulerConfig
+
+
+def test_tracked_domains_are_refreshed_before_they_go_stale(monkeypatch):
+    # group by parent domain, as the public suffix list does for *.example.com
+    monkeypatch.setattr(scheduler, "host_key", lambda d: d.split(".", 1)[1])
+    calls = {}
+    active = {"now": 0, "max": 0}
+
+    async def probe(domain):
+        calls[domain] = calls.get(domain, 0) + 1
+        active["now"] += 1
+        active["max"] = max(active["max"], active["now"])
+        await asyncio.sleep(0.01)
+        active["now"] -= 1
+        return {"valid_until": "2999-01-01T00:00:00Z", "domain": domain, "n": calls[domain]}
+
+    async def run():
+        cache = TrustStateCache(ttl=0.2, stale_ttl=0)
+        config = SchedulerConfig(enabled=True, lead=0.1, jitter=0.1, concurrency=8, per_host=1)
+        sched = RefreshScheduler(cache, probe, config)
+        sched.start()
+        domains = [f"{i}.example.com" for i in range(4)] + ["other.example"]
+        for d in domains:
+            await cache.get(d, lambda d=d: probe(d))
+            sched.touch(d)
+
+        statuses = []
+        for _ in range(10):
+            await asyncio.sleep(0.05)
+            for d in domains:
+                t0 = asyncio.get_running_loop().time()
+                _, status, _ = await cache.get(d, lambda: asyncio.sleep(10))
+                statuses.append((status, asyncio.get_running_loop().time() - t0))
+        tracked = sched.tracked
+        await sched.aclose()
+        return statuses, sched, tracked
+
+    statuses, sched, tracked = asyncio.run(run())
+    assert all(status == HIT and waited < 0.05 for status, waited in statuses)
+    assert all(n >= 3 for n in calls.values())
+    assert active["max"] <= 2  # per_host=1: the example.com subdomains never overlap
+    assert sched.failed == 0 and tracked == 5
+
+
+def test_a_saturated_host_does_not_hold_up_other_hosts(monkeypatch):
+    monkeypatch.setattr(scheduler, "host_key", lambda d: d.split(".", 1)[1])
+    started = []
+
+    async def probe(domain):
+        started.append(domain)
+        await asyncio.sleep(0.1 if domain.endswith("slow.example") else 0)
+        return {"valid_until": "2999-01-01T00:00:00Z", "domain": domain}
+
+    async def run():
+        config = SchedulerConfig(enabled=True, concurrency=2, per_host=1)
+        sched = RefreshScheduler(TrustStateCache(ttl=60), probe, config)
+        for d in ("1.slow.example", "2.slow.example", "3.slow.example", "fast.example"):
+            sched.touch(d)
+        sched.start()
+        await asyncio.sleep(0.05)
+        first = list(started)
+        await asyncio.sleep(0.3)
+        await sched.aclose()
+        return first, sched
+
+    first, sched = asyncio.run(run())
+    assert first == ["1.slow.example", "fast.example"]
+    assert sched.refreshed == 4 and sched.tracked == 4
+
+
+def test_touching_past_max_tracked_remembers_nothing_extra():
+    sched = RefreshScheduler(TrustStateCache(ttl=60), None, SchedulerConfig(enabled=True, max_tracked=3))
+    for i in range(10):
+        sched.touch(f"{i}.example")
+    sched.touch("0.example")
+    assert sched.tracked == 3
+    assert len(sched._last_seen) <= 3
+
+
+def test_batch_lookups_are_not_tracked(monkeypatch, with_api):
+    monkeypatch.setenv("TFWS_SCHEDULER", "1")
+
+    async def use(api):
+        batch = await api.post("/api/v1/trust/batch", json={"domains": [f"{i}.example" for i in range(20)]})
+        after_batch = app.state.scheduler.tracked
+        await api.get("/api/v1/trust/domain/single.example")
+        return batch, after_batch, app.state.scheduler.tracked
+
+    batch, after_batch, after_get = with_api(lambda r: httpx.Response(404), use)
+    assert batch.status_code == 200 and len(batch.text.splitlines()) == 20
+    assert after_batch == 0 and after_get == 1
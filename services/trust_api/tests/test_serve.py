@@ -0,0 +1,75 @@
+import asyncio
+from types import SimpleNamespace
+
+import httpx
+from fastapi.testclient import TestClient
+
+from trust_api.app import _probe_shared, app
+from trust_api.serve import parse_args
+from trust_api.store import TrustStore
+
+
+def test_workers_sharing_a_store_probe_each_domain_once(tmp_path):
+    path = str(tmp_path / "shared.db")
+    sent = []
+
+    async def handler(request):
+        sent.append(request.url.path)
+        await asyncio.sleep(0.05)
+        return httpx.Response(404)
+
+    async def run():
+        # two workers: own store connection, client and cache, one file
+        workers = [SimpleNamespace(state=SimpleNamespace(
+            store=TrustStore(path), http=httpx.AsyncClient(transport=httpx.MockTransport(handler)), health=None))
+            for _ in range(2)]
+        workers[1].state.store.owner = "other-worker"
+        try:
+            payloads = await asyncio.gather(*(_probe_shared(w, d, 300) for w in workers for d in ("a.example", "b.example")))
+        finally:
+            for w in workers:
+                await w.state.http.aclose()
+                await w.state.store.aclose()
+        return payloads
+
+    payloads = asyncio.run(run())
+    assert len(sent) == 8  # one evaluation (4 requests) per domain, not per worker
+    assert payloads[0] == payloads[2] and payloads[1] == payloads[3]
+
+
+def test_requests_past_the_in_flight_limit_get_429(monkeypatch):
+    monkeypatch.setenv("TFWS_MAX_IN_FLIGHT", "1")
+    assert parse_args(["--workers", "4", "--host", "0.0.0.0"]).max_in_flight == 1
+
+    with TestClient(app) as c:
+        app.state.in_flight = 1  # another request holds the only slot
+        busy = c.get("/api/v1/trust/domain/busy.example")
+        metrics = c.get("/metrics")
+        app.state.in_flight = 0
+        invalid = c.get("/api/v1/trust/domain/not_a_domain")
+
+    assert busy.status_code == 429 and busy.headers["Retry-After"] == "1"
+    assert metrics.status_code == 200
+    assert invalid.status_code == 400
+
+
+def test_streamed_batch_holds_its_slot_until_the_body_is_done(monkeypatch, with_api):
+    monkeypatch.setenv("TFWS_MAX_IN_FLIGHT", "1")
+    probing = asyncio.Event()
+
+    async def slow(request):
+        probing.set()
+        await asyncio.sleep(0.2)
+        return httpx.Response(404)
+
+    async def use(api):
+        batch = asyncio.ensure_future(
+            api.post("/api/v1/trust/batch", json={"domains": ["a.example", "b.example"], "concurrency": 1}))
+        await probing.wait()  # headers are out, the body is still being produced
+        other = await api.get("/api/v1/trust/domain/other.example")
+        return await batch, other, app.state.in_flight
+
+    batch, other, in_flight = with_api(slow, use)
+    assert batch.status_code == 200 and len(batch.text.splitlines()) == 2
+    assert other.status_code == 429
+    assert in_flight == 0
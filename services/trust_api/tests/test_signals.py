@@ -0,0 +1,111 @@
+import json
+from pathlib import Path
+
+import httpx
+import pytest
+
+from trust_api.fetch import ArtifactFetcher
+from trust_api.probes import SIGNALS, run_probes
+from trust_api.signals import SignalRegistry
+
+ROOT = Path(__file__).resolve().parents[3]
+PUB = (ROOT / "v2" / "keys" / "minisign.pub").read_bytes()
+
+
+def _history(**entry):
+    key = {"kid": "k1", "pubkey_path": "/.well-known/minisign.pub", "not_before": "2025-01-01T00:00:00Z",
+           "status": "active"}
+    key.update(entry)
+    return json.dumps({"schema_version": "2.0", "keys": [key]}).encode()
+
+
+@pytest.fixture
+def probe_site(with_mock_client):
+    def run(files):
+        requests = []
+
+        def handler(request):
+            requests.append((request.method, request.url.path))
+            body = files.get(request.url.path)
+            return httpx.Response(200, content=body) if body is not None else httpx.Response(404)
+
+        return with_mock_client(handler, lambda client: run_probes("site.example", client)), requests
+
+    return run
+
+
+def test_key_epoch_signal_and_single_fetch_per_artifact(probe_site):
+    files = {"/.well-known/minisign.pub": PUB, "/.well-known/key-history.json": _history()}
+    results, requests = probe_site(files)
+    assert results["key_epoch_valid"][0] == "pass"
+    assert results["key_history_present"][0] == "pass"
+    # minisign.pub and key-history.json have several readers but one request each;
+    # ai-trust-hub.json is only checked for presence; without a signature the
+    # inventory is not downloaded
+    assert sorted(requests) == [
+        ("GET", "/.well-known/key-history.json"), ("GET", "/.well-known/minisign.pub"),
+        ("GET", "/dumps/sha256.json.minisig"), ("HEAD", "/.well-known/ai-trust-hub.json"),
+    ]
+
+    files["/.well-known/key-history.json"] = _history(status="revoked")
+    assert probe_site(files)[0]["key_epoch_valid"][0] == "fail"
+    files["/.well-known/key-history.json"] = _history(not_after="2025-06-01T00:00:00Z", status="retired")
+    assert probe_site(files)[0]["key_epoch_valid"][0] == "fail"
+    files["/.well-known/key-history.json"] = _history(pubkey_path="/keys/other.pub")
+    assert probe_site(files)[0]["key_epoch_valid"][0] == "warn"
+    files["/.well-known/key-history.json"] = b"{not json"
+    assert probe_site(files)[0]["key_epoch_valid"][0] == "fail"
+    del files["/.well-known/key-history.json"]
+    assert probe_site(files)[0]["key_epoch_valid"][0] == "unknown"
+
+
+def test_registry_rejects_unknown_inputs_and_assembles_in_order(with_mock_client):
+    reg = SignalRegistry()
+    reg.artifact("a", "/a")
+    with pytest.raises(ValueError):
+        reg.register("x", 1, artifacts=("missing",))
+    with pytest.raises(ValueError):
+        reg.register("x", 1, depends=("later",))
+
+    @reg.register("first", 5, artifacts=("a",))
+    async def first(ev):
+        f = await ev.get("a")
+        return ("pass" if f.status == 200 else "fail"), [f.url]
+
+    @reg.register("second", 3, ("fallback",), depends=("first",))
+    async def second(ev):
+        result, _ = await ev.result("first")
+        return result, []
+
+    out = with_mock_client(lambda r: httpx.Response(200), lambda client: reg.evaluate("x.example", client, deadline=1.0))
+    assert [s["code"] for s in out] == ["first", "second"]
+    assert out[1] == {"code": "second", "weight": 3, "result": "pass", "evidence": ["fallback"]}
+    assert [s.code for s in SIGNALS][:2] == ["schema_valid", "well_known_present"]
+
+
+def test_fetcher_upgrades_head_only_when_needed_and_limits_size(with_mock_client):
+    bodies = {"/small": b"x" * 10, "/big": b"x" * 100, "/stream-big": b"y" * 500}
+    sent = []
+
+    def handler(request):
+        sent.append((request.method, request.url.path))
+        body = bodies.get(request.url.path)
+        return httpx.Response(200, content=body) if body is not None else httpx.Response(404)
+
+    async def run(client):
+        f = ArtifactFetcher(client, max_bytes=50)
+        missing = [await f.head("https://a/none", 1), await f.get("https://a/none", 1)]
+        small = [await f.head("https://a/small", 1), await f.get("https://a/small", 1)]
+        got_first = [await f.get("https://a/big", 1), await f.head("https://a/big", 1)]
+        chunks = []
+        streamed = await f.stream("https://a/stream-big", chunks.append, 1, max_bytes=1000)
+        assert b"".join(chunks) == bodies["/stream-big"]
+        return missing, small, got_first, streamed, f.requests
+
+    missing, small, big, streamed, n = with_mock_client(handler, run)
+    assert [m.status for m in missing] == [404, 404]
+    assert small[1].body == b"x" * 10 and small[0].method == "HEAD"
+    assert big[0].error.startswith("too_large") and big[1] is big[0]
+    assert streamed.ok and streamed.size == 500 and streamed.body == b""
+    assert sent == [("HEAD", "/none"), ("HEAD", "/small"), ("GET", "/small"), ("GET", "/big"), ("GET", "/stream-big")]
+    assert n == len(sent)
@@ -0,0 +1,49 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+from trust_api.store import TrustStore
+
+
+def _payload(domain, computed_at, value, result="pass"):
+    z = lambda t: t.strftime("%Y-%m-%dT%H:%M:%SZ")
+    return {
+        "schema_version": "2.0",
+        "subject": {"type": "domain", "id": domain},
+        "computed_at": z(computed_at),
+        "valid_until": z(computed_at + timedelta(days=7)),
+        "score": {"value": value, "confidence": 0.4, "grade": "E"},
+        "signals": [{"code": "well_known_present", "weight": 15, "result": result, "evidence": []}],
+    }
+
+
+def test_store_batches_writes_and_serves_history_across_restarts(tmp_path):
+    path = str(tmp_path / "trust.db")
+    now = datetime.now(timezone.utc).replace(microsecond=0)
+
+    async def first_run():
+        store = TrustStore(path, batch_size=2, flush_interval=60)
+        for i in range(3):
+            store.record(_payload("example.com", now - timedelta(hours=3 - i), 50 + i, "fail" if i == 0 else "pass"))
+        store.record(_payload("other.example", now, 90))
+        # unflushed records are already visible to reads
+        assert (await store.fresh("other.example", max_age=60))["score"]["value"] == 90
+        await asyncio.sleep(0.05)
+        assert store.written == 4  # two full batches, no flush_interval wait
+        await store.aclose()
+
+    async def restart():
+        store = TrustStore(path)
+        try:
+            latest = await store.latest("example.com")
+            assert latest[1]["score"]["value"] == 52
+            assert await store.fresh("example.com", max_age=60) is None  # computed an hour ago
+            since = (now - timedelta(hours=2, minutes=30)).strftime("%Y-%m-%dT%H:%M:%SZ")
+            history = await store.history("example.com", since=since)
+            assert [h["score"] for h in history] == [52, 51]
+            full = await store.history("example.com")
+            assert [h["signals"]["well_known_present"] for h in full] == ["pass", "pass", "fail"]
+        finally:
+            await store.aclose()
+
+    asyncio.run(first_run())
+    asyncio.run(restart())
@@ -1,276 +1,445 @@
-from __future__ import annotations
-
-import json
-from pathlib import Path
-from datetime import datetime, timezone, timedelta
-from typing import Any, Dict, List, Tuple
-
-import httpx
-from fastapi import FastAPI, HTTPException
-from fastapi.responses import JSONResponse
-from jsonschema import Draft202012Validator
-from tfws2.minisign_verify import verify_minisign_detached
-
-
-ROOT = Path(__file__).resolve().parents[3]  # repo root
-SCHEMA_TRUST_STATE = ROOT / "schemas" / "trust-state.schema.json"
-
-app = FastAPI(
-    title="TFWS v2 Trust API (reference)",
-    version="0.2.0",
-    description="Reference API layer on top of TFWS v2 schemas. Returns schema-valid trust-state payloads.",
-)
-
-
-def _now_z() -> str:
-    return datetime.now(timezone.utc).replace(microsecond=0).isoformat().replace("+00:00", "Z")
-
-
-def _valid_until_z(days: int = 7) -> str:
-    t = datetime.now(timezone.utc).replace(microsecond=0) + timedelta(days=days)
-    return t.isoformat().replace("+00:00", "Z")
-
-
-def _load_schema(path: Path) -> Dict[str, Any]:
-    return json.loads(path.read_text(encoding="utf-8"))
-
-
-def _validate(schema: Dict[str, Any], payload: Dict[str, Any]) -> None:
-    v = Draft202012Validator(schema)
-    errors = sorted(v.iter_errors(payload), key=lambda e: list(e.path))
-    if errors:
-        msg = "; ".join([f"{list(e.path)}: {e.message}" for e in errors[:10]])
-        raise HTTPException(status_code=500, detail=f"Generated payload failed schema validation: {msg}")
-
-
-def probe_ai_trust_hub(domain: str) -> Tuple[str, List[str]]:
-    """
-    Best-effort probe for: https://<domain>/.well-known/ai-trust-hub.json
-
-    Returns: (result, evidence[])
-      result in {pass, fail, warn, unknown}
-    """
-    url = f"https://{domain}/.well-known/ai-trust-hub.json"
-    timeout = 2.5
-    try:
-        with httpx.Client(timeout=timeout, follow_redirects=True) as client:
-            r = client.head(url)
-            status = r.status_code
-            # Some servers don't support HEAD; fallback to GET.
-            if status in (405, 501):
-                r = client.get(url)
-                status = r.status_code
-    except Exception:
-        return "unknown", [url]
-
-    if status == 200:
-        return "pass", [url]
-    if status == 404:
-        return "fail", [url]
-    return "warn", [f"{url} (http:{status})"]
-
-
-def probe_minisign_pubkey(domain: str) -> Tuple[str, List[str]]:
-    url = f"https://{domain}/.well-known/minisign.pub"
-    timeout = 2.5
-    try:
-        with httpx.Client(timeout=timeout, follow_redirects=True) as client:
-            r = client.head(url)
-            status = r.status_code
-            if status in (405, 501):
-                r = client.get(url)
-                status = r.status_code
-    except Exception:
-        return "unknown", [url]
-
-    if status == 200:
-        return "pass", [url]
-    if status == 404:
-        return "fail", [url]
-    return "warn", [f"{url} (http:{status})"]
-
-
-def probe_key_history(domain: str) -> Tuple[str, List[str]]:
-    url = f"https://{domain}/.well-known/key-history.json"
-    timeout = 2.5
-    try:
-        with httpx.Client(timeout=timeout, follow_redirects=True) as client:
-            r = client.get(url)
-            status = r.status_code
-    except Exception:
-        return "unknown", [url]
-
-    if status == 200:
-        return "pass", [url]
-    if status == 404:
-        return "fail", [url]
-    return "warn", [f"{url} (http:{status})"]
-
-
-def score_from_signals(signals: List[Dict[str, Any]]) -> Dict[str, Any]:
-    """
-    Deterministic reference scoring model.
-
-    - Start at 50
-    - pass: +abs(weight)
-    - fail: -abs(weight)
-    - warn/unknown: 0
-    Confidence increases with count of pass/fail signals.
-    """
-    total = 50.0
-    known = 0
-
-    for s in signals:
-        w = float(s.get("weight", 0))
-        res = s.get("result")
-        if res == "pass":
-            total += abs(w)
-            known += 1
-        elif res == "fail":
-            total -= abs(w)
-            known += 1
-
-    total = max(0.0, min(100.0, total))
-    confidence = min(1.0, 0.25 + 0.15 * known)
-
-    if total >= 90:
-        grade = "A"
-    elif total >= 80:
-        grade = "B"
-    elif total >= 70:
-        grade = "C"
-    elif total >= 60:
-        grade = "D"
-    elif total >= 50:
-        grade = "E"
-    else:
-        grade = "F"
-
-    return {"value": total, "confidence": confidence, "grade": grade}
-
-
-def _basic_signals(domain: str) -> List[Dict[str, Any]]:
-    return [
-        {"code": "schema_valid", "weight": 10, "result": "pass", "evidence": ["schemas/trust-state.schema.json"]},
-        {"code": "well_known_present", "weight": 15, "result": "unknown", "evidence": ["/.well-known/ai-trust-hub.json"]},
-        {"code": "inventory_signed", "weight": 15, "result": "unknown", "evidence": ["sha256.json.minisig (optional)"]},
-        {"code": "key_epoch_valid", "weight": 10, "result": "unknown", "evidence": ["key-history.json (optional)"]},
-        {"code": "minisign_pubkey_present", "weight": 10, "result": "unknown", "evidence": ["/.well-known/minisign.pub"]},
-        {"code": "key_history_present", "weight": 10, "result": "unknown", "evidence": ["/.well-known/key-history.json"]},
-    ]
-
-
-def build_trust_state_for_domain(domain: str) -> Dict[str, Any]:
-    schema = _load_schema(SCHEMA_TRUST_STATE)
-
-    signals = _basic_signals(domain)
-
-    # 1) ai-trust-hub.json
-    wk_result, wk_evidence = probe_ai_trust_hub(domain)
-    for s in signals:
-        if s.get("code") == "well_known_present":
-            s["result"] = wk_result
-            s["evidence"] = wk_evidence
-
-    # 2) minisign.pub
-    pk_result, pk_evidence = probe_minisign_pubkey(domain)
-    for s in signals:
-        if s.get("code") == "minisign_pubkey_present":
-            s["result"] = pk_result
-            s["evidence"] = pk_evidence
-
-    # 3) key-history.json
-    kh_result, kh_evidence = probe_key_history(domain)
-    for s in signals:
-        if s.get("code") == "key_history_present":
-            s["result"] = kh_result
-            s["evidence"] = kh_evidence
-
-    # inventory signature verification (minisign)
-    inv_result, inv_evidence = probe_inventory_signed(domain)
-    for s in signals:
-        if s.get("code") == "inventory_signed":
-            s["result"] = inv_result
-            s["evidence"] = inv_evidence
-
-    score = score_from_signals(signals)
-
-    payload: Dict[str, Any] = {
-        "schema_version": "2.0",
-        "subject": {"type": "domain", "id": domain},
-        "computed_at": _now_z(),
-        "valid_until": _valid_until_z(7),
-        "score": score,
-        "signals": signals,
-    }
-
-    _validate(schema, payload)
-    return payload
-
-
-@app.get("/api/v1/trust/domain/{domain}")
-def get_trust_domain(domain: str):
-    if len(domain) < 3 or "." not in domain:
-        raise HTTPException(status_code=400, detail="Invalid domain format")
-
-    payload = build_trust_state_for_domain(domain)
-    return JSONResponse(content=payload)
-
-
-def main():
-    import uvicorn
-    uvicorn.run("trust_api.app:app", host="127.0.0.1", port=8787, reload=False)
-
-
-if __name__ == "__main__":
-    main()
-def probe_inventory_signed(domain: str):
-    """
-    Verify inventory signature:
-    - minisign.pub
-    - dumps/sha256.json
-    - dumps/sha256.json.minisig
-    """
-    pub_url = f"https://{domain}/.well-known/minisign.pub"
-    inv_url = f"https://{domain}/dumps/sha256.json"
-    sig_url = f"https://{domain}/dumps/sha256.json.minisig"
-
-    try:
-        with httpx.Client(timeout=8.0, follow_redirects=True) as client:
-            pub_r = client.get(pub_url)
-            inv_r = client.get(inv_url)
-            sig_r = client.get(sig_url)
-
-        if pub_r.status_code != 200:
-            return ("fail" if pub_r.status_code == 404 else "warn"), [pub_url]
-        if inv_r.status_code != 200:
-            return ("fail" if inv_r.status_code == 404 else "warn"), [inv_url]
-        if sig_r.status_code != 200:
-            return ("fail" if sig_r.status_code == 404 else "warn"), [sig_url]
-
-        import tempfile
-        tmp = Path(tempfile.gettempdir()) / "tfws2_tmp"
-        tmp.mkdir(parents=True, exist_ok=True)
-
-        pub_p = tmp / "minisign.pub"
-        inv_p = tmp / "sha256.json"
-        sig_p = tmp / "sha256.json.minisig"
-
-        pub_p.write_bytes(pub_r.content)
-        inv_p.write_bytes(inv_r.content)
-        sig_p.write_bytes(sig_r.content)
-
-        ok, info = verify_minisign_detached(str(pub_p), str(inv_p), str(sig_p))
-        if ok:
-            return "pass", [inv_url, sig_url]
-        return "fail", [f"{sig_url} (bad signature)"]
-
-    except Exception as e:
-        return "unknown", [f"{inv_url} ({type(e).__name__})"]
-
-    # inventory signature verification (minisign)
-    inv_result, inv_evidence = probe_inventory_signed(domain)
-    for s in signals:
-        if s.get("code") == "inventory_signed":
-            s["result"] = inv_result
-            s["evidence"] = inv_evidence
+from __future__ import annotations
+
+import asyncio
+import os
+import time
+from contextlib import asynccontextmanager
+from pathlib import Path
+from datetime import datetime, timezone, timedelta
+from typing import Any, Dict, List
+
+import httpx
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from starlette.routing import Match
+from pydantic import BaseModel, Field
+from tfws2.schemas import get_validator
+
+from .batch import DEFAULT_CONCURRENCY, DEFAULT_PER_HOST, MAX_BATCH, ndjson_lines, score_batch, valid_domain
+
+from . import metrics
+from .cache import TrustStateCache
+from .health import HostHealth
+from .pool import PoolConfig, PoolStats, create_client
+from .probes import DOMAIN_DEADLINE, evaluate_signals
+from .scheduler import RefreshScheduler, SchedulerConfig
+from .serve import ServeConfig, main as serve_main
+from .store import TrustStore
+
+
+ROOT = Path(__file__).resolve().parents[3]  # repo root
+SCHEMA_TRUST_STATE = ROOT / "schemas" / "trust-state.schema.json"
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # One pooled client per process: probes across all requests share warm connections.
+    app.state.pool_stats = PoolStats()
+    async with create_client(PoolConfig.from_env(), stats=app.state.pool_stats) as client:
+        app.state.http = client
+        app.state.cache = TrustStateCache.from_env()
+        app.state.store = TrustStore.from_env()
+        app.state.health = HostHealth.from_env()
+        serve = ServeConfig.from_env()
+        app.state.max_in_flight = serve.max_in_flight
+        app.state.in_flight = 0
+        # Workers share trust-states and probe leases through the store.
+        app.state.shared = app.state.store is not None and serve.workers > 1
+        app.state.scheduler = None
+        config = SchedulerConfig.from_env()
+        if config.enabled:
+            app.state.scheduler = RefreshScheduler(app.state.cache, lambda d: _scheduled_probe(app, d, config), config)
+            app.state.scheduler.start()
+        _register_runtime_metrics(app)
+        try:
+            yield
+        finally:
+            if app.state.scheduler is not None:
+                await app.state.scheduler.aclose()
+            await app.state.cache.aclose()
+            if app.state.store is not None:
+                await app.state.store.aclose()
+
+
+app = FastAPI(
+    title="TFWS v2 Trust API (reference)",
+    version="0.2.0",
+    description="Reference API layer on top of TFWS v2 schemas. Returns schema-valid trust-state payloads.",
+    lifespan=lifespan,
+)
+
+
+def _register_runtime_metrics(app: FastAPI) -> None:
+    """Gauges and totals read from live objects at scrape time."""
+    state = app.state
+    reg = metrics.REGISTRY
+
+    pool = state.pool_stats
+
+    def store_attr(name):
+        return lambda: [((), getattr(state.store, name))] if state.store is not None else []
+
+    def scheduler_attr(name):
+        return lambda: [((), getattr(state.scheduler, name))] if state.scheduler is not None else []
+
+    reg.register(metrics.Gauge("tfws_http_pool_requests_in_flight", "Probe requests sent and not finished.",
+                               collect=lambda: [((), pool.in_flight)]))
+    reg.register(metrics.Gauge("tfws_http_pool_max_connections", "Probe client connection limit.",
+                               collect=lambda: [((), pool.max_connections)]))
+    reg.register(metrics.Counter("tfws_http_pool_requests_total", "Probe requests sent.",
+                                 collect=lambda: [((), pool.sent)]))
+    reg.register(metrics.Gauge("tfws_cache_entries", "Trust-states held in the cache.",
+                               collect=lambda: [((), state.cache.size())]))
+    reg.register(metrics.Gauge("tfws_cache_computations_in_flight", "Trust-state computations running.",
+                               collect=lambda: [((), state.cache.inflight())]))
+    reg.register(metrics.Gauge("tfws_scheduler_tracked_domains", "Domains tracked for background re-scoring.",
+                               collect=scheduler_attr("tracked")))
+    reg.register(metrics.Counter("tfws_scheduler_refreshes_total", "Background re-probes completed.",
+                                 collect=scheduler_attr("refreshed")))
+    reg.register(metrics.Counter("tfws_scheduler_failures_total", "Background re-probes that failed.",
+                                 collect=scheduler_attr("failed")))
+    reg.register(metrics.Gauge("tfws_open_circuits", "Probed hosts whose circuit is open or half-open.",
+                               collect=lambda: [((), state.health.open_circuits())] if state.health is not None else []))
+    reg.register(metrics.Counter("tfws_store_written_total", "Trust-states committed to the store.",
+                                 collect=store_attr("written")))
+    reg.register(metrics.Counter("tfws_store_write_errors_total", "Failed store write batches.",
+                                 collect=store_attr("write_errors")))
+
+
+def _now_z() -> str:
+    return datetime.now(timezone.utc).replace(microsecond=0).isoformat().replace("+00:00", "Z")
+
+
+def _valid_until_z(days: float = 7) -> str:
+    t = datetime.now(timezone.utc).replace(microsecond=0) + timedelta(days=days)
+    return t.isoformat().replace("+00:00", "Z")
+
+
+# TFWS_DEBUG=1 runs full JSON Schema validation on every generated payload.
+DEBUG_VALIDATION = os.environ.get("TFWS_DEBUG", "0") not in ("0", "false", "no", "")
+
+_RESULTS = {"pass", "fail", "warn", "unknown"}
+_GRADES = {"A", "B", "C", "D", "E", "F", "UNKNOWN"}
+
+
+def _schema_errors(payload: Dict[str, Any]) -> List[str]:
+    v = get_validator(SCHEMA_TRUST_STATE)
+    errors = sorted(v.iter_errors(payload), key=lambda e: list(e.path))
+    return [f"{list(e.path)}: {e.message}" for e in errors[:10]]
+
+
+def _construction_errors(payload: Dict[str, Any]) -> List[str]:
+    """
+    Payloads are assembled by build_trust_state_for_domain_async with a fixed
+    shape, so only the values that vary at runtime need checking.
+    """
+    errors = []
+    if len(payload["subject"]["id"]) < 3:
+        errors.append("['subject', 'id']: too short")
+    score = payload["score"]
+    if not 0 <= score["value"] <= 100 or not 0 <= score["confidence"] <= 1 or score["grade"] not in _GRADES:
+        errors.append(f"['score']: out of range {score}")
+    for i, s in enumerate(payload["signals"]):
+        if s["result"] not in _RESULTS or not -100 <= s["weight"] <= 100:
+            errors.append(f"['signals', {i}]: invalid {s['code']}")
+        if not all(isinstance(e, str) for e in s.get("evidence", [])):
+            errors.append(f"['signals', {i}, 'evidence']: not all strings")
+    return errors
+
+
+def _validate(payload: Dict[str, Any]) -> None:
+    mode = "full" if DEBUG_VALIDATION else "fast"
+    with metrics.timed(metrics.VALIDATION_SECONDS, mode, phase="validate"):
+        errors = _schema_errors(payload) if DEBUG_VALIDATION else _construction_errors(payload)
+    if errors:
+        msg = "; ".join(errors)
+        raise HTTPException(status_code=500, detail=f"Generated payload failed schema validation: {msg}")
+
+
+def score_from_signals(signals: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Deterministic reference scoring model.
+
+    - Start at 50
+    - pass: +abs(weight)
+    - fail: -abs(weight)
+    - warn/unknown: 0
+    Confidence increases with count of pass/fail signals.
+    """
+    total = 50.0
+    known = 0
+
+    for s in signals:
+        w = float(s.get("weight", 0))
+        res = s.get("result")
+        if res == "pass":
+            total += abs(w)
+            known += 1
+        elif res == "fail":
+            total -= abs(w)
+            known += 1
+
+    total = max(0.0, min(100.0, total))
+    confidence = min(1.0, 0.25 + 0.15 * known)
+
+    if total >= 90:
+        grade = "A"
+    elif total >= 80:
+        grade = "B"
+    elif total >= 70:
+        grade = "C"
+    elif total >= 60:
+        grade = "D"
+    elif total >= 50:
+        grade = "E"
+    else:
+        grade = "F"
+
+    return {"value": total, "confidence": confidence, "grade": grade}
+
+
+async def build_trust_state_for_domain_async(
+    domain: str,
+    client: httpx.AsyncClient | None = None,
+    deadline: float = DOMAIN_DEADLINE,
+    health: HostHealth | None = None,
+) -> Dict[str, Any]:
+    t0 = time.perf_counter()
+
+    # Signals run concurrently over shared fetches; worst case is the slowest
+    # dependency chain (bounded by deadline).
+    signals = await evaluate_signals(domain, client, deadline=deadline, health=health)
+    for s in signals:
+        metrics.SIGNAL_RESULTS.inc(s["code"], s["result"])
+
+    score = score_from_signals(signals)
+
+    payload: Dict[str, Any] = {
+        "schema_version": "2.0",
+        "subject": {"type": "domain", "id": domain},
+        "computed_at": _now_z(),
+        "valid_until": _valid_until_z(7),
+        "score": score,
+        "signals": signals,
+    }
+
+    if health is not None and health.degraded(domain):
+        # Scored while the host looked dead: expire with the negative TTL so
+        # it is re-probed once the host gets another chance.
+        payload["valid_until"] = _valid_until_z(health.config.negative_ttl / 86400)
+
+    _validate(payload)
+    dt = time.perf_counter() - t0
+    metrics.BUILD_SECONDS.observe(dt)
+    metrics.record_phase("build", dt)
+    return payload
+
+
+def build_trust_state_for_domain(domain: str) -> Dict[str, Any]:
+    """Synchronous wrapper for callers outside an event loop (CLI, tests)."""
+    return asyncio.run(build_trust_state_for_domain_async(domain))
+
+
+async def _probe_and_record(app: FastAPI, domain: str) -> Dict[str, Any]:
+    payload = await build_trust_state_for_domain_async(domain, app.state.http, health=getattr(app.state, "health", None))
+    store = getattr(app.state, "store", None)
+    if store is not None:
+        store.record(payload)
+    return payload
+
+
+# A lease outlives any probe that is still running, so a worker that died
+# mid-probe only delays the others.
+LEASE_TTL = 2 * DOMAIN_DEADLINE
+LEASE_POLL = 0.05
+
+
+async def _probe_shared(app: FastAPI, domain: str, max_age: float) -> Dict[str, Any]:
+    """
+    Probe a domain in one worker only: the lease holder probes and commits
+    the result; the others poll the store until it shows up (or the lease
+    is released or expires, and one of them takes over).
+    """
+    store = app.state.store
+    while True:
+        if await store.claim(domain, LEASE_TTL):
+            try:
+                # stored by the previous holder between our last look and the claim
+                payload = await store.fresh(domain, max_age)
+                if payload is None:
+                    payload = await build_trust_state_for_domain_async(
+                        domain, app.state.http, health=getattr(app.state, "health", None))
+                    await store.record_now(payload)
+                return payload
+            finally:
+                await store.release(domain)
+        await asyncio.sleep(LEASE_POLL)
+        payload = await store.fresh(domain, max_age)
+        if payload is not None:
+            return payload
+
+
+async def _stored_or_computed(app: FastAPI, domain: str) -> Dict[str, Any]:
+    store = getattr(app.state, "store", None)
+    if store is not None:
+        payload = await store.fresh(domain, max_age=app.state.cache.ttl)
+        if payload is not None:
+            return payload
+        if getattr(app.state, "shared", False):
+            return await _probe_shared(app, domain, app.state.cache.ttl)
+    return await _probe_and_record(app, domain)
+
+
+async def _scheduled_probe(app: FastAPI, domain: str, config: SchedulerConfig) -> Dict[str, Any]:
+    if getattr(app.state, "shared", False):
+        # Every worker tracks the domains it served; take a state another
+        # worker re-scored recently enough that it would not be due yet.
+        ttl = app.state.cache.ttl
+        return await _probe_shared(app, domain, max(0.0, ttl - config.lead - config.jitter * ttl))
+    return await _probe_and_record(app, domain)
+
+
+async def _cached_trust_state(app: FastAPI, domain: str):
+    result = await app.state.cache.get(domain, lambda: _stored_or_computed(app, domain))
+    metrics.CACHE_LOOKUPS.inc(result[1])
+    return result
+
+
+@app.get("/api/v1/trust/domain/{domain}")
+async def get_trust_domain(domain: str, request: Request):
+    if not valid_domain(domain):
+        raise HTTPException(status_code=400, detail="Invalid domain format")
+
+    payload, status, age = await _cached_trust_state(request.app, domain)
+    # only single-domain lookups are tracked: a batch sweep is one-off traffic
+    scheduler = getattr(request.app.state, "scheduler", None)
+    if scheduler is not None:
+        scheduler.touch(domain)
+    return JSONResponse(content=payload, headers={"X-Cache": status, "Age": str(int(age))})
+
+
+@app.get("/api/v1/trust/domain/{domain}/history")
+async def get_trust_history(domain: str, request: Request, since: str | None = None, until: str | None = None,
+                            limit: int = 1000):
+    """Stored score and signal history for a domain, newest first (needs TFWS_STORE_PATH)."""
+    if not valid_domain(domain):
+        raise HTTPException(status_code=400, detail="Invalid domain format")
+    store = getattr(request.app.state, "store", None)
+    if store is None:
+        raise HTTPException(status_code=404, detail="History needs a trust-state store (set TFWS_STORE_PATH)")
+    try:
+        history = await store.history(domain, since=since, until=until, limit=max(1, min(limit, 10000)))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="since/until must be ISO8601 timestamps")
+    return {"domain": domain, "history": history}
+
+
+class BatchRequest(BaseModel):
+    domains: List[str] = Field(max_length=MAX_BATCH)
+    concurrency: int = Field(DEFAULT_CONCURRENCY, ge=1, le=512)
+    per_host: int = Field(DEFAULT_PER_HOST, ge=1, le=32)
+
+
+@app.post("/api/v1/trust/batch")
+async def post_trust_batch(body: BatchRequest, request: Request):
+    """
+    Score many domains in one call. Streams NDJSON, one line per domain as
+    soon as it finishes: {"domain", "status": "ok"|"error", "trust_state"|"error"}.
+    """
+    app_ = request.app
+
+    async def evaluate(domain: str) -> Dict[str, Any]:
+        payload, _, _ = await _cached_trust_state(app_, domain)
+        return payload
+
+    results = score_batch(body.domains, evaluate, concurrency=body.concurrency, per_host=body.per_host)
+    return StreamingResponse(ndjson_lines(results), media_type="application/x-ndjson")
+
+
+def _route_label(request: Request) -> str:
+    # Route templates, not raw paths, so domains do not become label values.
+    for route in request.app.router.routes:
+        match, _ = route.matches(request.scope)
+        if match == Match.FULL:
+            return getattr(route, "path", "other")
+    return "other"
+
+
+class InFlightLimit:
+    """
+    Backpressure: past max_in_flight requests in this worker, answer 429 at
+    once. A request holds its slot until its last body chunk is sent, so a
+    streamed batch counts for as long as it is being produced.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        state = scope["app"].state if scope["type"] == "http" else None
+        limit = getattr(state, "max_in_flight", 0)
+        if not limit or scope["path"] == "/metrics":
+            return await self.app(scope, receive, send)
+        if state.in_flight >= limit:
+            response = JSONResponse({"detail": "Too many requests in flight"}, status_code=429,
+                                    headers={"Retry-After": "1"})
+            return await response(scope, receive, send)
+
+        state.in_flight += 1
+        held = True
+
+        def release() -> None:
+            nonlocal held
+            if held:
+                held = False
+                state.in_flight -= 1
+
+        async def send_and_release(message):
+            try:
+                await send(message)
+            finally:
+                if message["type"] == "http.response.body" and not message.get("more_body", False):
+                    release()
+
+        try:
+            await self.app(scope, receive, send_and_release)
+        finally:
+            release()
+
+
+# Added before instrument so instrument stays the outer layer and counts 429s.
+app.add_middleware(InFlightLimit)
+
+
+@app.middleware("http")
+async def instrument(request: Request, call_next):
+    route = _route_label(request)
+    timings = metrics.start_timings() if metrics.SERVER_TIMING else None
+    metrics.REQUESTS_IN_FLIGHT.inc(route)
+    t0 = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+    finally:
+        dt = time.perf_counter() - t0
+        metrics.REQUESTS_IN_FLIGHT.dec(route)
+        metrics.REQUESTS.inc(route, str(status))
+        metrics.REQUEST_SECONDS.observe(dt, route)
+    if timings is not None:
+        timings.add("total", dt)
+        response.headers["Server-Timing"] = timings.header()
+    return response
+
+
+@app.get("/metrics")
+async def get_metrics():
+    return PlainTextResponse(metrics.REGISTRY.render(), media_type=metrics.CONTENT_TYPE)
+
+
+def main():
+    serve_main()
+
+
+if __name__ == "__main__":
+    main()
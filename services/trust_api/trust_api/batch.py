@@ -0,0 +1,118 @@
+from __future__ import annotations
+
+import asyncio
+import json
+from collections import deque
+from typing import Any, AsyncIterator, Awaitable, Callable, Deque, Dict, Iterable
+
+Payload = Dict[str, Any]
+Evaluate = Callable[[str], Awaitable[Payload]]
+
+MAX_BATCH = 100_000
+DEFAULT_CONCURRENCY = 64
+DEFAULT_PER_HOST = 4
+
+_psl = None
+
+
+def _public_suffix_list():
+    global _psl
+    if _psl is None:
+        try:
+            from publicsuffixlist import PublicSuffixList
+        except ImportError:
+            _psl = False
+        else:
+            _psl = PublicSuffixList()  # bundled list, no network
+    return _psl
+
+
+def valid_domain(domain: str) -> bool:
+    return len(domain) >= 3 and "." in domain
+
+
+def host_key(domain: str) -> str:
+    """
+    Politeness key: the registrable domain per the public suffix list, so
+    a.example.co.uk and b.example.co.uk share a per-host limit but unrelated
+    *.co.uk sites do not. Without `publicsuffixlist` installed
+    (`pip install -e "services/trust_api[psl]"`), the full hostname.
+    """
+    host = domain.lower().rstrip(".")
+    psl = _public_suffix_list()
+    if psl:
+        return psl.privatesuffix(host) or host
+    return host
+
+
+async def score_batch(
+    domains: Iterable[str],
+    evaluate: Evaluate,
+    concurrency: int = DEFAULT_CONCURRENCY,
+    per_host: int = DEFAULT_PER_HOST,
+) -> AsyncIterator[Payload]:
+    """
+    Evaluate many domains with at most `concurrency` in flight overall and
+    `per_host` per host key. Yields one result per domain as it finishes
+    (completion order, not input order).
+
+    A domain whose host is at its limit is set aside for that host instead
+    of holding a worker: the worker moves on to the next domain, and each
+    evaluation that finishes for the host picks up its next waiting domain.
+    """
+    todo: asyncio.Queue = asyncio.Queue()
+    for d in domains:
+        todo.put_nowait(d)
+    total = todo.qsize()
+    done: asyncio.Queue = asyncio.Queue()
+    active: Dict[str, int] = {}
+    waiting: Dict[str, Deque[str]] = {}
+
+    async def one(domain: str) -> Payload:
+        try:
+            trust_state = await evaluate(domain)
+        except Exception as e:
+            return {"domain": domain, "status": "error", "error": type(e).__name__}
+        return {"domain": domain, "status": "ok", "trust_state": trust_state}
+
+    async def worker() -> None:
+        while True:
+            try:
+                domain = todo.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            if not valid_domain(domain):
+                await done.put({"domain": domain, "status": "error", "error": "Invalid domain format"})
+                continue
+            key = host_key(domain)
+            if active.get(key, 0) >= per_host:
+                waiting.setdefault(key, deque()).append(domain)
+                continue
+            active[key] = active.get(key, 0) + 1
+            try:
+                while True:
+                    await done.put(await one(domain))
+                    queue = waiting.get(key)
+                    if not queue:
+                        break
+                    domain = queue.popleft()
+                    if not queue:
+                        del waiting[key]
+            finally:
+                active[key] -= 1
+                if not active[key]:
+                    del active[key]
+
+    workers = [asyncio.create_task(worker()) for _ in range(max(1, min(concurrency, total)))]
+    try:
+        for _ in range(total):
+            yield await done.get()
+    finally:
+        for w in workers:
+            w.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+
+
+async def ndjson_lines(results: AsyncIterator[Payload]) -> AsyncIterator[bytes]:
+    async for r in results:
+        yield (json.dumps(r, ensure_ascii=False, separators=(",", ":")) + "\n").encode("utf-8")
@@ -0,0 +1,237 @@
+from __future__ import annotations
+
+import asyncio
+import os
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Dict, Set, Tuple
+
+import httpx
+
+
+Payload = Dict[str, Any]
+Compute = Callable[[], Awaitable[Payload]]
+
+HIT = "HIT"
+STALE = "STALE"
+MISS = "MISS"
+
+
+def _expires_at(payload: Payload) -> float:
+    """Wall-clock expiry declared by the payload itself (valid_until)."""
+    s = payload.get("valid_until")
+    if not s:
+        return float("inf")
+    if s.endswith("Z"):
+        s = s[:-1] + "+00:00"
+    return datetime.fromisoformat(s).astimezone(timezone.utc).timestamp()
+
+
+@dataclass
+class CacheEntry:
+    payload: Payload
+    stored_at: float
+    expires_at: float
+
+
+class TrustStateCache:
+    """
+    Per-domain cache for computed trust-state payloads.
+
+    - fresh (age < ttl): served as HIT
+    - stale (age < ttl + stale_ttl): served as STALE, refreshed in the background
+    - otherwise (or past the payload's valid_until): recomputed, MISS
+
+    Concurrent misses and refreshes for the same domain share one computation.
+    """
+
+    def __init__(self, ttl: float = 300.0, stale_ttl: float = 3600.0, max_entries: int = 10000):
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, CacheEntry]" = OrderedDict()
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self._background: Set[asyncio.Task] = set()
+
+    @classmethod
+    def from_env(cls) -> "TrustStateCache":
+        return cls(
+            ttl=float(os.environ.get("TFWS_CACHE_TTL", 300)),
+            stale_ttl=float(os.environ.get("TFWS_CACHE_STALE_TTL", 3600)),
+            max_entries=int(os.environ.get("TFWS_CACHE_MAX_ENTRIES", 10000)),
+        )
+
+    def _store(self, domain: str, payload: Payload) -> None:
+        self._entries[domain] = CacheEntry(payload, time.monotonic(), _expires_at(payload))
+        self._entries.move_to_end(domain)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _compute(self, domain: str, compute: Compute) -> asyncio.Task:
+        task = self._inflight.get(domain)
+        if task is not None:
+            return task
+
+        async def run() -> Payload:
+            try:
+                payload = await compute()
+                self._store(domain, payload)
+                return payload
+            finally:
+                self._inflight.pop(domain, None)
+
+        task = asyncio.ensure_future(run())
+        self._inflight[domain] = task
+        return task
+
+    def _refresh_in_background(self, domain: str, compute: Compute) -> None:
+        if domain in self._inflight:
+            return
+        task = self._compute(domain, compute)
+        # Keep a reference until done; a failed refresh leaves the stale entry in place.
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+        task.add_done_callback(lambda t: t.cancelled() or t.exception())
+
+    def size(self) -> int:
+        """Trust-states held."""
+        return len(self._entries)
+
+    def inflight(self) -> int:
+        """Computations running (user-triggered or background)."""
+        return len(self._inflight)
+
+    def entry(self, domain: str) -> CacheEntry | None:
+        """Current entry without touching LRU order."""
+        return self._entries.get(domain)
+
+    def refresh(self, domain: str, compute: Compute) -> Awaitable[Payload]:
+        """
+        Recompute now and swap the new payload in when done (joins a
+        computation already in flight). Readers keep getting the old entry
+        until then.
+        """
+        return asyncio.shield(self._compute(domain, compute))
+
+    async def get(self, domain: str, compute: Compute) -> Tuple[Payload, str, float]:
+        """Returns (payload, HIT|STALE|MISS, age_seconds)."""
+        entry = self._entries.get(domain)
+        if entry is not None and time.time() < entry.expires_at:
+            age = time.monotonic() - entry.stored_at
+            if age < self.ttl:
+                self._entries.move_to_end(domain)
+                return entry.payload, HIT, age
+            if age < self.ttl + self.stale_ttl:
+                self._entries.move_to_end(domain)
+                self._refresh_in_background(domain, compute)
+                return entry.payload, STALE, age
+
+        # shield: a cancelled request must not cancel the computation other callers share
+        payload = await asyncio.shield(self._compute(domain, compute))
+        return payload, MISS, 0.0
+
+    async def aclose(self) -> None:
+        for t in list(self._background):
+            t.cancel()
+        await asyncio.gather(*self._background, return_exceptions=True)
+
+
+_BODY_HEADERS = ("content-encoding", "content-length", "transfer-encoding")
+
+
+def _replay_headers(headers: httpx.Headers) -> httpx.Headers:
+    # The remembered body is already decoded; drop framing headers that describe the wire form.
+    out = httpx.Headers(headers)
+    for name in _BODY_HEADERS:
+        if name in out:
+            del out[name]
+    return out
+
+
+@dataclass
+class _Validators:
+    etag: str | None
+    last_modified: str | None
+    headers: httpx.Headers
+    body: bytes | None
+
+
+class RevalidatingTransport(httpx.AsyncBaseTransport):
+    """
+    Adds If-None-Match / If-Modified-Since to HEAD/GET requests for URLs seen
+    before and turns a 304 back into the remembered 200, so an unchanged
+    artifact costs a 304 instead of a full transfer. Probes see plain 200s.
+
+    Remembered bodies are bounded per body (`max_body`) and in total
+    (`max_bytes`); least recently used entries are evicted first.
+    """
+
+    def __init__(
+        self,
+        inner: httpx.AsyncBaseTransport,
+        max_entries: int = 50000,
+        max_body: int = 4 * 1024 * 1024,
+        max_bytes: int = 256 * 1024 * 1024,
+    ):
+        self.inner = inner
+        self.max_entries = max_entries
+        self.max_body = min(max_body, max_bytes)
+        self.max_bytes = max_bytes
+        self._seen: "OrderedDict[Tuple[str, str], _Validators]" = OrderedDict()
+        self.bytes = 0
+
+    def _remember(self, key: Tuple[str, str], entry: _Validators) -> None:
+        self._forget(key)
+        self._seen[key] = entry
+        self.bytes += len(entry.body or b"")
+        while len(self._seen) > self.max_entries or self.bytes > self.max_bytes:
+            _, old = self._seen.popitem(last=False)
+            self.bytes -= len(old.body or b"")
+
+    def _forget(self, key: Tuple[str, str]) -> None:
+        old = self._seen.pop(key, None)
+        if old is not None:
+            self.bytes -= len(old.body or b"")
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        if request.method not in ("GET", "HEAD"):
+            return await self.inner.handle_async_request(request)
+
+        key = (request.method, str(request.url))
+        known = self._seen.get(key)
+        if known is not None:
+            if known.etag:
+                request.headers["If-None-Match"] = known.etag
+            if known.last_modified:
+                request.headers["If-Modified-Since"] = known.last_modified
+
+        response = await self.inner.handle_async_request(request)
+
+        if response.status_code == 304 and known is not None:
+            await response.aclose()
+            self._seen.move_to_end(key)
+            return httpx.Response(200, headers=known.headers, content=known.body or b"", request=request)
+
+        if response.status_code == 200:
+            etag = response.headers.get("ETag")
+            last_modified = response.headers.get("Last-Modified")
+            if etag or last_modified:
+                body = None
+                if request.method == "GET":
+                    # Only small bodies with a declared length are remembered;
+                    # anything else stays a stream for the caller.
+                    length = response.headers.get("Content-Length")
+                    if not length or not length.isdigit() or int(length) > self.max_body:
+                        self._forget(key)
+                        return response
+                    body = await response.aread()
+                headers = _replay_headers(response.headers)
+                self._remember(key, _Validators(etag, last_modified, headers, body))
+                if body is not None:
+                    return httpx.Response(200, headers=headers, content=body, request=request)
+        return response
+
+    async def aclose(self) -> None:
+        await self.inner.aclose()
@@ -0,0 +1,174 @@
+from __future__ import annotations
+
+import asyncio
+import os
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Dict, Optional
+
+import httpx
+
+from .health import HostHealth
+from .metrics import ARTIFACT_BYTES, ARTIFACT_REQUESTS
+
+# Bodies kept in memory (keys, signatures, key histories, ...).
+MAX_ARTIFACT_BYTES = int(os.environ.get("TFWS_MAX_ARTIFACT_BYTES", 1024 * 1024))
+# Bodies streamed to a consumer and never kept (signed inventories).
+MAX_STREAM_BYTES = int(os.environ.get("TFWS_MAX_STREAM_BYTES", 256 * 1024 * 1024))
+
+Sink = Callable[[bytes], None]
+
+
+class TooLarge(Exception):
+    pass
+
+
+@dataclass
+class Fetched:
+    url: str
+    method: str
+    status: Optional[int] = None
+    body: bytes = b""
+    size: int = 0                  # bytes read (streamed bodies are not kept)
+    error: Optional[str] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.status == 200 and self.error is None
+
+
+class ArtifactFetcher:
+    """
+    Per-evaluation fetches, memoized by URL.
+
+    head() is answered by a GET already made or in flight for the URL;
+    get() after a HEAD only sends the GET when the HEAD said 200 (a 404 or
+    a failed HEAD is the answer for both). Bodies are read in chunks and
+    abandoned once past their size limit; stream() hands chunks to a sink
+    without keeping them, for files too large to hold.
+
+    With a HostHealth, requests to hosts known to be dead are answered
+    from it without being sent, and every outcome is reported back.
+    """
+
+    def __init__(
+        self,
+        client: httpx.AsyncClient,
+        max_bytes: int = MAX_ARTIFACT_BYTES,
+        max_stream_bytes: int = MAX_STREAM_BYTES,
+        health: Optional[HostHealth] = None,
+    ):
+        self.client = client
+        self.max_bytes = max_bytes
+        self.max_stream_bytes = max_stream_bytes
+        self.health = health
+        self._heads: Dict[str, asyncio.Task] = {}
+        self._gets: Dict[str, asyncio.Task] = {}
+        self._streamed: set = set()
+        self.requests = 0
+
+    def _short_circuit(self, url: str, method: str) -> Optional[Fetched]:
+        if self.health is None:
+            return None
+        status = self.health.cached_status(url)
+        if status is not None:
+            return Fetched(url, method, status=status)
+        reason = self.health.blocked(url)
+        if reason is not None:
+            return Fetched(url, method, error=reason)
+        return None
+
+    def _record(self, f: Fetched, error: Optional[BaseException]) -> None:
+        if self.health is not None:
+            self.health.record(f.url, status=f.status, error=None if f.status is not None else error)
+
+    async def _read(self, url: str, timeout: float, limit: int, sink: Optional[Sink]) -> Fetched:
+        f = self._short_circuit(url, "GET")
+        if f is not None:
+            return f
+        f = Fetched(url, "GET")
+        buf = bytearray()
+        error: Optional[BaseException] = None
+        try:
+            self.requests += 1
+            ARTIFACT_REQUESTS.inc("GET")
+            async with self.client.stream("GET", url, timeout=timeout) as r:
+                f.status = r.status_code
+                if r.status_code == 200:
+                    declared = r.headers.get("content-length")
+                    if declared and declared.isdigit() and int(declared) > limit:
+                        raise TooLarge(declared)
+                    async for chunk in r.aiter_bytes():
+                        f.size += len(chunk)
+                        if f.size > limit:
+                            raise TooLarge(f.size)
+                        if sink is not None:
+                            sink(chunk)
+                        else:
+                            buf += chunk
+        except TooLarge:
+            f.error = f"too_large (> {limit} bytes)"
+        except asyncio.CancelledError:
+            if self.health is not None:
+                self.health.abandon(url)
+            raise
+        except Exception as e:  # network, TLS, timeout
+            f.error, error = type(e).__name__, e
+        self._record(f, error)
+        ARTIFACT_BYTES.inc(amount=f.size)
+        f.body = bytes(buf)
+        return f
+
+    async def _head(self, url: str, timeout: float) -> Fetched:
+        f = self._short_circuit(url, "HEAD")
+        if f is not None:
+            return f
+        f = Fetched(url, "HEAD")
+        try:
+            self.requests += 1
+            ARTIFACT_REQUESTS.inc("HEAD")
+            r = await self.client.head(url, timeout=timeout)
+        except asyncio.CancelledError:
+            if self.health is not None:
+                self.health.abandon(url)
+            raise
+        except Exception as e:
+            f.error = type(e).__name__
+            self._record(f, e)
+            return f
+        f.status = r.status_code
+        self._record(f, None)
+        if r.status_code in (405, 501):
+            # Some servers don't support HEAD; fall back to GET.
+            return await self._read(url, timeout, self.max_bytes, None)
+        return f
+
+    async def _get_after_head(self, url: str, timeout: float, limit: int) -> Fetched:
+        head = await self._heads[url]
+        if head.method == "GET" or head.status != 200:
+            return head
+        return await self._read(url, timeout, limit, None)
+
+    def head(self, url: str, timeout: float) -> Awaitable[Fetched]:
+        task = self._gets.get(url) or self._heads.get(url)
+        if task is None:
+            task = self._heads[url] = asyncio.ensure_future(self._head(url, timeout))
+        return asyncio.shield(task)  # one consumer giving up must not cancel it for the others
+
+    def get(self, url: str, timeout: float, max_bytes: Optional[int] = None) -> Awaitable[Fetched]:
+        task = self._gets.get(url)
+        if task is None:
+            limit = max_bytes or self.max_bytes
+            coro = self._get_after_head(url, timeout, limit) if url in self._heads else self._read(url, timeout, limit, None)
+            task = self._gets[url] = asyncio.ensure_future(coro)
+        return asyncio.shield(task)
+
+    async def stream(self, url: str, sink: Sink, timeout: float, max_bytes: Optional[int] = None) -> Fetched:
+        """Feed the body to `sink` chunk by chunk; a URL can be streamed once."""
+        if url in self._streamed:
+            raise RuntimeError(f"{url} was already streamed")
+        self._streamed.add(url)
+        return await self._read(url, timeout, max_bytes or self.max_stream_bytes, sink)
+
+    def cancel(self) -> None:
+        for task in (*self._heads.values(), *self._gets.values()):
+            task.cancel()
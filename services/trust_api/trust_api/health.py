@@ -0,0 +1,167 @@
+from __future__ import annotations
+
+import os
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Optional
+from urllib.parse import urlsplit
+
+import httpx
+
+from .metrics import HEALTH_SHORT_CIRCUITS
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+@dataclass
+class HealthConfig:
+    """
+    Per-host failure handling for probes.
+
+    DNS/connect failures (per host) and 404s (per URL) are remembered for
+    `negative_ttl` seconds. `failure_threshold` timeouts in a row open a
+    host's circuit for `open_for` seconds; after that one trial request is
+    let through (half-open). Success closes the circuit, another failure
+    re-opens it for twice as long, up to `max_open_for`.
+    """
+
+    enabled: bool = True
+    negative_ttl: float = 60.0
+    failure_threshold: int = 3
+    open_for: float = 30.0
+    max_open_for: float = 600.0
+    max_entries: int = 100_000
+
+    @classmethod
+    def from_env(cls) -> "HealthConfig":
+        d = cls()
+        return cls(
+            enabled=os.environ.get("TFWS_HEALTH", "1") not in ("0", "false", "no", ""),
+            negative_ttl=float(os.environ.get("TFWS_NEGATIVE_TTL", d.negative_ttl)),
+            failure_threshold=int(os.environ.get("TFWS_BREAKER_THRESHOLD", d.failure_threshold)),
+            open_for=float(os.environ.get("TFWS_BREAKER_OPEN", d.open_for)),
+            max_open_for=float(os.environ.get("TFWS_BREAKER_MAX_OPEN", d.max_open_for)),
+            max_entries=int(os.environ.get("TFWS_HEALTH_MAX_ENTRIES", d.max_entries)),
+        )
+
+
+@dataclass
+class _Host:
+    state: str = CLOSED
+    timeouts: int = 0
+    open_for: float = 0.0
+    reopen_at: float = 0.0
+    trial: bool = False                 # a half-open trial request is in flight
+    unreachable_until: float = 0.0
+    unreachable_reason: str = ""
+
+
+def _host(url: str) -> str:
+    return (urlsplit(url).hostname or "").lower()
+
+
+class HostHealth:
+    """
+    Process-wide view of probed hosts, consulted by every ArtifactFetcher
+    before it sends a request and told the outcome afterwards. Dead hosts
+    then cost nothing instead of a full timeout per artifact and request.
+    """
+
+    def __init__(self, config: Optional[HealthConfig] = None):
+        self.config = config or HealthConfig()
+        self._hosts: "OrderedDict[str, _Host]" = OrderedDict()
+        self._missing: "OrderedDict[str, float]" = OrderedDict()   # url -> 404 remembered until
+
+    @classmethod
+    def from_env(cls) -> Optional["HostHealth"]:
+        config = HealthConfig.from_env()
+        return cls(config) if config.enabled else None
+
+    def _entry(self, host: str) -> _Host:
+        h = self._hosts.get(host)
+        if h is None:
+            h = self._hosts[host] = _Host(open_for=self.config.open_for)
+            while len(self._hosts) > self.config.max_entries:
+                self._hosts.popitem(last=False)
+        self._hosts.move_to_end(host)
+        return h
+
+    def cached_status(self, url: str) -> Optional[int]:
+        """404 for a URL that answered 404 within the negative TTL."""
+        until = self._missing.get(url)
+        if until is None:
+            return None
+        if time.monotonic() < until:
+            HEALTH_SHORT_CIRCUITS.inc("not_found")
+            return 404
+        del self._missing[url]
+        return None
+
+    def blocked(self, url: str) -> Optional[str]:
+        """
+        Why a request to `url` must not be sent now, or None to send it.
+        A None answer for a half-open host makes this request its trial.
+        """
+        h = self._hosts.get(_host(url))
+        if h is None:
+            return None
+        now = time.monotonic()
+        if now < h.unreachable_until:
+            HEALTH_SHORT_CIRCUITS.inc("unreachable")
+            return f"unreachable:{h.unreachable_reason} (cached)"
+        if h.state == OPEN and now >= h.reopen_at:
+            h.state, h.trial = HALF_OPEN, False
+        if h.state == OPEN or (h.state == HALF_OPEN and h.trial):
+            HEALTH_SHORT_CIRCUITS.inc("circuit_open")
+            return "circuit_open"
+        if h.state == HALF_OPEN:
+            h.trial = True
+        return None
+
+    def _open(self, h: _Host, now: float) -> None:
+        if h.state == HALF_OPEN:
+            h.open_for = min(h.open_for * 2, self.config.max_open_for)
+        h.state, h.trial, h.reopen_at = OPEN, False, now + h.open_for
+
+    def record(self, url: str, status: Optional[int] = None, error: Optional[BaseException] = None) -> None:
+        """Outcome of a request that was sent: an HTTP status, or the exception it failed with."""
+        h = self._entry(_host(url))
+        now = time.monotonic()
+        if status is not None:
+            h.state, h.timeouts, h.trial, h.open_for = CLOSED, 0, False, self.config.open_for
+            h.unreachable_until = 0.0
+            if status in (404, 410):
+                self._missing[url] = now + self.config.negative_ttl
+                self._missing.move_to_end(url)
+                while len(self._missing) > self.config.max_entries:
+                    self._missing.popitem(last=False)
+            return
+        if isinstance(error, httpx.TimeoutException):
+            h.timeouts += 1
+            if h.state == HALF_OPEN or h.timeouts >= self.config.failure_threshold:
+                self._open(h, now)
+        elif isinstance(error, httpx.ConnectError):
+            # DNS failure or connection refused
+            h.unreachable_until = now + self.config.negative_ttl
+            h.unreachable_reason = type(error).__name__
+            if h.state == HALF_OPEN:
+                self._open(h, now)
+        elif h.state == HALF_OPEN:
+            h.trial = False
+
+    def abandon(self, url: str) -> None:
+        """A sent request was cancelled before it had an outcome."""
+        h = self._hosts.get(_host(url))
+        if h is not None and h.state == HALF_OPEN:
+            h.trial = False
+
+    def degraded(self, domain: str) -> bool:
+        """True while the host is cached as unreachable or its circuit is not closed."""
+        h = self._hosts.get(domain.lower())
+        return h is not None and (h.state != CLOSED or time.monotonic() < h.unreachable_until)
+
+    def open_circuits(self) -> int:
+        return sum(1 for h in self._hosts.values() if h.state != CLOSED)
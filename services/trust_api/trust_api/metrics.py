@@ -0,0 +1,238 @@
+from __future__ import annotations
+
+import contextvars
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+# Prometheus text exposition (version 0.0.4) without a client library dependency.
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+FAST_BUCKETS = (0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1)
+
+# TFWS_SERVER_TIMING=1 adds a Server-Timing header with per-phase durations.
+SERVER_TIMING = os.environ.get("TFWS_SERVER_TIMING", "0") not in ("0", "false", "no", "")
+
+Labels = Tuple[str, ...]
+
+
+def _escape(v: str) -> str:
+    return v.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _fmt(v: float) -> str:
+    if v == math.inf:
+        return "+Inf"
+    return repr(float(v)) if not float(v).is_integer() else str(int(v))
+
+
+def _labels(names: Sequence[str], values: Labels, extra: str = "") -> str:
+    parts = [f'{n}="{_escape(str(v))}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+    def render(self) -> List[str]:
+        raise NotImplementedError
+
+
+Collect = Callable[[], Iterable[Tuple[Labels, float]]]
+
+
+class Counter(_Metric):
+    """Incremented directly, or read at scrape time from `collect` (label tuple -> total)."""
+
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (), collect: Optional[Collect] = None):
+        super().__init__(name, help, labelnames)
+        self._values: Dict[Labels, float] = {}
+        self.collect = collect
+
+    def inc(self, *labels: str, amount: float = 1.0) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def value(self, *labels: str) -> float:
+        return self._values.get(labels, 0.0)
+
+    def render(self) -> List[str]:
+        items = dict(self._values)
+        if self.collect is not None:
+            items.update(self.collect())
+        return self._header() + [
+            f"{self.name}{_labels(self.labelnames, k)} {_fmt(v)}" for k, v in sorted(items.items())
+        ]
+
+
+class Gauge(_Metric):
+    """Set directly, or computed at scrape time by `collect` (label tuple -> value)."""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (), collect: Optional[Collect] = None):
+        super().__init__(name, help, labelnames)
+        self._values: Dict[Labels, float] = {}
+        self.collect = collect
+
+    def set(self, value: float, *labels: str) -> None:
+        self._values[labels] = value
+
+    def inc(self, *labels: str, amount: float = 1.0) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def dec(self, *labels: str, amount: float = 1.0) -> None:
+        self.inc(*labels, amount=-amount)
+
+    def value(self, *labels: str) -> float:
+        return self._values.get(labels, 0.0)
+
+    def render(self) -> List[str]:
+        items = dict(self._values)
+        if self.collect is not None:
+            items.update(self.collect())
+        return self._header() + [
+            f"{self.name}{_labels(self.labelnames, k)} {_fmt(v)}" for k, v in sorted(items.items())
+        ]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+        # labels -> (per-bucket counts, sum, count)
+        self._values: Dict[Labels, Tuple[List[int], float, int]] = {}
+
+    def observe(self, value: float, *labels: str) -> None:
+        with self._lock:
+            counts, total, n = self._values.get(labels) or ([0] * len(self.buckets), 0.0, 0)
+            for i, b in enumerate(self.buckets):
+                if value <= b:
+                    counts[i] += 1
+                    break
+            self._values[labels] = (counts, total + value, n + 1)
+
+    def count(self, *labels: str) -> int:
+        hit = self._values.get(labels)
+        return hit[2] if hit else 0
+
+    def render(self) -> List[str]:
+        out = self._header()
+        for k, (counts, total, n) in sorted(self._values.items()):
+            cumulative = 0
+            for b, c in zip(self.buckets, counts):
+                cumulative += c
+                le = 'le="' + _fmt(b) + '"'
+                out.append(f"{self.name}_bucket{_labels(self.labelnames, k, le)} {cumulative}")
+            out.append(f"{self.name}_sum{_labels(self.labelnames, k)} {_fmt(total)}")
+            out.append(f"{self.name}_count{_labels(self.labelnames, k)} {n}")
+        return out
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics[metric.name] = metric
+        return metric
+
+    def get(self, name: str) -> Optional[_Metric]:
+        return self._metrics.get(name)
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for m in self._metrics.values():
+            lines.extend(m.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+PROBE_SECONDS = REGISTRY.register(Histogram(
+    "tfws_probe_duration_seconds", "Duration of one probe for one domain.", ["probe"]))
+PROBE_TIMEOUTS = REGISTRY.register(Counter(
+    "tfws_probe_deadline_exceeded_total", "Probes cancelled at the per-domain deadline.", ["probe"]))
+SIGNAL_RESULTS = REGISTRY.register(Counter(
+    "tfws_signal_results_total", "Signal results in generated trust-states.", ["signal", "result"]))
+ARTIFACT_REQUESTS = REGISTRY.register(Counter(
+    "tfws_artifact_requests_total", "Requests for well-known artifacts sent by probes.", ["method"]))
+ARTIFACT_BYTES = REGISTRY.register(Counter(
+    "tfws_artifact_bytes_total", "Artifact body bytes read by probes."))
+HEALTH_SHORT_CIRCUITS = REGISTRY.register(Counter(
+    "tfws_artifact_short_circuits_total", "Artifact requests answered by the host health tracker, not sent.",
+    ["reason"]))
+MINISIGN_SECONDS = REGISTRY.register(Histogram(
+    "tfws_minisign_verify_seconds", "Minisign signature check time (after streaming).", buckets=FAST_BUCKETS))
+VALIDATION_SECONDS = REGISTRY.register(Histogram(
+    "tfws_validation_seconds", "Trust-state payload validation time.", ["mode"], buckets=FAST_BUCKETS))
+BUILD_SECONDS = REGISTRY.register(Histogram(
+    "tfws_trust_state_build_seconds", "Time to probe, score and validate one domain."))
+CACHE_LOOKUPS = REGISTRY.register(Counter(
+    "tfws_cache_lookups_total", "Trust-state cache lookups by outcome.", ["status"]))
+REQUESTS_IN_FLIGHT = REGISTRY.register(Gauge(
+    "tfws_http_requests_in_flight", "API requests being served.", ["route"]))
+REQUESTS = REGISTRY.register(Counter(
+    "tfws_http_requests_total", "API requests served.", ["route", "status"]))
+REQUEST_SECONDS = REGISTRY.register(Histogram(
+    "tfws_http_request_duration_seconds", "API request duration (until headers for streamed responses).", ["route"]))
+
+
+class Timings:
+    """Per-request phase durations for the Server-Timing header."""
+
+    def __init__(self):
+        self.phases: List[Tuple[str, float]] = []
+
+    def add(self, name: str, seconds: float) -> None:
+        self.phases.append((name, seconds))
+
+    def header(self) -> str:
+        return ", ".join(f"{n};dur={s * 1000:.1f}" for n, s in self.phases)
+
+
+_timings: contextvars.ContextVar[Optional[Timings]] = contextvars.ContextVar("tfws_timings", default=None)
+
+
+def start_timings() -> Timings:
+    t = Timings()
+    _timings.set(t)
+    return t
+
+
+def record_phase(name: str, seconds: float) -> None:
+    t = _timings.get()
+    if t is not None:
+        t.add(name, seconds)
+
+
+@contextmanager
+def timed(histogram: Histogram, *labels: str, phase: Optional[str] = None) -> Iterator[None]:
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        dt = time.perf_counter() - t0
+        histogram.observe(dt, *labels)
+        if phase:
+            record_phase(phase, dt)
@@ -0,0 +1,130 @@
+from __future__ import annotations
+
+import os
+from dataclasses import dataclass
+
+import httpx
+
+from .cache import RevalidatingTransport
+
+
+def http2_available() -> bool:
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+@dataclass
+class PoolConfig:
+    """
+    Limits for the process-wide probe client.
+
+    httpx keeps idle connections per origin, so repeated lookups of the same
+    domain (and the pub/inventory/sig fetches of one lookup) reuse warm
+    TCP/TLS connections instead of handshaking again.
+    """
+
+    max_connections: int = 200
+    max_keepalive_connections: int = 50
+    keepalive_expiry: float = 30.0
+    http2: bool = True
+    revalidate: bool = True
+    revalidate_max_bytes: int = 256 * 1024 * 1024
+
+    @classmethod
+    def from_env(cls) -> "PoolConfig":
+        d = cls()
+        return cls(
+            max_connections=int(os.environ.get("TFWS_HTTP_MAX_CONNECTIONS", d.max_connections)),
+            max_keepalive_connections=int(os.environ.get("TFWS_HTTP_MAX_KEEPALIVE", d.max_keepalive_connections)),
+            keepalive_expiry=float(os.environ.get("TFWS_HTTP_KEEPALIVE_EXPIRY", d.keepalive_expiry)),
+            http2=os.environ.get("TFWS_HTTP2", "1") not in ("0", "false", "no"),
+            revalidate=os.environ.get("TFWS_HTTP_REVALIDATE", "1") not in ("0", "false", "no"),
+            revalidate_max_bytes=int(os.environ.get("TFWS_CACHE_MAX_BODY_BYTES", d.revalidate_max_bytes)),
+        )
+
+    def limits(self) -> httpx.Limits:
+        return httpx.Limits(
+            max_connections=self.max_connections,
+            max_keepalive_connections=self.max_keepalive_connections,
+            keepalive_expiry=self.keepalive_expiry,
+        )
+
+
+class PoolStats:
+    """Probe requests counted by the service itself (httpx has no public pool stats)."""
+
+    def __init__(self, max_connections: int = 0):
+        self.max_connections = max_connections
+        self.in_flight = 0          # sent, response body not closed yet
+        self.sent = 0
+
+
+class _CountedStream(httpx.AsyncByteStream):
+    def __init__(self, inner: httpx.AsyncByteStream, done):
+        self._inner = inner
+        self._done = done
+
+    async def __aiter__(self):
+        async for chunk in self._inner:
+            yield chunk
+
+    async def aclose(self) -> None:
+        try:
+            await self._inner.aclose()
+        finally:
+            self._done()
+
+
+class CountingTransport(httpx.AsyncBaseTransport):
+    """Keeps PoolStats up to date for every request sent through `inner`."""
+
+    def __init__(self, inner: httpx.AsyncBaseTransport, stats: PoolStats):
+        self.inner = inner
+        self.stats = stats
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        stats = self.stats
+        stats.sent += 1
+        stats.in_flight += 1
+        open_ = [True]
+
+        def done() -> None:
+            if open_[0]:
+                open_[0] = False
+                stats.in_flight -= 1
+
+        try:
+            response = await self.inner.handle_async_request(request)
+        except BaseException:
+            done()
+            raise
+        if response.is_closed:  # body already in memory
+            done()
+        else:
+            response.stream = _CountedStream(response.stream, done)
+        return response
+
+    async def aclose(self) -> None:
+        await self.inner.aclose()
+
+
+def create_client(config: PoolConfig | None = None, stats: PoolStats | None = None) -> httpx.AsyncClient:
+    """
+    Pooled client for probes. HTTP/2 is only enabled when `h2` is installed.
+    With `revalidate`, repeat fetches are sent as conditional requests.
+    With `stats`, requests on the wire are counted into it.
+    """
+    config = config or PoolConfig()
+    transport: httpx.AsyncBaseTransport = httpx.AsyncHTTPTransport(
+        limits=config.limits(),
+        http2=config.http2 and http2_available(),
+    )
+    if stats is not None:
+        stats.max_connections = config.max_connections
+        transport = CountingTransport(transport, stats)
+    if config.revalidate:
+        transport = RevalidatingTransport(transport, max_bytes=config.revalidate_max_bytes)
+    return httpx.AsyncClient(follow_redirects=True, transport=transport)
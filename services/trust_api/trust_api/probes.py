@@ -0,0 +1,183 @@
+from __future__ import annotations
+
+import asyncio
+import json
+from datetime import datetime, timezone
+from typing import Dict, List
+
+import httpx
+from tfws2.key_epoch import KeyHistoryIndex
+from tfws2.minisign import MessageHasher, MinisignError, parse_public_key, parse_signature
+
+from .metrics import MINISIGN_SECONDS, timed
+from .pool import create_client
+from .fetch import Fetched
+from .health import HostHealth
+from .signals import Evaluation, ProbeResult, SignalRegistry
+
+
+PRESENCE_TIMEOUT = 2.5
+INVENTORY_TIMEOUT = 8.0
+# Total budget for all probes of one domain. Probes run concurrently, so this
+# only needs to cover the slowest single probe, not the sum of all of them.
+DOMAIN_DEADLINE = 9.0
+
+PUBKEY_PATH = "/.well-known/minisign.pub"
+INVENTORY_PATH = "/dumps/sha256.json"
+
+# The signals of every trust-state, in payload order. Each one declares the
+# artifacts it reads and the signals it builds on; an evaluation fetches every
+# artifact once and runs signals concurrently, so adding a signal adds no
+# serial latency unless it depends on another one.
+SIGNALS = SignalRegistry()
+
+SIGNALS.artifact("trust_hub", "/.well-known/ai-trust-hub.json", timeout=PRESENCE_TIMEOUT)
+SIGNALS.artifact("pubkey", PUBKEY_PATH, timeout=PRESENCE_TIMEOUT)
+SIGNALS.artifact("key_history", "/.well-known/key-history.json", timeout=PRESENCE_TIMEOUT)
+SIGNALS.artifact("inventory", INVENTORY_PATH, timeout=INVENTORY_TIMEOUT, stream=True)
+SIGNALS.artifact("inventory_sig", INVENTORY_PATH + ".minisig", timeout=INVENTORY_TIMEOUT)
+
+
+def _status_result(f: Fetched) -> ProbeResult:
+    # a body over its size limit still answers "is it there"
+    if f.status is None:
+        return "unknown", [f.url]
+    if f.status == 200:
+        return "pass", [f.url]
+    if f.status == 404:
+        return "fail", [f.url]
+    return "warn", [f"{f.url} (http:{f.status})"]
+
+
+@SIGNALS.register("schema_valid", 10, ("schemas/trust-state.schema.json",))
+async def schema_valid(ev: Evaluation) -> ProbeResult:
+    # payloads are schema-valid by construction (checked again before serving)
+    return "pass", ["schemas/trust-state.schema.json"]
+
+
+@SIGNALS.register("well_known_present", 15, ("/.well-known/ai-trust-hub.json",), presence=("trust_hub",))
+async def well_known_present(ev: Evaluation) -> ProbeResult:
+    return _status_result(await ev.head("trust_hub"))
+
+
+def _fetch_failure(f: Fetched) -> ProbeResult | None:
+    if f.status is None:
+        return "unknown", [f"{f.url} ({f.error})"]
+    if f.status != 200:
+        return ("fail" if f.status == 404 else "warn"), [f.url]
+    if f.error is not None:
+        return "warn", [f"{f.url} ({f.error})"]
+    return None
+
+
+@SIGNALS.register("inventory_signed", 15, ("sha256.json.minisig (optional)",),
+                  artifacts=("pubkey", "inventory", "inventory_sig"))
+async def inventory_signed(ev: Evaluation) -> ProbeResult:
+    """
+    Verify the inventory signature against minisign.pub. The small key and
+    signature come first, so the hasher knows the algorithm: a prehashed
+    signature has the inventory streamed straight into its hash, never
+    buffered whole or written to disk (legacy ones keep at most 8 MiB).
+    """
+    pub, sig = await asyncio.gather(ev.get("pubkey"), ev.get("inventory_sig"))
+    for f in (pub, sig):
+        failed = _fetch_failure(f)
+        if failed is not None:
+            return failed
+
+    try:
+        pk = parse_public_key(pub.body)
+        s = parse_signature(sig.body)
+    except MinisignError as e:
+        return "fail", [f"{sig.url} ({e})"]
+
+    hasher = MessageHasher.for_signature(s)
+    inv = await ev.stream("inventory", hasher.update)
+    failed = _fetch_failure(inv)
+    if failed is not None:
+        return failed
+
+    with timed(MINISIGN_SECONDS, phase="minisign"):
+        ok, info = hasher.verify(pk, s)
+    if ok:
+        return "pass", [inv.url, sig.url]
+    return "fail", [f"{sig.url} (bad signature)"]
+
+
+@SIGNALS.register("minisign_pubkey_present", 10, (PUBKEY_PATH,), presence=("pubkey",))
+async def minisign_pubkey_present(ev: Evaluation) -> ProbeResult:
+    return _status_result(await ev.head("pubkey"))
+
+
+@SIGNALS.register("key_history_present", 10, ("/.well-known/key-history.json",), presence=("key_history",))
+async def key_history_present(ev: Evaluation) -> ProbeResult:
+    return _status_result(await ev.head("key_history"))
+
+
+def _now_z() -> str:
+    return datetime.now(timezone.utc).replace(microsecond=0).isoformat().replace("+00:00", "Z")
+
+
+@SIGNALS.register("key_epoch_valid", 10, ("key-history.json (optional)",),
+                  artifacts=("key_history", "pubkey"), depends=("key_history_present",))
+async def key_epoch_valid(ev: Evaluation) -> ProbeResult:
+    """
+    The served minisign.pub must be inside a valid, unrevoked epoch of the
+    key history right now. Its entries are those whose pubkey_path is the
+    served key, or whose kid is the served key's id.
+    """
+    present, _ = await ev.result("key_history_present")
+    kh, pub = await asyncio.gather(ev.get("key_history"), ev.get("pubkey"))
+    if present != "pass" or not kh.ok:
+        return "unknown", [f"{kh.url} ({kh.error or 'not available'})"]
+    try:
+        index = KeyHistoryIndex.from_document(json.loads(kh.body))
+    except (ValueError, KeyError, TypeError, AttributeError) as e:
+        return "fail", [f"{kh.url} (invalid: {type(e).__name__})"]
+
+    served = {PUBKEY_PATH, ev.url(PUBKEY_PATH)}
+    if pub.ok:
+        try:
+            served.add(parse_public_key(pub.body).key_id_hex)
+        except MinisignError:
+            pass
+    kids = index.kids_for(served)
+    if not kids:
+        return "warn", [f"{kh.url} (no epoch for {PUBKEY_PATH})"]
+    now = _now_z()
+    decisions = [index.check(kid, now) for kid in kids]
+    ok = [d for d in decisions if d.ok]
+    if ok:
+        return "pass", [f"{kh.url} (kid:{ok[0].kid})"]
+    return "fail", [f"{kh.url} (kid:{d.kid} {d.reason})" for d in decisions]
+
+
+async def run_probes(
+    domain: str,
+    client: httpx.AsyncClient | None = None,
+    deadline: float = DOMAIN_DEADLINE,
+    health: HostHealth | None = None,
+) -> Dict[str, ProbeResult]:
+    """
+    Evaluate every signal in SIGNALS for one domain on a shared client.
+
+    Signals still running when `deadline` seconds have elapsed are cancelled
+    and reported as unknown, so a domain never costs more than `deadline`.
+    """
+    if client is None:
+        async with create_client() as c:
+            return await SIGNALS.run(domain, c, deadline, health)
+    return await SIGNALS.run(domain, client, deadline, health)
+
+
+async def evaluate_signals(
+    domain: str,
+    client: httpx.AsyncClient | None = None,
+    deadline: float = DOMAIN_DEADLINE,
+    health: HostHealth | None = None,
+) -> List[Dict]:
+    """The payload's `signals` list for one domain."""
+    if client is None:
+        async with create_client() as c:
+            return await SIGNALS.evaluate(domain, c, deadline, health)
+    return await SIGNALS.evaluate(domain, client, deadline, health)
@@ -0,0 +1,176 @@
+from __future__ import annotations
+
+import asyncio
+import heapq
+import os
+import random
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional, Tuple
+
+from .batch import host_key
+from .cache import TrustStateCache
+
+Payload = Dict[str, Any]
+Probe = Callable[[str], Awaitable[Payload]]
+
+
+@dataclass
+class SchedulerConfig:
+    """
+    Proactive re-scoring of tracked domains.
+
+    A tracked domain is re-probed `lead` seconds (minus up to `jitter` x
+    cache TTL, so a sweep does not land at one instant) before its cache
+    entry stops being fresh or its payload's valid_until passes. Domains
+    not requested for `idle` seconds stop being tracked.
+    """
+
+    enabled: bool = False
+    lead: float = 30.0
+    jitter: float = 0.1
+    concurrency: int = 16
+    per_host: int = 2
+    max_tracked: int = 10000
+    idle: float = 86400.0
+    retry_after: float = 60.0
+
+    @classmethod
+    def from_env(cls) -> "SchedulerConfig":
+        d = cls()
+        return cls(
+            enabled=os.environ.get("TFWS_SCHEDULER", "0") not in ("0", "false", "no", ""),
+            lead=float(os.environ.get("TFWS_SCHEDULER_LEAD", d.lead)),
+            jitter=float(os.environ.get("TFWS_SCHEDULER_JITTER", d.jitter)),
+            concurrency=int(os.environ.get("TFWS_SCHEDULER_CONCURRENCY", d.concurrency)),
+            per_host=int(os.environ.get("TFWS_SCHEDULER_PER_HOST", d.per_host)),
+            max_tracked=int(os.environ.get("TFWS_SCHEDULER_MAX_TRACKED", d.max_tracked)),
+            idle=float(os.environ.get("TFWS_SCHEDULER_IDLE", d.idle)),
+            retry_after=float(os.environ.get("TFWS_SCHEDULER_RETRY", d.retry_after)),
+        )
+
+
+class RefreshScheduler:
+    """
+    Min-heap of (due, domain) on the monotonic clock. The run loop sleeps
+    until the earliest due time, then re-probes due domains through
+    TrustStateCache.refresh(), which swaps the fresh payload in atomically
+    (and joins a user-triggered computation already in flight). Readers
+    never wait for it: they keep getting the previous payload as a HIT.
+    """
+
+    def __init__(self, cache: TrustStateCache, probe: Probe, config: Optional[SchedulerConfig] = None):
+        self.cache = cache
+        self.probe = probe
+        self.config = config or SchedulerConfig()
+        self._heap: List[Tuple[float, int, str]] = []
+        self._due: Dict[str, float] = {}          # live heap entry per domain (others are stale)
+        self._refreshing: set = set()
+        self._last_seen: Dict[str, float] = {}
+        self._seq = 0
+        self._wake = asyncio.Event()
+        self._slots = asyncio.Semaphore(self.config.concurrency)
+        self._active: Dict[str, int] = {}         # refreshes running per host key
+        self._waiting: Dict[str, Deque[str]] = {}  # due domains of hosts at per_host
+        self._tasks: set = set()
+        self._runner: Optional[asyncio.Task] = None
+        self.refreshed = 0
+        self.failed = 0
+
+    @property
+    def tracked(self) -> int:
+        return len(self._due) + len(self._refreshing)
+
+    def start(self) -> None:
+        if self._runner is None:
+            self._runner = asyncio.ensure_future(self._run())
+
+    async def aclose(self) -> None:
+        tasks = [t for t in (self._runner, *self._tasks) if t is not None]
+        for t in tasks:
+            t.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._runner = None
+
+    def _next_due(self, domain: str) -> float:
+        now = time.monotonic()
+        entry = self.cache.entry(domain)
+        if entry is None:
+            return now
+        fresh_until = entry.stored_at + self.cache.ttl
+        valid_until = now + (entry.expires_at - time.time())
+        jitter = random.uniform(0, self.config.jitter * self.cache.ttl)
+        return max(now, min(fresh_until, valid_until) - self.config.lead - jitter)
+
+    def _schedule(self, domain: str, due: float) -> None:
+        self._seq += 1
+        self._due[domain] = due
+        heapq.heappush(self._heap, (due, self._seq, domain))
+        if self._heap[0][2] == domain:
+            self._wake.set()
+
+    def touch(self, domain: str) -> None:
+        """Mark a domain as requested; starts tracking it if there is room."""
+        if domain not in self._due and domain not in self._refreshing:
+            if self.tracked >= self.config.max_tracked:
+                return  # untracked domains leave nothing behind
+            self._schedule(domain, self._next_due(domain))
+        self._last_seen[domain] = time.monotonic()
+
+    async def _refresh(self, domain: str, key: str) -> None:
+        try:
+            while True:
+                try:
+                    await self.cache.refresh(domain, lambda d=domain: self.probe(d))
+                    self.refreshed += 1
+                    due = self._next_due(domain)
+                except Exception:
+                    # keep serving the previous payload; try again later
+                    self.failed += 1
+                    due = time.monotonic() + self.config.retry_after * random.uniform(0.5, 1.0)
+                self._refreshing.discard(domain)
+                self._schedule(domain, due)
+                # go on with the host's next due domain while holding its permit and slot
+                queue = self._waiting.get(key)
+                if not queue:
+                    break
+                domain = queue.popleft()
+                if not queue:
+                    del self._waiting[key]
+        finally:
+            self._slots.release()
+            self._active[key] -= 1
+            if not self._active[key]:
+                del self._active[key]
+
+    async def _run(self) -> None:
+        while True:
+            now = time.monotonic()
+            while self._heap and self._heap[0][0] <= now:
+                due, _, domain = heapq.heappop(self._heap)
+                if self._due.get(domain) != due:
+                    continue
+                del self._due[domain]
+                if now - self._last_seen.get(domain, now) > self.config.idle:
+                    self._last_seen.pop(domain, None)
+                    continue
+                self._refreshing.add(domain)
+                key = host_key(domain)
+                if self._active.get(key, 0) >= self.config.per_host:
+                    # a refresh of this host picks it up; don't wait for the host holding a slot
+                    self._waiting.setdefault(key, deque()).append(domain)
+                    continue
+                self._active[key] = self._active.get(key, 0) + 1
+                await self._slots.acquire()
+                task = asyncio.ensure_future(self._refresh(domain, key))
+                self._tasks.add(task)
+                task.add_done_callback(self._tasks.discard)
+                now = time.monotonic()
+
+            self._wake.clear()
+            timeout = self._heap[0][0] - now if self._heap else None
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=timeout)
+            except asyncio.TimeoutError:
+                pass
@@ -0,0 +1,80 @@
+from __future__ import annotations
+
+import argparse
+import logging
+import os
+import tempfile
+from dataclasses import dataclass
+
+log = logging.getLogger(__name__)
+
+
+@dataclass
+class ServeConfig:
+    """
+    How the API is served.
+
+    `workers` processes accept on one socket. Each one admits at most
+    `max_in_flight` requests at a time (0: no limit) and answers the rest
+    with 429. On SIGTERM/SIGINT a worker stops accepting, gives requests in
+    flight `graceful_timeout` seconds to finish, then shuts down (scheduler
+    stopped, store flushed).
+    """
+
+    host: str = "127.0.0.1"
+    port: int = 8787
+    workers: int = 1
+    max_in_flight: int = 256
+    graceful_timeout: float = 30.0
+    backlog: int = 2048
+
+    @classmethod
+    def from_env(cls) -> "ServeConfig":
+        d = cls()
+        return cls(
+            host=os.environ.get("TFWS_HOST", d.host),
+            port=int(os.environ.get("TFWS_PORT", d.port)),
+            workers=int(os.environ.get("TFWS_WORKERS", d.workers)),
+            max_in_flight=int(os.environ.get("TFWS_MAX_IN_FLIGHT", d.max_in_flight)),
+            graceful_timeout=float(os.environ.get("TFWS_GRACEFUL_TIMEOUT", d.graceful_timeout)),
+            backlog=int(os.environ.get("TFWS_BACKLOG", d.backlog)),
+        )
+
+
+def parse_args(argv=None) -> ServeConfig:
+    d = ServeConfig.from_env()
+    ap = argparse.ArgumentParser(prog="tfws2-trust-api", description="Serve the TFWS v2 Trust API.")
+    ap.add_argument("--host", default=d.host, help=f"bind address (default {d.host})")
+    ap.add_argument("--port", type=int, default=d.port)
+    ap.add_argument("--workers", type=int, default=d.workers, help="worker processes")
+    ap.add_argument("--max-in-flight", type=int, default=d.max_in_flight,
+                    help="requests per worker before answering 429 (0: no limit)")
+    ap.add_argument("--graceful-timeout", type=float, default=d.graceful_timeout,
+                    help="seconds in-flight requests get to finish on shutdown")
+    ap.add_argument("--backlog", type=int, default=d.backlog)
+    args = ap.parse_args(argv)
+    return ServeConfig(args.host, args.port, max(1, args.workers), max(0, args.max_in_flight),
+                       args.graceful_timeout, args.backlog)
+
+
+def main(argv=None) -> None:
+    import uvicorn
+
+    config = parse_args(argv)
+    # Workers are fresh processes that configure themselves from the environment.
+    os.environ["TFWS_WORKERS"] = str(config.workers)
+    os.environ["TFWS_MAX_IN_FLIGHT"] = str(config.max_in_flight)
+    if config.workers > 1 and not os.environ.get("TFWS_STORE_PATH"):
+        # the store is how workers share trust-states and probe leases
+        path = os.path.join(tempfile.gettempdir(), f"tfws-trust-api-{config.port}.db")
+        os.environ["TFWS_STORE_PATH"] = path
+        log.warning("TFWS_STORE_PATH not set; workers share %s", path)
+    uvicorn.run(
+        "trust_api.app:app",
+        host=config.host,
+        port=config.port,
+        workers=config.workers,
+        backlog=config.backlog,
+        timeout_graceful_shutdown=config.graceful_timeout,
+        reload=False,
+    )
@@ -0,0 +1,195 @@
+from __future__ import annotations
+
+import asyncio
+import time
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Iterator, List, Optional, Tuple
+
+import httpx
+
+from .fetch import ArtifactFetcher, Fetched, Sink
+from .health import HostHealth
+from .metrics import PROBE_SECONDS, PROBE_TIMEOUTS, record_phase
+
+ProbeResult = Tuple[str, List[str]]
+
+
+@dataclass(frozen=True)
+class Artifact:
+    """A file on the probed domain that one or more signals read."""
+
+    name: str
+    path: str
+    timeout: float = 2.5
+    max_bytes: Optional[int] = None    # default: fetch.MAX_ARTIFACT_BYTES / MAX_STREAM_BYTES
+    stream: bool = False               # fed to its one consumer in chunks, never kept
+
+
+EvaluateFn = Callable[["Evaluation"], Awaitable[ProbeResult]]
+
+
+@dataclass(frozen=True)
+class Signal:
+    code: str
+    weight: int
+    evidence: Tuple[str, ...]              # shown while the result is unknown
+    evaluate: EvaluateFn
+    artifacts: Tuple[str, ...] = ()        # bodies it reads
+    presence: Tuple[str, ...] = ()         # artifacts it only needs the status of
+    depends: Tuple[str, ...] = ()
+
+
+class Evaluation:
+    """
+    One domain's run: artifacts come from one ArtifactFetcher (each URL
+    requested once) and every signal is computed at most once; signals
+    await exactly what they read.
+    """
+
+    def __init__(
+        self, registry: "SignalRegistry", domain: str, client: httpx.AsyncClient, health: Optional[HostHealth] = None,
+    ):
+        self.registry = registry
+        self.domain = domain
+        self.fetcher = ArtifactFetcher(client, health=health)
+        self._signals: Dict[str, asyncio.Task] = {}
+
+    def url(self, path: str) -> str:
+        return f"https://{self.domain}{path}"
+
+    def head(self, name: str) -> Awaitable[Fetched]:
+        """Status of an artifact (answered by its GET when one is made anyway)."""
+        a = self.registry.artifacts[name]
+        return self.fetcher.head(self.url(a.path), a.timeout)
+
+    def get(self, name: str) -> Awaitable[Fetched]:
+        a = self.registry.artifacts[name]
+        return self.fetcher.get(self.url(a.path), a.timeout, a.max_bytes)
+
+    async def stream(self, name: str, sink: Sink) -> Fetched:
+        a = self.registry.artifacts[name]
+        return await self.fetcher.stream(self.url(a.path), sink, a.timeout, a.max_bytes)
+
+    async def _run(self, s: Signal) -> ProbeResult:
+        if not (s.artifacts or s.presence):
+            return await s.evaluate(self)
+        t0 = time.perf_counter()
+        try:
+            return await s.evaluate(self)
+        finally:
+            dt = time.perf_counter() - t0
+            PROBE_SECONDS.observe(dt, s.code)
+            record_phase(f"probe_{s.code}", dt)
+
+    def result(self, code: str) -> Awaitable[ProbeResult]:
+        task = self._signals.get(code)
+        if task is None:
+            task = self._signals[code] = asyncio.ensure_future(self._run(self.registry[code]))
+        return task
+
+    def cancel(self) -> None:
+        for task in self._signals.values():
+            task.cancel()
+        self.fetcher.cancel()
+
+
+class SignalRegistry:
+    """
+    Signals in payload order. A signal may only depend on signals registered
+    before it, so the dependency graph cannot have cycles.
+    """
+
+    def __init__(self):
+        self.artifacts: Dict[str, Artifact] = {}
+        self._signals: Dict[str, Signal] = {}
+        self._bodies: set = set()           # artifacts some signal reads the body of
+        self._heads: set = set()            # artifacts some signal only needs the status of
+
+    def artifact(
+        self, name: str, path: str, timeout: float = 2.5, max_bytes: Optional[int] = None, stream: bool = False,
+    ) -> Artifact:
+        a = self.artifacts[name] = Artifact(name, path, timeout, max_bytes, stream)
+        return a
+
+    def register(
+        self,
+        code: str,
+        weight: int,
+        evidence: Tuple[str, ...] = (),
+        artifacts: Tuple[str, ...] = (),
+        presence: Tuple[str, ...] = (),
+        depends: Tuple[str, ...] = (),
+    ) -> Callable[[EvaluateFn], EvaluateFn]:
+        for name in (*artifacts, *presence):
+            if name not in self.artifacts:
+                raise ValueError(f"signal {code}: unknown artifact {name!r}")
+            if self.artifacts[name].stream and (name in presence or name in self._bodies):
+                raise ValueError(f"signal {code}: streamed artifact {name!r} has one reader and no HEAD")
+        for dep in depends:
+            if dep not in self._signals:
+                raise ValueError(f"signal {code}: depends on unregistered signal {dep!r}")
+
+        def decorator(fn: EvaluateFn) -> EvaluateFn:
+            self._signals[code] = Signal(code, weight, tuple(evidence), fn, tuple(artifacts), tuple(presence),
+                                         tuple(depends))
+            self._bodies.update(artifacts)
+            self._heads.update(presence)
+            return fn
+
+        return decorator
+
+    def __getitem__(self, code: str) -> Signal:
+        return self._signals[code]
+
+    def __iter__(self) -> Iterator[Signal]:
+        return iter(self._signals.values())
+
+    def __len__(self) -> int:
+        return len(self._signals)
+
+    async def run(
+        self, domain: str, client: httpx.AsyncClient, deadline: float, health: Optional[HostHealth] = None,
+    ) -> Dict[str, ProbeResult]:
+        """
+        Start every artifact fetch and every signal at once; results still
+        missing after `deadline` seconds are cancelled and reported unknown.
+
+        An artifact whose body some signal reads gets one GET, which also
+        answers status-only readers; the others get a HEAD. Streamed
+        artifacts start when their reader asks for them.
+        """
+        ev = Evaluation(self, domain, client, health)
+        for name, a in self.artifacts.items():
+            if a.stream:
+                continue
+            if name in self._bodies:
+                ev.get(name)
+            elif name in self._heads:
+                ev.head(name)
+        tasks = {s.code: ev.result(s.code) for s in self}
+        done, pending = await asyncio.wait(tasks.values(), timeout=deadline)
+        ev.cancel()
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+
+        results: Dict[str, ProbeResult] = {}
+        for code, t in tasks.items():
+            if t in done and t.exception() is None:
+                results[code] = t.result()
+            elif t in done:
+                results[code] = ("unknown", [f"{code} ({type(t.exception()).__name__})"])
+            else:
+                PROBE_TIMEOUTS.inc(code)
+                results[code] = ("unknown", [f"{code} (deadline:{deadline:g}s)"])
+        return results
+
+    async def evaluate(
+        self, domain: str, client: httpx.AsyncClient, deadline: float, health: Optional[HostHealth] = None,
+    ) -> List[Dict[str, Any]]:
+        """Payload `signals` list, assembled in one pass in registration order."""
+        results = await self.run(domain, client, deadline, health)
+        out = []
+        for s in self:
+            result, evidence = results[s.code]
+            out.append({"code": s.code, "weight": s.weight, "result": result, "evidence": evidence or list(s.evidence)})
+        return out
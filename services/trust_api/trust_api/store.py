@@ -0,0 +1,266 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import os
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+Payload = Dict[str, Any]
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS trust_states (
+    id INTEGER PRIMARY KEY,
+    domain TEXT NOT NULL,
+    computed_at REAL NOT NULL,
+    valid_until REAL,
+    score REAL,
+    confidence REAL,
+    grade TEXT,
+    payload TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS trust_states_domain_time ON trust_states (domain, computed_at);
+CREATE TABLE IF NOT EXISTS signal_results (
+    state_id INTEGER NOT NULL REFERENCES trust_states (id),
+    domain TEXT NOT NULL,
+    computed_at REAL NOT NULL,
+    code TEXT NOT NULL,
+    result TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS signal_results_domain_code_time ON signal_results (domain, code, computed_at);
+CREATE TABLE IF NOT EXISTS probe_leases (
+    domain TEXT PRIMARY KEY,
+    owner TEXT NOT NULL,
+    expires_at REAL NOT NULL
+);
+"""
+
+
+def _ts(s: Optional[str]) -> Optional[float]:
+    if not s:
+        return None
+    if s.endswith("Z"):
+        s = s[:-1] + "+00:00"
+    return datetime.fromisoformat(s).astimezone(timezone.utc).timestamp()
+
+
+def _iso(t: float) -> str:
+    return datetime.fromtimestamp(t, timezone.utc).replace(microsecond=0).isoformat().replace("+00:00", "Z")
+
+
+def _connect(path: str) -> sqlite3.Connection:
+    conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA busy_timeout=5000")
+    return conn
+
+
+class TrustStore:
+    """
+    Append-only SQLite (WAL) history of computed trust-states and their
+    signal results, per domain.
+
+    record() only queues; a background task writes queued payloads in one
+    transaction every `flush_interval` seconds or once `batch_size` are
+    waiting, so batch sweeps cost one commit per batch, not per domain.
+    Reads and writes run on their own single-thread executors (one SQLite
+    connection each), never on the event loop.
+
+    Processes sharing the file (API workers) coordinate through probe
+    leases: claim() lets one of them probe a domain while the others wait
+    for its result, which record_now() commits before the lease is released.
+    """
+
+    def __init__(self, path: str, batch_size: int = 500, flush_interval: float = 0.5):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._writer = _connect(path)
+        self._writer.executescript(_SCHEMA)
+        self._reader = _connect(path)
+        self._write_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="tfws-store-w")
+        self._read_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="tfws-store-r")
+        self._pending: List[Tuple[Payload, float]] = []
+        # domain -> (computed_at, payload) recorded but not committed yet, so reads see it
+        self._unflushed: Dict[str, Tuple[float, Payload]] = {}
+        self._wake: Optional[asyncio.Event] = None
+        self._flusher: Optional[asyncio.Task] = None
+        self.owner = str(os.getpid())
+        self.written = 0
+        self.write_errors = 0
+
+    @classmethod
+    def from_env(cls) -> Optional["TrustStore"]:
+        """TFWS_STORE_PATH enables the store; unset means no persistence."""
+        path = os.environ.get("TFWS_STORE_PATH")
+        if not path:
+            return None
+        return cls(
+            path,
+            batch_size=int(os.environ.get("TFWS_STORE_BATCH", 500)),
+            flush_interval=float(os.environ.get("TFWS_STORE_FLUSH_INTERVAL", 0.5)),
+        )
+
+    # -- writes ----------------------------------------------------------
+
+    def _write(self, batch: List[Tuple[Payload, float]]) -> None:
+        cur = self._writer.cursor()
+        cur.execute("BEGIN")
+        try:
+            for payload, recorded_at in batch:
+                score = payload.get("score") or {}
+                computed_at = _ts(payload.get("computed_at")) or recorded_at
+                domain = payload["subject"]["id"]
+                cur.execute(
+                    "INSERT INTO trust_states (domain, computed_at, valid_until, score, confidence, grade, payload)"
+                    " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (domain, computed_at, _ts(payload.get("valid_until")), score.get("value"),
+                     score.get("confidence"), score.get("grade"), json.dumps(payload, separators=(",", ":"))),
+                )
+                state_id = cur.lastrowid
+                cur.executemany(
+                    "INSERT INTO signal_results (state_id, domain, computed_at, code, result) VALUES (?, ?, ?, ?, ?)",
+                    [(state_id, domain, computed_at, s.get("code"), s.get("result")) for s in payload.get("signals") or []],
+                )
+            cur.execute("COMMIT")
+        except BaseException:
+            cur.execute("ROLLBACK")
+            raise
+        self.written += len(batch)
+
+    def record(self, payload: Payload) -> None:
+        """Queue a computed payload for the next batched write."""
+        recorded_at = time.time()
+        self._pending.append((payload, recorded_at))
+        self._unflushed[payload["subject"]["id"]] = (_ts(payload.get("computed_at")) or recorded_at, payload)
+        if self._flusher is None:
+            self._wake = asyncio.Event()
+            self._flusher = asyncio.ensure_future(self._flush_loop())
+        if len(self._pending) >= self.batch_size:
+            self._wake.set()
+
+    async def record_now(self, payload: Payload) -> None:
+        """Write one payload before returning, so other processes see it at once."""
+        await asyncio.get_running_loop().run_in_executor(self._write_pool, self._write, [(payload, time.time())])
+
+    def _claim(self, domain: str, ttl: float) -> bool:
+        now = time.time()
+        cur = self._writer.execute(
+            "INSERT INTO probe_leases (domain, owner, expires_at) VALUES (?, ?, ?)"
+            " ON CONFLICT (domain) DO UPDATE SET owner = excluded.owner, expires_at = excluded.expires_at"
+            " WHERE probe_leases.expires_at <= ?",
+            (domain, self.owner, now + ttl, now),
+        )
+        return cur.rowcount == 1
+
+    def _release(self, domain: str) -> None:
+        self._writer.execute("DELETE FROM probe_leases WHERE domain = ? AND owner = ?", (domain, self.owner))
+
+    async def claim(self, domain: str, ttl: float) -> bool:
+        """Take the probe lease for a domain unless another process holds an unexpired one."""
+        return await asyncio.get_running_loop().run_in_executor(self._write_pool, self._claim, domain, ttl)
+
+    async def release(self, domain: str) -> None:
+        await asyncio.get_running_loop().run_in_executor(self._write_pool, self._release, domain)
+
+    async def flush(self) -> None:
+        while self._pending:
+            batch, self._pending = self._pending[: self.batch_size], self._pending[self.batch_size:]
+            try:
+                await asyncio.get_running_loop().run_in_executor(self._write_pool, self._write, batch)
+            except sqlite3.Error:
+                self._pending[:0] = batch  # retried on the next flush
+                raise
+            for payload, _ in batch:
+                domain = payload["subject"]["id"]
+                if self._unflushed.get(domain, (0, None))[1] is payload:
+                    del self._unflushed[domain]
+
+    async def _flush_loop(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            try:
+                await self.flush()
+            except sqlite3.Error:
+                self.write_errors += 1
+
+    # -- reads -----------------------------------------------------------
+
+    def _latest(self, domain: str) -> Optional[Tuple[float, Payload]]:
+        row = self._reader.execute(
+            "SELECT computed_at, payload FROM trust_states WHERE domain = ? ORDER BY computed_at DESC, id DESC LIMIT 1",
+            (domain,),
+        ).fetchone()
+        return (row[0], json.loads(row[1])) if row else None
+
+    async def latest(self, domain: str) -> Optional[Tuple[float, Payload]]:
+        """(computed_at epoch seconds, payload) of the newest stored state, or None."""
+        hit = self._unflushed.get(domain)
+        if hit is not None:
+            return hit
+        return await asyncio.get_running_loop().run_in_executor(self._read_pool, self._latest, domain)
+
+    async def fresh(self, domain: str, max_age: float) -> Optional[Payload]:
+        """Newest stored payload if computed within `max_age` seconds and still valid."""
+        hit = await self.latest(domain)
+        if hit is None:
+            return None
+        computed_at, payload = hit
+        now = time.time()
+        valid_until = _ts(payload.get("valid_until"))
+        if now - computed_at >= max_age or (valid_until is not None and now >= valid_until):
+            return None
+        return payload
+
+    def _history(self, domain: str, since: Optional[float], until: Optional[float], limit: int) -> List[Dict[str, Any]]:
+        rows = self._reader.execute(
+            "SELECT id, computed_at, score, confidence, grade FROM trust_states"
+            " WHERE domain = ? AND computed_at >= ? AND computed_at <= ?"
+            " ORDER BY computed_at DESC, id DESC LIMIT ?",
+            (domain, since if since is not None else float("-inf"), until if until is not None else float("inf"), limit),
+        ).fetchall()
+        if not rows:
+            return []
+        ids = [r[0] for r in rows]
+        signals: Dict[int, Dict[str, str]] = {i: {} for i in ids}
+        marks = ",".join("?" * len(ids))
+        for state_id, code, result in self._reader.execute(
+            f"SELECT state_id, code, result FROM signal_results WHERE state_id IN ({marks})", ids
+        ):
+            signals[state_id][code] = result
+        return [
+            {"computed_at": _iso(t), "score": s, "confidence": c, "grade": g, "signals": signals[i]}
+            for i, t, s, c, g in rows
+        ]
+
+    async def history(
+        self,
+        domain: str,
+        since: Optional[str] = None,
+        until: Optional[str] = None,
+        limit: int = 1000,
+    ) -> List[Dict[str, Any]]:
+        """Score and signal history for a domain, newest first, between ISO8601 bounds."""
+        await self.flush()
+        return await asyncio.get_running_loop().run_in_executor(
+            self._read_pool, self._history, domain, _ts(since), _ts(until), limit
+        )
+
+    async def aclose(self) -> None:
+        if self._flusher is not None:
+            self._flusher.cancel()
+            await asyncio.gather(self._flusher, return_exceptions=True)
+            self._flusher = None
+        await self.flush()
+        self._write_pool.shutdown(wait=True)
+        self._read_pool.shutdown(wait=True)
+        self._writer.close()
+        self._reader.close()
@@ -0,0 +1,129 @@
+import asyncio
+import json
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from tfws2.client import RetryPolicy, TrustAPIError, TrustClient, TrustStateLRU
+from tfws2.policy import compile_policy
+
+httpx = pytest.importorskip("httpx")
+
+
+def _state(domain, valid_for=3600):
+    until = datetime.now(timezone.utc) + timedelta(seconds=valid_for)
+    return {
+        "subject": {"type": "domain", "id": domain},
+        "valid_until": until.strftime("%Y-%m-%dT%H:%M:%SZ"),
+        "score": {"grade": "A", "confidence": 0.9},
+        "signals": [],
+    }
+
+
+def test_retries_hedges_and_caches_single_lookups():
+    calls = {"flaky.example": 0, "slow.example": 0}
+
+    async def handler(request):
+        domain = request.url.path.rsplit("/", 1)[-1]
+        calls[domain] += 1
+        if domain == "flaky.example" and calls[domain] < 3:
+            return httpx.Response(503)
+        if domain == "slow.example" and calls[domain] == 1:
+            await asyncio.sleep(5)
+        return httpx.Response(200, json=_state(domain))
+
+    async def run():
+        client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        retry = RetryPolicy(attempts=3, backoff=0.001, hedge_after=0.05)
+        async with TrustClient("http://api", retry=retry, client=client) as tc:
+            policy = compile_policy({})
+            assert (await tc.decide("flaky.example", policy))["decision"] == "allow"
+            assert (await tc.get("slow.example"))["subject"]["id"] == "slow.example"
+            assert tc.decide_cached("flaky.example", policy)["decision"] == "allow"
+            assert tc.decide_cached("other.example", policy) is None
+        await client.aclose()
+
+    asyncio.run(asyncio.wait_for(run(), 3))
+    assert calls == {"flaky.example": 3, "slow.example": 2}
+
+
+def test_lru_honours_valid_until_and_capacity():
+    lru = TrustStateLRU(max_entries=2, max_ttl=60)
+    lru.put("expired.example", _state("expired.example", valid_for=-10))
+    assert lru.get("expired.example") is None
+    for d in ("a.example", "b.example", "c.example"):
+        lru.put(d, _state(d))
+    assert lru.get("a.example") is None and lru.get("c.example") is not None
+    assert lru.get("b.example", now=10**12) is None
+
+
+def test_get_many_pipelines_only_uncached_domains():
+    posted = []
+
+    async def handler(request):
+        domains = json.loads(request.content)["domains"]
+        posted.append(domains)
+        lines = [json.dumps({"domain": d, "status": "ok", "trust_state": _state(d)}) for d in domains]
+        return httpx.Response(200, text="\n".join(lines) + "\n")
+
+    async def run():
+        client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        tc = TrustClient("http://api", client=client)
+        tc.cache.put("hot.example", _state("hot.example"))
+        domains = ["hot.example"] + [f"d{i}.example" for i in range(5)]
+        rows = await tc.get_many(domains, chunk_size=2)
+        await client.aclose()
+        return rows
+
+    rows = asyncio.run(run())
+    assert all(r["status"] == "ok" for r in rows.values()) and len(rows) == 6
+    assert sorted(d for chunk in posted for d in chunk) == [f"d{i}.example" for i in range(5)]
+    assert max(len(c) for c in posted) == 2
+
+
+def test_batch_retry_after_a_broken_stream_asks_only_for_missing_rows():
+    posted = []
+
+    class Broken(httpx.AsyncByteStream):
+        def __init__(self, lines):
+            self.lines = lines
+
+        async def __aiter__(self):
+            for line in self.lines:
+                yield line.encode() + b"\n"
+            raise httpx.ReadError("connection reset")
+
+    async def handler(request):
+        domains = json.loads(request.content)["domains"]
+        posted.append(domains)
+        lines = [json.dumps({"domain": d, "status": "ok", "trust_state": _state(d)}) for d in domains]
+        if len(posted) == 1:
+            return httpx.Response(200, stream=Broken(lines[:2]))
+        return httpx.Response(200, text="\n".join(lines) + "\n")
+
+    async def run():
+        client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        tc = TrustClient("http://api", retry=RetryPolicy(backoff=0.001), client=client)
+        rows = await tc.get_many([f"d{i}.example" for i in range(4)])
+        await client.aclose()
+        return rows
+
+    rows = asyncio.run(run())
+    assert all(r["status"] == "ok" for r in rows.values()) and len(rows) == 4
+    assert posted[1] == ["d2.example", "d3.example"]
+
+
+def test_invalid_json_from_the_api_raises_trust_api_error():
+    def handler(request):
+        return httpx.Response(200, text="<html>proxy error</html>")
+
+    async def run(call):
+        client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        try:
+            await call(TrustClient("http://api", client=client))
+        finally:
+            await client.aclose()
+
+    for call in (lambda tc: tc.get("a.example"), lambda tc: tc.get_many(["a.example"])):
+        with pytest.raises(TrustAPIError, match="invalid JSON"):
+            asyncio.run(run(call))
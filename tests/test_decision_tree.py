@@ -0,0 +1,87 @@
+import asyncio
+import base64
+import json
+from pathlib import Path
+
+import pytest
+
+from tfws2.decision_tree import CompiledTree
+
+httpx = pytest.importorskip("httpx")
+ed25519 = pytest.importorskip("cryptography.hazmat.primitives.asymmetric.ed25519")
+
+TREE = Path(__file__).resolve().parent.parent / "v2" / "decision-tree.v2.json"
+KEY_ID = b"\x01\x02\x03\x04\x05\x06\x07\x08"
+
+
+def _signer():
+    sk = ed25519.Ed25519PrivateKey.generate()
+    raw = sk.public_key().public_bytes_raw()
+    pub = b"untrusted comment: test key\n" + base64.b64encode(b"Ed" + KEY_ID + raw) + b"\n"
+
+    def sign(msg: bytes) -> bytes:
+        sig = sk.sign(msg)
+        trusted = b"timestamp:0"
+        glob = sk.sign(sig + trusted)
+        return (b"untrusted comment: sig\n" + base64.b64encode(b"Ed" + KEY_ID + sig) + b"\n"
+                + b"trusted comment: " + trusted + b"\n" + base64.b64encode(glob) + b"\n")
+
+    return pub, sign
+
+
+def _site(with_trust_state=True, tamper=False):
+    pub, sign = _signer()
+    kh = json.dumps({"keys": [{"epoch_utc": "2025-12-25T00:00:00Z", "public_key_url": "/.well-known/minisign.pub"}]}).encode()
+    ts = b'{"schema_version": "2.0"}'
+    files = {
+        "/.well-known/minisign.pub": pub,
+        "/.well-known/key-history.json": kh + (b" " if tamper else b""),
+        "/.well-known/key-history.json.minisig": sign(kh),
+    }
+    if with_trust_state:
+        files["/.well-known/trust-state.json"] = ts
+        files["/.well-known/trust-state.json.minisig"] = sign(ts)
+    return files
+
+
+def _client(sites):
+    def handler(request):
+        body = sites.get(request.url.host, {}).get(request.url.path)
+        return httpx.Response(200, content=body) if body is not None else httpx.Response(404)
+    return httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+
+def test_tree_outcomes_over_shared_client():
+    tree = CompiledTree.load(TREE)
+    sites = {
+        "full.example": _site(),
+        "minimal.example": _site(with_trust_state=False),
+        "tampered.example": _site(tamper=True),
+        "down.example": {},
+    }
+
+    async def run():
+        async with _client(sites) as client:
+            return await tree.evaluate_many(list(sites), client=client)
+
+    results = asyncio.run(run())
+    assert [r.outcome for r in results] == ["OK_GREEN_FULL", "OK_GREEN_MINIMAL", "F_KEY_MISMATCH", "F_NET"]
+    full = results[0]
+    assert full.extracted["keys[0].epoch_utc"] == "2025-12-25T00:00:00Z"
+    assert full.extracted["keys[0].public_key_pinned"] is None
+    assert [t["step"] for t in full.trace if "step" in t] == [s for s in tree.steps]
+    # all five artifacts were requested up front, before the first step finished
+    fetches = [t for t in full.trace if "fetch" in t]
+    first_step = next(t for t in full.trace if "step" in t)
+    assert len(fetches) == 5
+    assert all(f["start_ms"] <= first_step["start_ms"] + first_step["ms"] for f in fetches)
+
+
+def test_compile_rejects_bad_transitions():
+    tree = json.loads(TREE.read_text(encoding="utf-8"))
+    tree["steps"][0]["on_success"] = "S1_fetch_pubkey"
+    with pytest.raises(ValueError, match="cycle"):
+        CompiledTree.compile(tree)
+    tree["steps"][0]["on_success"] = "NOWHERE"
+    with pytest.raises(ValueError, match="unknown transition"):
+        CompiledTree.compile(tree)
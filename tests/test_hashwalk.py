@@ -0,0 +1,31 @@
+import os
+
+from tfws2.hashwalk import hashwalk
+
+
+def _tree(root):
+    for i in range(20):
+        d = root / f"d{i % 4}"
+        d.mkdir(exist_ok=True)
+        p = d / f"f{i}.txt"
+        p.write_text(f"file {i}\n" * (i + 1), encoding="utf-8")
+        os.utime(p, ns=(1_000_000_000, 1_000_000_000))
+
+
+def test_parallel_and_incremental_output_is_identical(tmp_path):
+    root = tmp_path / "site"
+    root.mkdir()
+    _tree(root)
+    cache = str(tmp_path / "cache.db")
+
+    hashwalk(str(root), str(tmp_path / "plain.json"))
+    first = hashwalk(str(root), str(tmp_path / "jobs.json"), jobs=4, cache_path=cache)
+    (root / "d0" / "f0.txt").write_text("changed\n", encoding="utf-8")
+    os.utime(root / "d0" / "f0.txt", ns=(1_000_000_000, 1_000_000_000))
+    second = hashwalk(str(root), str(tmp_path / "incr.json"), cache_path=cache)
+    hashwalk(str(root), str(tmp_path / "plain2.json"))
+
+    assert (tmp_path / "plain.json").read_bytes() == (tmp_path / "jobs.json").read_bytes()
+    assert (tmp_path / "plain2.json").read_bytes() == (tmp_path / "incr.json").read_bytes()
+    assert (first.hashed, first.cache_hits) == (20, 0)
+    assert (second.hashed, second.cache_hits) == (1, 19)
@@ -0,0 +1,64 @@
+import json
+from pathlib import Path
+
+from tfws2 import inventory
+from tfws2.inventory import InventoryWriter, iter_inventory, join_sorted, sorted_entries
+
+
+BASE = Path(__file__).resolve().parent.parent
+ENTRIES = [(f"dir{i % 7}/file-{i:04d}.txt", f"{i:064x}") for i in range(500)]
+
+
+def test_writer_matches_json_dump_and_reader_streams_it(tmp_path, monkeypatch):
+    entries = sorted(ENTRIES)
+    out = tmp_path / "sha256.json"
+    with InventoryWriter(str(out), count=len(entries)) as w:
+        for p, h in entries:
+            w.write(p, h)
+
+    doc = {"schema_version": "2.0", "root": ".", "algo": "sha256", "count": len(entries),
+           "files": [{"path": p, "sha256": h} for p, h in entries]}
+    assert out.read_text(encoding="utf-8") == json.dumps(doc, ensure_ascii=False, indent=2)
+
+    # Force values to straddle read boundaries.
+    monkeypatch.setattr(inventory, "CHUNK", 7)
+    assert list(iter_inventory(str(out))) == entries
+
+
+def test_unsorted_inventory_is_externally_sorted(tmp_path, monkeypatch):
+    out = tmp_path / "inv.ndjson"
+    shuffled = ENTRIES[::-1] + [(ENTRIES[0][0], "f" * 64)]
+    with InventoryWriter(str(out), count=len(shuffled)) as w:
+        for p, h in shuffled:
+            w.write(p, h)
+
+    got = list(sorted_entries(str(out), run_size=16))
+    expected = dict(ENTRIES)
+    expected[ENTRIES[0][0]] = "f" * 64
+    assert got == sorted(expected.items())
+
+
+def test_join_sorted():
+    a = [("a", "1"), ("b", "2"), ("d", "4")]
+    b = [("b", "2"), ("c", "3"), ("d", "5")]
+    assert list(join_sorted(a, b)) == [
+        ("a", "1", None), ("b", "2", "2"), ("c", None, "3"), ("d", "4", "5"),
+    ]
+
+
+def test_sha256sum_text_format_round_trips(tmp_path):
+    published = BASE / "v2" / "inventory.sha256"
+    entries = list(iter_inventory(str(published)))
+    assert len(entries) == 17
+    assert entries[0][0] == "README.md"
+
+    out = tmp_path / "copy.sha256"
+    with InventoryWriter(str(out), count=len(entries)) as w:
+        for p, h in entries:
+            w.write(p, h)
+    assert out.read_bytes() == published.read_bytes()
+
+    odd = tmp_path / "odd.txt"
+    with InventoryWriter(str(odd), count=1, fmt="sha256") as w:
+        w.write("a\\b\nc", "0" * 64)
+    assert list(iter_inventory(str(odd))) == [("a\\b\nc", "0" * 64)]
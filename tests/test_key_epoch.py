@@ -0,0 +1,36 @@
+import json
+import os
+
+from tfws2.key_epoch import KeyHistoryIndex
+
+
+def _write(path, keys):
+    path.write_text(json.dumps({"schema_version": "2.0", "keys": keys}), encoding="utf-8")
+
+
+def test_index_interval_lookup_batch_and_reload(tmp_path):
+    path = tmp_path / "key-history.json"
+    _write(path, [
+        {"kid": "K2", "pubkey_path": "/k2", "not_before": "2025-06-01T00:00:00Z", "status": "active"},
+        {"kid": "K1", "pubkey_path": "/k1", "not_before": "2024-01-01T00:00:00Z",
+         "not_after": "2025-01-01T00:00:00Z", "status": "retired"},
+        {"kid": "K1", "pubkey_path": "/k1", "not_before": "2025-03-01T00:00:00+00:00", "status": "active"},
+    ])
+    idx = KeyHistoryIndex(path, check_interval=0)
+
+    got = idx.check_many([
+        ("K1", "2024-06-01T00:00:00Z"),
+        ("K1", "2025-02-01T00:00:00Z"),   # gap between epochs
+        ("K1", "2026-01-01T00:00:00Z"),
+        ("K2", "2025-05-31T23:59:59Z"),
+        ("K9", "2025-01-01T00:00:00Z"),
+        ("K2", "not a time"),
+    ])
+    assert [d.reason for d in got] == [
+        "ok", "after_not_after", "ok", "before_not_before", "kid_not_found", "invalid_time",
+    ]
+
+    _write(path, [{"kid": "K2", "pubkey_path": "/k2", "not_before": "2025-06-01T00:00:00Z", "status": "revoked"}])
+    os.utime(path, ns=(1, 1))
+    assert idx.check("K2", "2026-01-01T00:00:00Z").reason == "kid_revoked"
+    assert idx.check("K1", "2026-01-01T00:00:00Z").reason == "kid_not_found"
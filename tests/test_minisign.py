@@ -0,0 +1,40 @@
+from dataclasses import replace
+from pathlib import Path
+
+from tfws2 import _ed25519, minisign
+from tfws2.minisign_verify import verify_minisign_detached
+
+
+BASE = Path(__file__).resolve().parent.parent
+PUB = BASE / "v2" / "keys" / "minisign.pub"
+INV = BASE / "v2" / "inventory.sha256"
+SIG = BASE / "v2" / "inventory.sha256.minisig"
+
+
+def test_published_inventory_signature_verifies_in_process():
+    assert verify_minisign_detached(str(PUB), str(INV), str(SIG)) == (True, "ok")
+
+
+def test_parsed_formats_match_published_key():
+    pk = minisign.parse_public_key(PUB.read_bytes())
+    sig = minisign.parse_signature(SIG.read_bytes())
+    assert pk.key_id_hex == "8AEA22755B13216C"
+    assert sig.prehashed
+    assert sig.key_id == pk.key_id
+
+
+def test_tampering_is_detected():
+    pk = minisign.parse_public_key(PUB.read_bytes())
+    sig = minisign.parse_signature(SIG.read_bytes())
+    msg = INV.read_bytes()
+
+    assert minisign.verify(pk, msg + b"\n", sig) == (False, "signature_verification_failed")
+    forged = replace(sig, trusted_comment=sig.trusted_comment + b" forged")
+    assert minisign.verify(pk, msg, forged) == (False, "trusted_comment_verification_failed")
+
+
+def test_pure_python_backend_agrees():
+    pk = minisign.parse_public_key(PUB.read_bytes())
+    sig = minisign.parse_signature(SIG.read_bytes())
+    assert _ed25519.verify(pk.key, sig.signature + sig.trusted_comment, sig.global_signature)
+    assert not _ed25519.verify(pk.key, sig.signature + b"x", sig.global_signature)
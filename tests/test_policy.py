@@ -0,0 +1,71 @@
+import json
+import os
+import random
+
+import pytest
+
+from tfws2.policy import ACTIONS, PolicyStore, compile_policy
+
+POLICY = {
+    "min_grade_allow": "B",
+    "min_confidence_allow": 0.6,
+    "block_on": ["signature_fail", "inventory_tamper:pass"],
+    "quarantine_on": ["rollback_suspected"],
+    "warn_on": ["incidents_open"],
+}
+
+
+def _state(grade="A", confidence=0.9, **signals):
+    return {
+        "score": {"grade": grade, "confidence": confidence},
+        "signals": [{"code": c, "result": r} for c, r in signals.items()],
+    }
+
+
+def test_compiled_policy_semantics():
+    p = compile_policy(POLICY)
+    cases = [
+        (_state(signature_fail="pass"), "allow", "policy:pass"),
+        (_state(signature_fail="warn", rollback_suspected="fail"), "block", "policy:block_on:signature_fail"),
+        (_state(inventory_tamper="pass"), "block", "policy:block_on:inventory_tamper:pass"),
+        (_state(grade="D", rollback_suspected="unknown"), "quarantine", "policy:quarantine_on:rollback_suspected"),
+        (_state(grade="D", incidents_open="fail"), "block", "policy:grade_too_low"),
+        (_state(grade="nonsense"), "block", "policy:grade_too_low"),
+        (_state(confidence=0.1, incidents_open="fail"), "warn", "policy:low_confidence"),
+        (_state(incidents_open="unknown"), "warn", "policy:warn_on:incidents_open"),
+    ]
+    for ts, decision, reason in cases:
+        out = p.decide(ts)
+        assert (out["decision"], out["reason"]) == (decision, reason), ts
+
+
+def test_columnar_matches_per_state():
+    pytest.importorskip("numpy")
+    p = compile_policy(POLICY)
+    rng = random.Random(7)
+    codes = ["signature_fail", "inventory_tamper", "rollback_suspected", "incidents_open", "other"]
+    results = ["pass", "fail", "warn", "unknown"]
+    states = [
+        _state(rng.choice("ABCDEFX"), rng.random(), **{c: rng.choice(results) for c in rng.sample(codes, 3)})
+        for _ in range(2000)
+    ]
+    action, reason = p.decide_columns(*p.encode(states))
+    names = p.reason_names()
+    want = [p.decide(ts) for ts in states]
+    assert [ACTIONS[a] for a in action] == [w["decision"] for w in want]
+    assert p.decide_batch(states) == [w["decision"] for w in want]
+    assert [names[r] for r in reason] == [w["reason"] for w in want]
+
+
+def test_policy_store_recompiles_on_change(tmp_path):
+    path = tmp_path / "policy.json"
+    path.write_text(json.dumps(POLICY), encoding="utf-8")
+    store = PolicyStore(check_interval=0)
+    p1 = store.get(path)
+    assert store.get(path) is p1
+
+    path.write_text(json.dumps({**POLICY, "min_grade_allow": "E"}), encoding="utf-8")
+    os.utime(path, ns=(1, 1))
+    p2 = store.get(path)
+    assert p2 is not p1
+    assert p2.decide(_state(grade="D"))["decision"] == "allow"
@@ -0,0 +1,35 @@
+from tfws2.inventory import InventoryWriter
+from tfws2.sim.diff import ScoringPolicy
+from tfws2.sim.rollback import analyze_rollback, simulate_rollback
+
+
+def _inv(path, files):
+    with InventoryWriter(str(path), count=len(files)) as w:
+        for p, h in sorted(files.items()):
+            w.write(p, h)
+    return str(path)
+
+
+def test_report_lists_added_removed_and_changed(tmp_path):
+    cur = _inv(tmp_path / "cur.json", {"a": "1", "b": "2", "c": "3"})
+    cand = _inv(tmp_path / "cand.json", {"a": "1", "b": "9", "d": "4"})
+
+    r = analyze_rollback(cur, cand)
+    assert (r.added.paths, r.removed.paths, r.changed.paths) == (["d"], ["c"], ["b"])
+    assert r.decision == "ROLLBACK_POSSIBLE"
+    assert r.reasons == ["removed"]
+    assert simulate_rollback(cur, cand) == "ROLLBACK_POSSIBLE mode=hard-fail cur=3 cand=3 missing=1 changed=1"
+
+
+def test_replay_of_older_release_is_detected(tmp_path):
+    v1 = _inv(tmp_path / "v1.json", {"a": "1", "b": "1"})
+    v2 = _inv(tmp_path / "v2.json", {"a": "2", "b": "2"})
+    v3 = _inv(tmp_path / "v3.json", {"a": "3", "b": "3"})
+
+    r = analyze_rollback(v3, v1, history=[v2, v1])
+    assert r.replay_of == v1
+    assert r.reverted.count == 2
+    assert r.decision == "ROLLBACK_SUSPECT"
+
+    lenient = ScoringPolicy(reverted=0, replay=0)
+    assert analyze_rollback(v3, v1, history=[v2, v1], policy=lenient).decision == "OK"
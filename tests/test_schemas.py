@@ -0,0 +1,59 @@
+import json
+import os
+import shutil
+from pathlib import Path
+
+from tfws2.schemas import SchemaRegistry
+from tfws2.validate import bulk_validate
+
+BASE = Path(__file__).resolve().parent.parent
+
+
+def test_registry_compiles_once_and_reloads_on_change(tmp_path):
+    path = tmp_path / "s.schema.json"
+    path.write_text(json.dumps({"type": "object"}), encoding="utf-8")
+    reg = SchemaRegistry(check_interval=0)
+
+    v1 = reg.validator(path)
+    assert reg.validator(path) is v1
+    assert v1.is_valid({})
+
+    path.write_text(json.dumps({"type": "array"}), encoding="utf-8")
+    os.utime(path, ns=(1, 1))
+    v2 = reg.validator(path)
+    assert v2 is not v1
+    assert not v2.is_valid({})
+
+
+def test_bulk_validate_maps_documents_to_schemas(tmp_path):
+    stream = tmp_path / "docs.ndjson"
+    stream.write_text('{"schema_version": "2.0", "keys": []}\n{"schema_version": "9.9", "keys": []}\n', encoding="utf-8")
+    inputs = [str(BASE / "examples" / "schemas"), str(stream)]
+
+    for jobs in (1, 2):
+        results = list(bulk_validate(inputs, schemas_dir=str(BASE / "schemas"), jobs=jobs))
+        assert [r["schema"] for r in results] == ["incident", "key-history", "trust-state", "key-history", None]
+        assert [r["ok"] for r in results] == [True, True, True, False, False]
+
+
+def test_bulk_validate_reports_bad_schemas_per_document(tmp_path):
+    schemas = tmp_path / "schemas"
+    schemas.mkdir()
+    shutil.copy(BASE / "schemas" / "key-history.schema.json", schemas)
+    (schemas / "trust-state.schema.json").write_text('{"type": 12}', encoding="utf-8")  # not a valid schema
+    # no incident.schema.json at all
+    good = json.dumps(json.loads((BASE / "examples" / "schemas" / "key-history.example.json").read_text(encoding="utf-8")))
+    stream = tmp_path / "docs.ndjson"
+    stream.write_text(
+        good + "\n"
+        '{"schema_version": "2.0", "signals": []}\n'
+        '{"schema_version": "2.0", "opened_at": "2026-01-01T00:00:00Z"}\n'
+        + good + "\n",
+        encoding="utf-8",
+    )
+
+    for jobs in (1, 2):
+        results = list(bulk_validate([str(stream)], schemas_dir=str(schemas), jobs=jobs))
+        assert [r["ok"] for r in results] == [True, False, False, True]
+        assert "trust-state.schema.json" in results[1]["errors"][0]
+        assert "incident.schema.json" in results[2]["errors"][0]
@@ -0,0 +1,47 @@
+import shutil
+from pathlib import Path
+
+from tfws2 import verify_tree as verify_tree_mod
+from tfws2.verify_tree import verify_tree
+
+
+BASE = Path(__file__).resolve().parent.parent
+PUB = str(BASE / "v2" / "keys" / "minisign.pub")
+
+
+def test_published_v2_tree_matches_signed_inventory():
+    r = verify_tree(PUB, str(BASE / "v2" / "inventory.sha256"))
+    assert r.ok, r.to_dict()
+    assert r.checked == 17
+
+
+def test_tampered_tree_is_reported(tmp_path):
+    tree = tmp_path / "v2"
+    shutil.copytree(BASE / "v2", tree)
+    (tree / "index.json").write_text("{}", encoding="utf-8")
+    (tree / "README.md").unlink()
+    (tree / "extra.html").write_text("x", encoding="utf-8")
+
+    r = verify_tree(PUB, str(tree / "inventory.sha256"), jobs=2)
+    assert r.signature_ok
+    assert (r.mismatched, r.missing, r.extra) == (["index.json"], ["README.md"], ["extra.html"])
+
+    r = verify_tree(PUB, str(tree / "inventory.sha256"), ignore=["*.html"], fail_fast=True, jobs=1)
+    assert r.stopped_early and not r.ok
+
+
+def test_inventory_swapped_after_verification_is_not_used(tmp_path, monkeypatch):
+    tree = tmp_path / "v2"
+    shutil.copytree(BASE / "v2", tree)
+    inventory = tree / "inventory.sha256"
+    real_verify = verify_tree_mod.verify_minisign_detached
+
+    def verify_then_swap(*args, **kwargs):
+        result = real_verify(*args, **kwargs)
+        inventory.write_text("0" * 64 + "  index.json\n", encoding="utf-8")
+        return result
+
+    monkeypatch.setattr(verify_tree_mod, "verify_minisign_detached", verify_then_swap)
+    r = verify_tree(PUB, str(inventory))
+    assert r.ok, r.to_dict()
+    assert r.checked == 17
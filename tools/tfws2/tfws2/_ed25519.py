@@ -0,0 +1,87 @@
+"""
+Pure-Python Ed25519 signature verification (RFC 8032, section 5.1.7).
+
+Only used when neither `cryptography` nor `PyNaCl` is installed. Verification
+only; no secret key handling, so constant-time arithmetic is not a concern.
+"""
+from __future__ import annotations
+
+import hashlib
+
+_p = 2**255 - 19
+_L = 2**252 + 27742317777372353535851937790883648493
+_d = -121665 * pow(121666, _p - 2, _p) % _p
+_I = pow(2, (_p - 1) // 4, _p)
+
+
+def _recover_x(y: int, sign: int) -> int | None:
+    if y >= _p:
+        return None
+    x2 = (y * y - 1) * pow(_d * y * y + 1, _p - 2, _p)
+    if x2 % _p == 0:
+        return None if sign else 0
+    x = pow(x2, (_p + 3) // 8, _p)
+    if (x * x - x2) % _p != 0:
+        x = x * _I % _p
+    if (x * x - x2) % _p != 0:
+        return None
+    if (x & 1) != sign:
+        x = _p - x
+    return x
+
+
+# Points are (X, Y, Z, T) in extended homogeneous coordinates.
+def _add(P, Q):
+    A = (P[1] - P[0]) * (Q[1] - Q[0]) % _p
+    B = (P[1] + P[0]) * (Q[1] + Q[0]) % _p
+    C = 2 * P[3] * Q[3] * _d % _p
+    D = 2 * P[2] * Q[2] % _p
+    E, F, G, H = B - A, D - C, D + C, B + A
+    return (E * F % _p, G * H % _p, F * G % _p, E * H % _p)
+
+
+def _mul(s: int, P):
+    Q = (0, 1, 1, 0)
+    while s > 0:
+        if s & 1:
+            Q = _add(Q, P)
+        P = _add(P, P)
+        s >>= 1
+    return Q
+
+
+def _equal(P, Q) -> bool:
+    if (P[0] * Q[2] - Q[0] * P[2]) % _p != 0:
+        return False
+    return (P[1] * Q[2] - Q[1] * P[2]) % _p == 0
+
+
+def _decompress(s: bytes):
+    y = int.from_bytes(s, "little")
+    sign = y >> 255
+    y &= (1 << 255) - 1
+    x = _recover_x(y, sign)
+    if x is None:
+        return None
+    return (x, y, 1, x * y % _p)
+
+
+_Gy = 4 * pow(5, _p - 2, _p) % _p
+_Gx = _recover_x(_Gy, 0)
+_G = (_Gx, _Gy, 1, _Gx * _Gy % _p)
+
+
+def verify(public_key: bytes, message: bytes, signature: bytes) -> bool:
+    if len(public_key) != 32 or len(signature) != 64:
+        return False
+    A = _decompress(public_key)
+    if A is None:
+        return False
+    R = _decompress(signature[:32])
+    if R is None:
+        return False
+    s = int.from_bytes(signature[32:], "little")
+    if s >= _L:
+        return False
+    h = int.from_bytes(hashlib.sha512(signature[:32] + public_key + message).digest(), "little") % _L
+    return _equal(_mul(s, _G), _add(R, _mul(h, A)))
@@ -1,71 +1,163 @@
 import argparse
-from .validate import validate_json
+import json
+import sys
+from .validate import run_bulk, validate_json
 from .hashwalk import hashwalk
 from .minisign_verify import verify_minisign_detached
-from .sim.rollback import simulate_rollback
+from .sim.diff import ScoringPolicy
+from .sim.rollback import analyze_rollback
+from .inventory import detect_format, iter_inventory
 from .inventory_verify import verify_inventory
-from .key_epoch import check_key_epoch
+from .key_epoch import check_key_epoch, get_index
+from .verify_tree import verify_tree
+from .score_batch import read_domains, score_batch
+from .decision_tree import run_tree
 
 
 def main():
     ap = argparse.ArgumentParser(prog="tfws2")
     sub = ap.add_subparsers(dest="cmd", required=True)
 
-    v = sub.add_parser("validate", help="Validate JSON against a schema")
-    v.add_argument("--schema", required=True)
-    v.add_argument("--json", required=True)
+    v = sub.add_parser("validate", help="Validate JSON against a schema (or many documents in bulk)")
+    v.add_argument("inputs", nargs="*", help="Bulk mode: files, directories, globs, *.ndjson, or - for NDJSON on stdin")
+    v.add_argument("--schema", default=None, help="Schema file (bulk mode: force this schema for every document)")
+    v.add_argument("--json", default=None, help="Single document to validate")
+    v.add_argument("--schemas-dir", default="schemas", help="Bulk mode: where schemas are looked up by schema_version/type")
+    v.add_argument("--jobs", type=int, default=None, help="Bulk mode: worker processes (default: CPU count)")
+    v.add_argument("--quiet", action="store_true", help="Bulk mode: only print failing documents")
 
     h = sub.add_parser("hashwalk", help="Compute sha256 inventory for a folder")
     h.add_argument("--root", default=".")
-    h.add_argument("--out", default="sha256.json")
+    h.add_argument("--out", default="sha256.json", help="Format by extension: .json, .ndjson or .sha256 (sha256sum text)")
+    h.add_argument("--jobs", type=int, default=1, help="Hash files on N worker threads")
+    h.add_argument("--cache", default=None, help="Stat cache file; unchanged files are not rehashed")
 
     ms = sub.add_parser("verify-minisign", help="Verify minisign detached signature")
     ms.add_argument("--pubkey", required=True)
     ms.add_argument("--message", required=True)
     ms.add_argument("--sig", required=True)
+    ms.add_argument("--backend", default="native", choices=["native", "cli"], help="native: in-process; cli: minisign binary")
 
     vi = sub.add_parser("verify-inventory", help="Verify an inventory and auto-pick the correct signature file")
     vi.add_argument("--pubkey", required=True)
     vi.add_argument("--inventory", required=True)
     vi.add_argument("--sigdir", default=None)
+    vi.add_argument("--backend", default="native", choices=["native", "cli"])
+
+    vt = sub.add_parser("verify-tree", help="Verify a deployed tree against a signed inventory")
+    vt.add_argument("--pubkey", required=True)
+    vt.add_argument("--inventory", required=True)
+    vt.add_argument("--root", default=None, help="Tree to check (default: the inventory's directory)")
+    vt.add_argument("--sigdir", default=None)
+    vt.add_argument("--jobs", type=int, default=None, help="Hashing threads (default: CPU count)")
+    vt.add_argument("--fail-fast", action="store_true", help="Stop at the first tampered file")
+    vt.add_argument("--ignore", action="append", default=[], help="Glob of unlisted paths not reported as extra (repeatable)")
+    vt.add_argument("--backend", default="native", choices=["native", "cli"])
+    vt.add_argument("--json", action="store_true", help="Print the full report as JSON")
 
     ke = sub.add_parser("check-key-epoch", help="Check key epoch validity from key-history.json")
     ke.add_argument("--key-history", required=True)
-    ke.add_argument("--kid", required=True)
-    ke.add_argument("--at", required=True, help="ISO8601 time (e.g. 2025-12-25T00:00:00Z)")
+    ke.add_argument("--kid", default=None)
+    ke.add_argument("--at", default=None, help="ISO8601 time (e.g. 2025-12-25T00:00:00Z)")
+    ke.add_argument("--batch", action="store_true", help="Read '<kid> <at>' pairs from stdin, one per line")
 
     sim = sub.add_parser("simulate-rollback", help="Simulate rollback/replay using two inventories")
-    sim.add_argument("--current", required=True)
+    sim.add_argument("--current", required=True, help="Inventory (sha256.json, NDJSON or sha256sum text; auto-detected)")
     sim.add_argument("--candidate", required=True)
     sim.add_argument("--mode", default="hard-fail", choices=["hard-fail", "quarantine"])
+    sim.add_argument("--history", action="append", default=[], help="Older release inventory (repeatable) for replay detection")
+    sim.add_argument("--policy", default=None, help="Scoring policy JSON (see tfws2.sim.diff.ScoringPolicy)")
+    sim.add_argument("--json", action="store_true", help="Print the full change report as JSON")
+    sim.add_argument("--max-paths", type=int, default=1000, help="Example paths kept per category in the report")
+
+    sb = sub.add_parser("score-batch", help="Score many domains via the Trust API batch endpoint (NDJSON out)")
+    sb.add_argument("--api", default="http://127.0.0.1:8787")
+    sb.add_argument("--input", default="-", help="File with one domain per line, or - for stdin")
+    sb.add_argument("--chunk", type=int, default=5000, help="Domains per batch request")
+    sb.add_argument("--concurrency", type=int, default=64)
+    sb.add_argument("--per-host", type=int, default=4)
+
+    dt = sub.add_parser("run-decision-tree", help="Run the v2 agent decision tree against domains (NDJSON out)")
+    dt.add_argument("domains", nargs="*", help="Domains to evaluate (or use --input)")
+    dt.add_argument("--input", default=None, help="File with one domain per line, or - for stdin")
+    dt.add_argument("--tree", default="v2/decision-tree.v2.json")
+    dt.add_argument("--concurrency", type=int, default=32, help="Domains evaluated at once over shared connections")
+    dt.add_argument("--no-prefetch", action="store_true", help="Fetch artifacts only when a step needs them")
+    dt.add_argument("--trace", action="store_true", help="Include the per-step timing trace")
 
     args = ap.parse_args()
 
     if args.cmd == "validate":
+        if args.inputs:
+            summary = run_bulk(args.inputs, schemas_dir=args.schemas_dir, schema=args.schema,
+                               jobs=args.jobs, quiet=args.quiet)
+            print(json.dumps({"summary": summary}), file=sys.stderr)
+            if summary["failed"]:
+                raise SystemExit(f"FAIL: {summary['failed']} of {summary['documents']} documents invalid")
+            return
+        if not (args.schema and args.json):
+            ap.error("validate needs --schema and --json, or bulk inputs")
         validate_json(args.schema, args.json)
         print("OK")
         return
 
     if args.cmd == "hashwalk":
-        hashwalk(args.root, args.out)
+        stats = hashwalk(args.root, args.out, jobs=args.jobs, cache_path=args.cache)
         print(f"Wrote {args.out}")
+        print(stats.summary())
         return
 
     if args.cmd == "verify-minisign":
-        ok, info = verify_minisign_detached(args.pubkey, args.message, args.sig)
+        ok, info = verify_minisign_detached(args.pubkey, args.message, args.sig, backend=args.backend)
         if not ok:
             raise SystemExit(f"FAIL: minisign verification failed ({info})")
         print("OK: minisign verification passed")
         return
 
     if args.cmd == "verify-inventory":
-        ok, info, sig_used = verify_inventory(args.pubkey, args.inventory, sigdir=args.sigdir)
+        ok, info, sig_used = verify_inventory(args.pubkey, args.inventory, sigdir=args.sigdir, backend=args.backend)
         if not ok:
             raise SystemExit(f"FAIL: inventory verification failed ({info}) sig={sig_used}")
-        print(f"OK: inventory verification passed sig={sig_used}")
+        try:
+            entries = sum(1 for _ in iter_inventory(args.inventory))
+        except ValueError as e:
+            raise SystemExit(f"FAIL: inventory signature ok but unreadable ({e})")
+        print(f"OK: inventory verification passed sig={sig_used} format={detect_format(args.inventory)} entries={entries}")
+        return
+
+    if args.cmd == "verify-tree":
+        r = verify_tree(args.pubkey, args.inventory, root=args.root, sigdir=args.sigdir, jobs=args.jobs,
+                        fail_fast=args.fail_fast, ignore=args.ignore, backend=args.backend)
+        if args.json:
+            print(json.dumps(r.to_dict(), indent=2))
+        if not r.signature_ok:
+            raise SystemExit(f"FAIL: inventory verification failed ({r.signature_info}) sig={r.sig}")
+        if not r.ok:
+            lines = [f"FAIL: tree does not match inventory checked={r.checked} mismatched={len(r.mismatched)} "
+                     f"missing={len(r.missing)} extra={len(r.extra)}" + (" (stopped early)" if r.stopped_early else "")]
+            for kind, paths in (("mismatched", r.mismatched), ("missing", r.missing), ("extra", r.extra)):
+                lines += [f"- {kind}: {p}" for p in paths[:20]]
+            raise SystemExit("\n".join(lines))
+        if not args.json:
+            print(f"OK: tree matches inventory checked={r.checked} sig={r.sig}")
         return
 
     if args.cmd == "check-key-epoch":
+        if args.batch:
+            pairs = []
+            for line in sys.stdin:
+                parts = line.split()
+                if parts and not parts[0].startswith("#"):
+                    pairs.append((parts[0], parts[1] if len(parts) > 1 else ""))
+            failed = 0
+            for (kid, at), d in zip(pairs, get_index(args.key_history).check_many(pairs)):
+                failed += not d.ok
+                print(f"{'OK' if d.ok else 'FAIL'}: {d.reason} kid={kid} at={at}")
+            if failed:
+                raise SystemExit(f"FAIL: {failed} of {len(pairs)} pairs invalid")
+            return
+        if not (args.kid and args.at):
+            ap.error("check-key-epoch needs --kid and --at, or --batch")
         d = check_key_epoch(args.key_history, args.kid, args.at)
         if not d.ok:
             raise SystemExit(f"FAIL: {d.reason} kid={d.kid}")
@@ -73,6 +165,45 @@ def main():
         return
 
     if args.cmd == "simulate-rollback":
-        decision = simulate_rollback(args.current, args.candidate, mode=args.mode)
-        print(decision)
+        policy = ScoringPolicy.from_file(args.policy) if args.policy else None
+        report = analyze_rollback(args.current, args.candidate, history=args.history, policy=policy,
+                                  max_paths=args.max_paths if args.json else 0)
+        if args.json:
+            print(json.dumps({"mode": args.mode, **report.to_dict()}, indent=2))
+        else:
+            print(report.summary(args.mode))
+        return
+
+    if args.cmd == "score-batch":
+        try:
+            if args.input == "-":
+                counts = score_batch(args.api, read_domains(sys.stdin), chunk_size=args.chunk,
+                                     concurrency=args.concurrency, per_host=args.per_host)
+            else:
+                with open(args.input, "r", encoding="utf-8") as f:
+                    counts = score_batch(args.api, read_domains(f), chunk_size=args.chunk,
+                                         concurrency=args.concurrency, per_host=args.per_host)
+        except ImportError as e:
+            raise SystemExit(str(e))
+        print(f"scored ok={counts['ok']} error={counts['error']}", file=sys.stderr)
+        return
+
+    if args.cmd == "run-decision-tree":
+        domains = list(args.domains)
+        if args.input == "-":
+            domains += read_domains(sys.stdin)
+        elif args.input:
+            with open(args.input, "r", encoding="utf-8") as f:
+                domains += read_domains(f)
+        if not domains:
+            ap.error("run-decision-tree needs domains or --input")
+        try:
+            results = run_tree(args.tree, domains, concurrency=args.concurrency, prefetch=not args.no_prefetch)
+        except ImportError as e:
+            raise SystemExit(str(e))
+        for r in results:
+            d = r.to_dict()
+            if not args.trace:
+                d.pop("trace")
+            print(json.dumps(d))
         return
@@ -0,0 +1,283 @@
+"""
+Trust API client for agents.
+
+One pooled httpx.AsyncClient per TrustClient. Single lookups are retried
+with exponential backoff (connect errors, timeouts, 429 and 5xx) and
+hedged: when the first attempt has not answered within `hedge_after`
+seconds a second one is started and the first response wins.
+
+Trust-states are kept in a local LRU cache until their `valid_until`
+(capped at `max_ttl`), so repeated decisions for hot domains never leave
+the process. get_many() serves cached domains locally and pipelines the
+rest to POST /api/v1/trust/batch in concurrent chunks.
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import random
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from .policy import CompiledPolicy
+
+Payload = Dict[str, Any]
+
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+
+class TrustAPIError(RuntimeError):
+    pass
+
+
+def _expires_at(payload: Payload, now: float, max_ttl: float) -> float:
+    """Wall-clock expiry: valid_until, capped at now + max_ttl."""
+    vu = payload.get("valid_until")
+    if isinstance(vu, str):
+        try:
+            if vu.endswith("Z"):
+                vu = vu[:-1] + "+00:00"
+            return min(datetime.fromisoformat(vu).astimezone(timezone.utc).timestamp(), now + max_ttl)
+        except ValueError:
+            pass
+    return now + max_ttl
+
+
+class TrustStateLRU:
+    """LRU of trust-states by domain; entries expire at their valid_until."""
+
+    def __init__(self, max_entries: int = 10_000, max_ttl: float = 300.0):
+        self.max_entries = max_entries
+        self.max_ttl = max_ttl
+        self._data: "OrderedDict[str, Tuple[float, Payload]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, domain: str, now: Optional[float] = None) -> Optional[Payload]:
+        hit = self._data.get(domain)
+        if hit is not None:
+            if hit[0] > (now if now is not None else time.time()):
+                self._data.move_to_end(domain)
+                self.hits += 1
+                return hit[1]
+            del self._data[domain]
+        self.misses += 1
+        return None
+
+    def put(self, domain: str, payload: Payload, now: Optional[float] = None) -> None:
+        now = now if now is not None else time.time()
+        expires = _expires_at(payload, now, self.max_ttl)
+        if expires <= now:
+            self._data.pop(domain, None)
+            return
+        self._data[domain] = (expires, payload)
+        self._data.move_to_end(domain)
+        while len(self._data) > self.max_entries:
+            self._data.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+@dataclass
+class RetryPolicy:
+    attempts: int = 3
+    backoff: float = 0.2          # first retry delay; doubles each attempt, with full jitter
+    max_backoff: float = 2.0
+    hedge_after: Optional[float] = 0.5
+
+    def delay(self, attempt: int) -> float:
+        return random.uniform(0, min(self.max_backoff, self.backoff * (2 ** attempt)))
+
+
+class TrustClient:
+    """
+    async with TrustClient("http://127.0.0.1:8787") as tc:
+        state = await tc.get("example.com")
+        verdict = await tc.decide("example.com", load_policy("policy.json"))
+    """
+
+    def __init__(
+        self,
+        api_base: str,
+        timeout: float = 5.0,
+        retry: Optional[RetryPolicy] = None,
+        cache: Optional[TrustStateLRU] = None,
+        max_connections: int = 100,
+        client=None,
+    ):
+        try:
+            import httpx
+        except ImportError:
+            raise ImportError("TrustClient requires httpx (pip install 'tfws2[http]')")
+        self._httpx = httpx
+        self.api_base = api_base.rstrip("/")
+        self.timeout = timeout
+        self.retry = retry or RetryPolicy()
+        self.cache = cache if cache is not None else TrustStateLRU()
+        self._own = client is None
+        self.client = client or httpx.AsyncClient(
+            timeout=httpx.Timeout(timeout),
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+        )
+        self._inflight: Dict[str, asyncio.Future] = {}
+
+    async def __aenter__(self) -> "TrustClient":
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        await self.aclose()
+
+    async def aclose(self) -> None:
+        if self._own:
+            await self.client.aclose()
+
+    # -- single domain ---------------------------------------------------
+
+    async def _attempt(self, url: str) -> Payload:
+        r = await self.client.get(url)
+        if r.status_code in RETRY_STATUS:
+            raise self._httpx.HTTPStatusError(f"retryable status {r.status_code}", request=r.request, response=r)
+        if r.status_code >= 400:
+            raise TrustAPIError(f"{url}: HTTP {r.status_code}")
+        try:
+            return r.json()
+        except ValueError as e:
+            raise TrustAPIError(f"{url}: invalid JSON in response") from e
+
+    async def _hedged(self, url: str) -> Payload:
+        first = asyncio.ensure_future(self._attempt(url))
+        if self.retry.hedge_after is None:
+            return await first
+        done, _ = await asyncio.wait({first}, timeout=self.retry.hedge_after)
+        if done:
+            return first.result()
+        second = asyncio.ensure_future(self._attempt(url))
+        pending = {first, second}
+        error: Optional[BaseException] = None
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for t in done:
+                    if t.exception() is None:
+                        return t.result()
+                    error = t.exception()
+            raise error  # both attempts failed
+        finally:
+            for t in pending:
+                t.cancel()
+
+    async def fetch(self, domain: str) -> Payload:
+        """GET the trust-state from the API (no local cache), with retries and hedging."""
+        url = f"{self.api_base}/api/v1/trust/domain/{domain}"
+        for attempt in range(self.retry.attempts):
+            try:
+                return await self._hedged(url)
+            except TrustAPIError:
+                raise
+            except (self._httpx.TransportError, self._httpx.HTTPStatusError) as e:
+                if attempt + 1 >= self.retry.attempts:
+                    raise TrustAPIError(f"{url}: {type(e).__name__}: {e}") from e
+                await asyncio.sleep(self.retry.delay(attempt))
+        raise TrustAPIError(f"{url}: no attempts made")
+
+    async def get(self, domain: str) -> Payload:
+        """Cached trust-state; concurrent misses for one domain share a request."""
+        hit = self.cache.get(domain)
+        if hit is not None:
+            return hit
+        fut = self._inflight.get(domain)
+        if fut is not None:
+            return await asyncio.shield(fut)
+        fut = asyncio.get_running_loop().create_future()
+        self._inflight[domain] = fut
+        try:
+            payload = await self.fetch(domain)
+            self.cache.put(domain, payload)
+            fut.set_result(payload)
+            return payload
+        except asyncio.CancelledError:
+            fut.cancel()
+            raise
+        except Exception as e:
+            fut.set_exception(e)
+            fut.exception()  # mark retrieved; waiters re-raise it
+            raise
+        finally:
+            self._inflight.pop(domain, None)
+
+    async def decide(self, domain: str, policy: CompiledPolicy) -> Payload:
+        return policy.decide(await self.get(domain))
+
+    def decide_cached(self, domain: str, policy: CompiledPolicy) -> Optional[Payload]:
+        """Synchronous hot path: a decision from the local cache, or None on a miss."""
+        hit = self.cache.get(domain)
+        return policy.decide(hit) if hit is not None else None
+
+    # -- batches ---------------------------------------------------------
+
+    async def _post_chunk(self, chunk: List[str], concurrency: int, per_host: int) -> Dict[str, Payload]:
+        url = f"{self.api_base}/api/v1/trust/batch"
+        out: Dict[str, Payload] = {}
+        for attempt in range(self.retry.attempts):
+            # a retry after a broken stream only asks for the rows not received yet
+            body = {"domains": [d for d in chunk if d not in out], "concurrency": concurrency, "per_host": per_host}
+            try:
+                async with self.client.stream("POST", url, json=body, timeout=None) as r:
+                    if r.status_code in RETRY_STATUS:
+                        raise self._httpx.HTTPStatusError(f"retryable status {r.status_code}", request=r.request, response=r)
+                    if r.status_code >= 400:
+                        raise TrustAPIError(f"{url}: HTTP {r.status_code}")
+                    async for line in r.aiter_lines():
+                        if line:
+                            try:
+                                row = json.loads(line)
+                            except ValueError as e:
+                                raise TrustAPIError(f"{url}: invalid JSON line in batch response") from e
+                            out[row.get("domain")] = row
+                return out
+            except (self._httpx.TransportError, self._httpx.HTTPStatusError) as e:
+                if attempt + 1 >= self.retry.attempts:
+                    raise TrustAPIError(f"{url}: {type(e).__name__}: {e}") from e
+                await asyncio.sleep(self.retry.delay(attempt))
+        raise TrustAPIError(f"{url}: no attempts made")
+
+    async def get_many(
+        self,
+        domains: Iterable[str],
+        chunk_size: int = 500,
+        pipeline: int = 4,
+        concurrency: int = 64,
+        per_host: int = 4,
+    ) -> Dict[str, Payload]:
+        """
+        Trust-states for many domains: cached ones locally, the rest via the
+        batch endpoint with up to `pipeline` chunk requests in flight.
+        Returns domain -> batch row ({"status": "ok", "trust_state": ...}
+        or {"status": "error", "error": ...}).
+        """
+        result: Dict[str, Payload] = {}
+        missing: List[str] = []
+        for d in dict.fromkeys(domains):
+            hit = self.cache.get(d)
+            if hit is not None:
+                result[d] = {"domain": d, "status": "ok", "trust_state": hit}
+            else:
+                missing.append(d)
+
+        sem = asyncio.Semaphore(pipeline)
+
+        async def send(chunk: List[str]) -> None:
+            async with sem:
+                rows = await self._post_chunk(chunk, concurrency, per_host)
+            for d in chunk:
+                row = rows.get(d) or {"domain": d, "status": "error", "error": "missing from batch response"}
+                if row.get("status") == "ok":
+                    self.cache.put(d, row["trust_state"])
+                result[d] = row
+
+        await asyncio.gather(*(send(missing[i:i + chunk_size]) for i in range(0, len(missing), chunk_size)))
+        return result
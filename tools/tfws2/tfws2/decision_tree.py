@@ -0,0 +1,332 @@
+"""
+Executable TFWS v2 agent decision tree (v2/decision-tree.v2.json).
+
+The tree is compiled once into a step graph: endpoint references are
+resolved, transitions checked and cycles rejected. Evaluating a domain
+starts every fetch the tree can need at once (pubkey, key-history,
+trust-state and signatures) on a shared httpx.AsyncClient; steps then run
+in tree order, each awaiting only the fetches it reads. The first outcome
+reached ends the run and cancels fetches still in flight.
+
+Every result carries a trace: one row per fetch (status, bytes, ms) and
+per step (branch taken, ms).
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import re
+import time
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+
+from .minisign_verify import verify_minisign_bytes
+
+MAX_ARTIFACT_BYTES = 2 * 1024 * 1024
+FETCH_TIMEOUT = 8.0
+
+# action -> branches it can take (the step's "on_<branch>" keys)
+ACTIONS = {
+    "http_get": ("success", "fail"),
+    "http_get_multi": ("success", "fail"),
+    "http_get_optional_multi": ("present", "missing"),
+    "minisign_verify": ("success", "fail"),
+    "json_extract": ("success", "fail"),
+}
+FETCH_ACTIONS = ("http_get", "http_get_multi", "http_get_optional_multi")
+
+_PATH_TOKEN = re.compile(r"([^.\[\]]+)|\[(\d+)\]")
+
+
+@dataclass
+class Step:
+    id: str
+    action: str
+    title: str
+    spec: Dict[str, Any]
+    next: Dict[str, str]                 # branch -> step id or outcome
+    reads: Tuple[str, ...] = ()          # endpoint names this step uses
+
+
+@dataclass
+class Fetch:
+    status: Optional[int] = None
+    body: bytes = b""
+    error: Optional[str] = None
+    ms: float = 0.0
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None and self.status is not None and 200 <= self.status < 300
+
+
+@dataclass
+class TreeResult:
+    domain: str
+    outcome: str
+    state_level: str
+    reason: str
+    next_actions: List[str] = field(default_factory=list)
+    extracted: Dict[str, Any] = field(default_factory=dict)
+    trace: List[Dict[str, Any]] = field(default_factory=list)
+    ms: float = 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+def _extract(doc: Any, path: str) -> Any:
+    """
+    Follow "a.b[0].c". A missing leaf gives None; a missing or mistyped
+    container on the way is a format error (KeyError/IndexError/TypeError).
+    """
+    tokens = _PATH_TOKEN.findall(path)
+    cur = doc
+    for i, (key, idx) in enumerate(tokens):
+        last = i == len(tokens) - 1
+        if idx:
+            if not isinstance(cur, list):
+                raise TypeError(f"{path}: expected a list")
+            cur = cur[int(idx)]
+        else:
+            if not isinstance(cur, dict):
+                raise TypeError(f"{path}: expected an object")
+            if last:
+                return cur.get(key)
+            cur = cur[key]
+    return cur
+
+
+class _Run:
+    """State of one domain evaluation: fetch tasks, extracted values, trace."""
+
+    def __init__(self, tree: "CompiledTree", domain: str, client, base_url: str):
+        self.tree = tree
+        self.domain = domain
+        self.client = client
+        self.base_url = base_url
+        self.t0 = time.perf_counter()
+        self.fetches: Dict[str, asyncio.Task] = {}
+        self.extracted: Dict[str, Any] = {}
+        self.trace: List[Dict[str, Any]] = []
+
+    def _ms(self, since: float) -> float:
+        return round((time.perf_counter() - since) * 1000, 3)
+
+    async def _get(self, name: str) -> Fetch:
+        url = self.base_url + self.tree.endpoints[name]
+        t = time.perf_counter()
+        f = Fetch()
+        try:
+            async with self.client.stream("GET", url, timeout=FETCH_TIMEOUT) as r:
+                f.status = r.status_code
+                if 200 <= r.status_code < 300:
+                    buf = bytearray()
+                    async for chunk in r.aiter_bytes():
+                        buf += chunk
+                        if len(buf) > MAX_ARTIFACT_BYTES:
+                            raise ValueError(f"larger than {MAX_ARTIFACT_BYTES} bytes")
+                    f.body = bytes(buf)
+        except Exception as e:  # network, TLS, timeout, size limit
+            f.error = f"{type(e).__name__}: {e}"
+        f.ms = self._ms(t)
+        self.trace.append({"fetch": name, "url": url, "status": f.status, "bytes": len(f.body),
+                           "error": f.error, "start_ms": round((t - self.t0) * 1000, 3), "ms": f.ms})
+        return f
+
+    def fetch(self, name: str) -> Awaitable[Fetch]:
+        task = self.fetches.get(name)
+        if task is None:
+            task = self.fetches[name] = asyncio.ensure_future(self._get(name))
+        return task
+
+    async def fetch_all(self, names: Iterable[str]) -> List[Fetch]:
+        return list(await asyncio.gather(*(self.fetch(n) for n in names)))
+
+    def cancel(self) -> None:
+        for task in self.fetches.values():
+            task.cancel()
+
+
+async def _http_get(run: _Run, step: Step) -> str:
+    got = await run.fetch_all(step.reads)
+    return "success" if all(f.ok for f in got) else "fail"
+
+
+async def _http_get_optional(run: _Run, step: Step) -> str:
+    got = await run.fetch_all(step.reads)
+    return "present" if all(f.ok for f in got) else "missing"
+
+
+async def _minisign_verify(run: _Run, step: Step) -> str:
+    pub, msg, sig = await run.fetch_all(step.reads)
+    if not (pub.ok and msg.ok and sig.ok):
+        return "fail"
+    ok, _ = verify_minisign_bytes(pub.body, msg.body, sig.body)
+    return "success" if ok else "fail"
+
+
+async def _json_extract(run: _Run, step: Step) -> str:
+    (src,) = await run.fetch_all(step.reads)
+    try:
+        doc = json.loads(src.body)
+        for path in step.spec.get("extract") or []:
+            run.extracted[path] = _extract(doc, path)
+    except (ValueError, KeyError, IndexError, TypeError):
+        return "fail"
+    return "success"
+
+
+HANDLERS: Dict[str, Callable[[_Run, Step], Awaitable[str]]] = {
+    "http_get": _http_get,
+    "http_get_multi": _http_get,
+    "http_get_optional_multi": _http_get_optional,
+    "minisign_verify": _minisign_verify,
+    "json_extract": _json_extract,
+}
+
+
+@dataclass
+class CompiledTree:
+    id: str
+    endpoints: Dict[str, str]
+    start: str
+    steps: Dict[str, Step]
+    outcomes: Dict[str, Dict[str, Any]]
+    prefetch: Tuple[str, ...]            # endpoints fetched up front, in first-use order
+
+    @classmethod
+    def compile(cls, tree: Dict[str, Any]) -> "CompiledTree":
+        endpoints = dict((tree.get("inputs") or {}).get("endpoints") or {})
+        outcomes = dict(tree.get("outcomes") or {})
+        raw_steps = tree.get("steps") or []
+        if not raw_steps:
+            raise ValueError("decision tree has no steps")
+
+        def ref(value: Any, where: str) -> str:
+            name = str(value).split(".", 1)[1] if str(value).startswith("endpoints.") else None
+            if name not in endpoints:
+                raise ValueError(f"{where}: unknown endpoint reference {value!r}")
+            return name
+
+        steps: Dict[str, Step] = {}
+        for s in raw_steps:
+            sid, action = s.get("id"), s.get("action")
+            if action not in ACTIONS:
+                raise ValueError(f"step {sid}: unknown action {action!r}")
+            if action in FETCH_ACTIONS:
+                targets = [s["target"]] if "target" in s else list(s.get("targets") or [])
+                reads = tuple(ref(t, sid) for t in targets)
+            elif action == "minisign_verify":
+                reads = tuple(ref(s.get(k), sid) for k in ("pubkey", "message", "signature"))
+            else:
+                reads = (ref(s.get("from"), sid),)
+            nxt = {b: s[f"on_{b}"] for b in ACTIONS[action] if f"on_{b}" in s}
+            if set(nxt) != set(ACTIONS[action]):
+                raise ValueError(f"step {sid}: needs " + ", ".join(f"on_{b}" for b in ACTIONS[action]))
+            steps[sid] = Step(sid, action, s.get("title", ""), s, nxt, reads)
+
+        for step in steps.values():
+            for target in step.next.values():
+                if target not in steps and target not in outcomes:
+                    raise ValueError(f"step {step.id}: unknown transition {target!r}")
+
+        start = raw_steps[0]["id"]
+        order: List[str] = []
+        cls._check_acyclic(steps, start, order)
+        prefetch: List[str] = []
+        for sid in order:
+            for name in steps[sid].reads:
+                if name not in prefetch:
+                    prefetch.append(name)
+        return cls(tree.get("id", ""), endpoints, start, steps, outcomes, tuple(prefetch))
+
+    @staticmethod
+    def _check_acyclic(steps: Dict[str, Step], start: str, order: List[str]) -> None:
+        """Depth-first from start; fills `order` with reachable steps, rejects loops."""
+        state: Dict[str, int] = {}            # 1 = on stack, 2 = done
+
+        def visit(sid: str) -> None:
+            if state.get(sid) == 1:
+                raise ValueError(f"decision tree has a cycle through {sid}")
+            if sid not in steps or state.get(sid) == 2:
+                return
+            state[sid] = 1
+            order.append(sid)
+            for target in steps[sid].next.values():
+                visit(target)
+            state[sid] = 2
+
+        visit(start)
+
+    @classmethod
+    def load(cls, path: str | Path) -> "CompiledTree":
+        return cls.compile(json.loads(Path(path).read_text(encoding="utf-8")))
+
+    async def evaluate(self, domain: str, client, prefetch: bool = True, scheme: str = "https") -> TreeResult:
+        run = _Run(self, domain, client, f"{scheme}://{domain}")
+        if prefetch:
+            for name in self.prefetch:
+                run.fetch(name)
+        node = self.start
+        try:
+            while node in self.steps:
+                step = self.steps[node]
+                t = time.perf_counter()
+                branch = await HANDLERS[step.action](run, step)
+                run.trace.append({"step": step.id, "action": step.action, "branch": branch,
+                                  "start_ms": round((t - run.t0) * 1000, 3), "ms": run._ms(t)})
+                node = step.next[branch]
+        finally:
+            run.cancel()
+
+        out = self.outcomes[node]
+        return TreeResult(
+            domain=domain,
+            outcome=node,
+            state_level=out.get("state_level", "unknown"),
+            reason=out.get("reason", ""),
+            next_actions=list(out.get("next_actions") or []),
+            extracted=run.extracted,
+            trace=run.trace,
+            ms=run._ms(run.t0),
+        )
+
+    async def evaluate_many(
+        self,
+        domains: Iterable[str],
+        client=None,
+        concurrency: int = 32,
+        prefetch: bool = True,
+        scheme: str = "https",
+    ) -> List[TreeResult]:
+        """Evaluate domains concurrently over one connection pool; results keep input order."""
+        own = client is None
+        if own:
+            client = _new_client(concurrency)
+        sem = asyncio.Semaphore(concurrency)
+
+        async def one(d: str) -> TreeResult:
+            async with sem:
+                return await self.evaluate(d, client, prefetch=prefetch, scheme=scheme)
+
+        try:
+            return list(await asyncio.gather(*(one(d) for d in domains)))
+        finally:
+            if own:
+                await client.aclose()
+
+
+def _new_client(concurrency: int):
+    try:
+        import httpx
+    except ImportError:
+        raise ImportError("the decision tree engine requires httpx (pip install 'tfws2[http]')")
+    # every domain may hold up to one connection per prefetched artifact
+    limits = httpx.Limits(max_connections=max(10, concurrency * 5), max_keepalive_connections=concurrency * 2)
+    return httpx.AsyncClient(limits=limits, follow_redirects=True, headers={"User-Agent": "tfws2-decision-tree"})
+
+
+def run_tree(tree_path: str, domains: Iterable[str], concurrency: int = 32, prefetch: bool = True) -> List[TreeResult]:
+    return asyncio.run(CompiledTree.load(tree_path).evaluate_many(list(domains), concurrency=concurrency, prefetch=prefetch))
@@ -1,4 +1,13 @@
-import hashlib, json, os
+import hashlib, os, sqlite3, time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+
+from .inventory import RUN_SIZE, ExternalSorter, InventoryWriter
+
+# Files modified this recently are hashed but not cached: a write landing in
+# the same mtime tick as our stat would otherwise go unnoticed next run.
+RACY_WINDOW_NS = 2_000_000_000
+
 
 def _sha256_file(path: str) -> str:
     h = hashlib.sha256()
@@ -7,8 +16,8 @@ def _sha256_file(path: str) -> str:
             h.update(chunk)
     return h.hexdigest()
 
-def hashwalk(root: str, out_json: str) -> None:
-    items = []
+
+def _walk(root: str):
     for dirpath, _, filenames in os.walk(root):
         if "/.git" in dirpath.replace("\\", "/"):
             continue
@@ -17,15 +26,148 @@ def hashwalk(root: str, out_json: str) -> None:
             rel = os.path.relpath(p, root).replace("\\", "/")
             if rel.startswith(".git/"):
                 continue
-            items.append((rel, _sha256_file(p)))
-
-    items.sort(key=lambda x: x[0])
-    doc = {
-        "schema_version": "2.0",
-        "root": ".",
-        "algo": "sha256",
-        "count": len(items),
-        "files": [{"path": p, "sha256": s} for p, s in items]
-    }
-    with open(out_json, "w", encoding="utf-8") as f:
-        json.dump(doc, f, ensure_ascii=False, indent=2)
+            yield rel, p
+
+
+@dataclass
+class HashwalkStats:
+    files: int = 0
+    hashed: int = 0
+    cache_hits: int = 0
+    bytes_hashed: int = 0
+    seconds: float = 0.0
+
+    @property
+    def hit_rate(self) -> float:
+        return self.cache_hits / self.files if self.files else 0.0
+
+    @property
+    def mb_per_s(self) -> float:
+        return self.bytes_hashed / 1e6 / self.seconds if self.seconds else 0.0
+
+    def summary(self) -> str:
+        return (
+            f"files={self.files} hashed={self.hashed} cache_hits={self.cache_hits} "
+            f"hit_rate={self.hit_rate:.1%} hashed_mb={self.bytes_hashed / 1e6:.1f} "
+            f"seconds={self.seconds:.2f} mb_per_s={self.mb_per_s:.1f}"
+        )
+
+
+class StatCache:
+    """
+    On-disk hash cache keyed by (path, size, mtime_ns, inode), stored in SQLite.
+    Entries are only reused for the same root. Lookups hit the database, so
+    the cache never has to fit in memory; commit() replaces the old entries
+    with the ones kept during this run.
+    """
+
+    def __init__(self, path: str, root: str):
+        self.root = os.path.abspath(root)
+        self.db = sqlite3.connect(path)
+        self.db.execute("CREATE TABLE IF NOT EXISTS meta (k TEXT PRIMARY KEY, v TEXT)")
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS entries "
+            "(path TEXT PRIMARY KEY, size INTEGER, mtime_ns INTEGER, inode INTEGER, sha256 TEXT)"
+        )
+        self.db.execute("DROP TABLE IF EXISTS entries_next")
+        self.db.execute("CREATE TABLE entries_next AS SELECT * FROM entries WHERE 0")
+        row = self.db.execute("SELECT v FROM meta WHERE k = 'root'").fetchone()
+        self._valid = bool(row) and row[0] == self.root
+        self._pending = []
+
+    def lookup(self, rel: str, key: tuple) -> str | None:
+        if not self._valid:
+            return None
+        row = self.db.execute("SELECT size, mtime_ns, inode, sha256 FROM entries WHERE path = ?", (rel,)).fetchone()
+        if row is not None and tuple(row[:3]) == key:
+            return row[3]
+        return None
+
+    def keep(self, rel: str, key: tuple, sha: str) -> None:
+        self._pending.append((rel, *key, sha))
+        if len(self._pending) >= 10000:
+            self._flush()
+
+    def _flush(self) -> None:
+        self.db.executemany("INSERT OR REPLACE INTO entries_next VALUES (?, ?, ?, ?, ?)", self._pending)
+        self._pending = []
+
+    def commit(self) -> None:
+        self._flush()
+        with self.db:
+            self.db.execute("DROP TABLE entries")
+            self.db.execute("ALTER TABLE entries_next RENAME TO entries")
+            self.db.execute("CREATE UNIQUE INDEX IF NOT EXISTS entries_path ON entries (path)")
+            self.db.execute("INSERT OR REPLACE INTO meta VALUES ('root', ?)", (self.root,))
+
+    def close(self) -> None:
+        self.db.close()
+
+
+def _batched(it, n: int):
+    batch = []
+    for x in it:
+        batch.append(x)
+        if len(batch) >= n:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def hashwalk(root: str, out_json: str, jobs: int = 1, cache_path: str | None = None, run_size: int = RUN_SIZE) -> HashwalkStats:
+    """
+    Write a sha256 inventory of `root` to `out_json` (`.ndjson` for NDJSON).
+
+    jobs > 1 hashes files on a thread pool (hashlib releases the GIL).
+    cache_path enables incremental mode: files whose size, mtime and inode
+    match the cache are not re-read. Output is identical either way.
+
+    Memory is bounded by `run_size`: hashed entries are spilled in sorted
+    runs and merged straight into the output file.
+    """
+    t0 = time.perf_counter()
+    stats = HashwalkStats()
+    cache = StatCache(cache_path, root) if cache_path else None
+    racy_after = time.time_ns() - RACY_WINDOW_NS
+    pool = ThreadPoolExecutor(max_workers=jobs) if jobs > 1 else None
+
+    try:
+        with ExternalSorter(run_size) as sorter:
+            for batch in _batched(_walk(root), 1024):
+                todo = []
+                for rel, p in batch:
+                    st = os.stat(p)
+                    key = (st.st_size, st.st_mtime_ns, st.st_ino)
+                    sha = cache.lookup(rel, key) if cache else None
+                    if sha is not None:
+                        sorter.add(rel, sha)
+                        cache.keep(rel, key, sha)
+                        stats.cache_hits += 1
+                    else:
+                        todo.append((rel, p, key))
+
+                paths = [p for _, p, _ in todo]
+                digests = pool.map(_sha256_file, paths) if pool and len(paths) > 1 else map(_sha256_file, paths)
+                for (rel, _, key), digest in zip(todo, digests):
+                    sorter.add(rel, digest)
+                    stats.hashed += 1
+                    stats.bytes_hashed += key[0]
+                    if cache and key[1] < racy_after:
+                        cache.keep(rel, key, digest)
+
+            with InventoryWriter(out_json, count=sorter.count) as out:
+                for rel, digest in sorter:
+                    out.write(rel, digest)
+            stats.files = sorter.count
+
+        if cache:
+            cache.commit()
+    finally:
+        if pool:
+            pool.shutdown()
+        if cache:
+            cache.close()
+
+    stats.seconds = time.perf_counter() - t0
+    return stats
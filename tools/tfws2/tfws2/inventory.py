@@ -0,0 +1,370 @@
+"""
+Streaming access to sha256 inventories.
+
+Inventories are read and written one entry at a time, so tools work on
+inventories larger than memory. Entries are (path, sha256) tuples.
+
+Formats:
+  json    sha256.json as written by `tfws2 hashwalk` (one document)
+  ndjson  one {"path": ..., "sha256": ...} object per line
+  sha256  coreutils `sha256sum` lines, `<hash> *./path` (v2/inventory.sha256)
+
+In the sha256 format a leading "./" is dropped on read and added on write,
+so paths compare equal across formats.
+"""
+from __future__ import annotations
+
+import heapq
+import json
+import mmap
+import os
+import re
+import shutil
+import tempfile
+from operator import itemgetter
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+Entry = Tuple[str, str]
+
+CHUNK = 1024 * 1024
+# Entries held in memory before a sorted run is spilled to disk.
+RUN_SIZE = 200_000
+
+_WS = re.compile(r"[ \t\n\r]*")
+_decoder = json.JSONDecoder()
+# <hash> <' '|'*'><path>; a leading backslash marks an escaped path (coreutils)
+_SUM_LINE = re.compile(rb"^(\\?)([0-9a-fA-F]{64}) [ *](.*?)\r?$", re.M)
+
+
+def _format_for_name(path: str) -> Optional[str]:
+    if path.endswith((".ndjson", ".jsonl")):
+        return "ndjson"
+    if path.endswith((".sha256", ".sha256sum", "SHA256SUMS")):
+        return "sha256"
+    return None
+
+
+def detect_format(path: str) -> str:
+    by_name = _format_for_name(path)
+    if by_name:
+        return by_name
+    with open(path, "rb") as f:
+        head = f.readline(65536)
+    if _SUM_LINE.match(head):
+        return "sha256"
+    first = head.decode("utf-8", errors="replace")
+    try:
+        obj = json.loads(first)
+    except ValueError:
+        return "json"
+    return "ndjson" if isinstance(obj, dict) and "path" in obj else "json"
+
+
+class _Scanner:
+    """Pulls JSON values out of a text stream without reading it whole."""
+
+    def __init__(self, f):
+        self.f = f
+        self.buf = ""
+        self.pos = 0
+
+    def _fill(self) -> bool:
+        chunk = self.f.read(CHUNK)
+        if not chunk:
+            return False
+        self.buf = self.buf[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def peek(self) -> str:
+        while True:
+            self.pos = _WS.match(self.buf, self.pos).end()
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self._fill():
+                return ""
+
+    def expect(self, ch: str) -> None:
+        if self.peek() != ch:
+            raise ValueError(f"malformed_inventory: expected {ch!r}")
+        self.pos += 1
+
+    def value(self):
+        self.peek()
+        while True:
+            try:
+                v, end = _decoder.raw_decode(self.buf, self.pos)
+            except json.JSONDecodeError:
+                if not self._fill():
+                    raise ValueError("malformed_inventory")
+                continue
+            # A value ending exactly at the buffer edge may be truncated (e.g. a number).
+            if end == len(self.buf) and self._fill():
+                continue
+            self.pos = end
+            return v
+
+
+def _entry(it) -> Optional[Entry]:
+    if isinstance(it, dict) and "path" in it and "sha256" in it:
+        return it["path"], it["sha256"]
+    return None
+
+
+def _iter_json(f) -> Iterator[Entry]:
+    s = _Scanner(f)
+    s.expect("{")
+    if s.peek() == "}":
+        return
+    while True:
+        key = s.value()
+        s.expect(":")
+        if key == "files":
+            s.expect("[")
+            if s.peek() == "]":
+                s.pos += 1
+            else:
+                while True:
+                    e = _entry(s.value())
+                    if e is not None:
+                        yield e
+                    c = s.peek()
+                    s.pos += 1
+                    if c == "]":
+                        break
+                    if c != ",":
+                        raise ValueError("malformed_inventory: expected ',' or ']'")
+        else:
+            s.value()
+        c = s.peek()
+        s.pos += 1
+        if c == "}":
+            return
+        if c != ",":
+            raise ValueError("malformed_inventory: expected ',' or '}'")
+
+
+def _iter_ndjson(f) -> Iterator[Entry]:
+    for line in f:
+        if line.strip():
+            e = _entry(json.loads(line))
+            if e is not None:
+                yield e
+
+
+def _unescape(p: str) -> str:
+    return re.sub(r"\\(.)", lambda m: "\n" if m.group(1) == "n" else m.group(1), p)
+
+
+def _norm(p: str) -> str:
+    return p[2:] if p.startswith("./") else p
+
+
+def _iter_sha256(path: str) -> Iterator[Entry]:
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+            for match in _SUM_LINE.finditer(m):
+                escaped, digest, name = match.groups()
+                p = name.decode("utf-8")
+                if escaped:
+                    p = _unescape(p)
+                yield _norm(p), digest.decode("ascii").lower()
+
+
+def iter_inventory(path: str) -> Iterator[Entry]:
+    """Yield (path, sha256) entries in file order. Malformed items are skipped."""
+    fmt = detect_format(path)
+    if fmt == "sha256":
+        yield from _iter_sha256(path)
+        return
+    with open(path, "r", encoding="utf-8") as f:
+        yield from (_iter_ndjson(f) if fmt == "ndjson" else _iter_json(f))
+
+
+class InventoryWriter:
+    """
+    Writes entries as they arrive. The json format is byte-identical to
+    json.dump(doc, indent=2) of a hashwalk document, which is why `count`
+    has to be known up front.
+    """
+
+    def __init__(self, path: str, count: int, fmt: str | None = None, root: str = "."):
+        self.path = path
+        self.count = count
+        self.fmt = fmt or _format_for_name(path) or "json"
+        self.root = root
+        self._f = None
+        self._n = 0
+
+    def __enter__(self) -> "InventoryWriter":
+        self._f = open(self.path, "w", encoding="utf-8")
+        if self.fmt == "json":
+            self._f.write(
+                "{\n"
+                '  "schema_version": "2.0",\n'
+                f'  "root": {json.dumps(self.root, ensure_ascii=False)},\n'
+                '  "algo": "sha256",\n'
+                f'  "count": {self.count},\n'
+                '  "files": ['
+            )
+        return self
+
+    def write(self, path: str, sha256: str) -> None:
+        p = json.dumps(path, ensure_ascii=False)
+        h = json.dumps(sha256, ensure_ascii=False)
+        if self.fmt == "sha256":
+            if "\\" in path or "\n" in path:
+                self._f.write("\\" + sha256 + " *./" + path.replace("\\", "\\\\").replace("\n", "\\n") + "\n")
+            else:
+                self._f.write(f"{sha256} *./{path}\n")
+            self._n += 1
+            return
+        if self.fmt == "json":
+            sep = "," if self._n else ""
+            self._f.write(f'{sep}\n    {{\n      "path": {p},\n      "sha256": {h}\n    }}')
+        else:
+            self._f.write(f'{{"path": {p}, "sha256": {h}}}\n')
+        self._n += 1
+
+    def __exit__(self, *exc) -> None:
+        if self.fmt == "json":
+            self._f.write("\n  ]\n}" if self._n else "]\n}")
+        self._f.close()
+
+
+class ExternalSorter:
+    """
+    Sorts entries by path with bounded memory: every `run_size` entries are
+    sorted and spilled to a temp file, then the runs are k-way merged.
+    Equal paths keep insertion order.
+    """
+
+    def __init__(self, run_size: int = RUN_SIZE, tmpdir: str | None = None):
+        self.run_size = run_size
+        self.tmpdir = tmpdir
+        self.count = 0
+        self._buf: List[Entry] = []
+        self._runs: List[str] = []
+        self._dir: str | None = None
+
+    def add(self, path: str, sha256: str) -> None:
+        self._buf.append((path, sha256))
+        self.count += 1
+        if len(self._buf) >= self.run_size:
+            self._spill()
+
+    def _spill(self) -> None:
+        if self._dir is None:
+            self._dir = tempfile.mkdtemp(prefix="tfws2-sort-", dir=self.tmpdir)
+        self._buf.sort(key=itemgetter(0))
+        run = os.path.join(self._dir, f"run{len(self._runs)}.ndjson")
+        with open(run, "w", encoding="utf-8") as f:
+            for e in self._buf:
+                f.write(json.dumps(e, ensure_ascii=False) + "\n")
+        self._runs.append(run)
+        self._buf = []
+
+    @staticmethod
+    def _read(run: str) -> Iterator[Entry]:
+        with open(run, "r", encoding="utf-8") as f:
+            for line in f:
+                p, h = json.loads(line)
+                yield p, h
+
+    def __iter__(self) -> Iterator[Entry]:
+        if not self._runs:
+            self._buf.sort(key=itemgetter(0))
+            return iter(self._buf)
+        if self._buf:
+            self._spill()
+        return heapq.merge(*[self._read(r) for r in self._runs], key=itemgetter(0))
+
+    def close(self) -> None:
+        if self._dir is not None:
+            shutil.rmtree(self._dir, ignore_errors=True)
+            self._dir = None
+
+    def __enter__(self) -> "ExternalSorter":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+def _dedupe(entries: Iterable[Entry]) -> Iterator[Entry]:
+    """Collapse repeated paths in a sorted stream, keeping the last (dict semantics)."""
+    prev: Optional[Entry] = None
+    for e in entries:
+        if prev is not None and e[0] != prev[0]:
+            yield prev
+        prev = e
+    if prev is not None:
+        yield prev
+
+
+def _is_sorted(entries: Iterable[Entry]) -> bool:
+    prev = None
+    for p, _ in entries:
+        if prev is not None and p < prev:
+            return False
+        prev = p
+    return True
+
+
+def sorted_entries(path: str, run_size: int = RUN_SIZE) -> Iterator[Entry]:
+    """
+    Yield an inventory's entries sorted by path with unique paths. Already
+    sorted inventories (everything hashwalk writes) are streamed as-is;
+    others go through an external sort.
+    """
+    if _is_sorted(iter_inventory(path)):
+        yield from _dedupe(iter_inventory(path))
+        return
+    with ExternalSorter(run_size) as s:
+        for p, h in iter_inventory(path):
+            s.add(p, h)
+        yield from _dedupe(s)
+
+
+def join_sorted(a: Iterable[Entry], b: Iterable[Entry]) -> Iterator[Tuple[str, Optional[str], Optional[str]]]:
+    """
+    Full outer join of two path-sorted streams in one pass:
+    yields (path, sha256_in_a | None, sha256_in_b | None).
+    """
+    a, b = iter(a), iter(b)
+    x, y = next(a, None), next(b, None)
+    while x is not None or y is not None:
+        if y is None or (x is not None and x[0] < y[0]):
+            yield x[0], x[1], None
+            x = next(a, None)
+        elif x is None or y[0] < x[0]:
+            yield y[0], None, y[1]
+            y = next(b, None)
+        else:
+            yield x[0], x[1], y[1]
+            x, y = next(a, None), next(b, None)
+
+
+def _tag(entries: Iterable[Entry], i: int) -> Iterator[Tuple[str, int, str]]:
+    for p, h in entries:
+        yield p, i, h
+
+
+def join_many(streams: List[Iterable[Entry]]) -> Iterator[Tuple[str, List[Optional[str]]]]:
+    """
+    Full outer join of any number of path-sorted streams in one pass:
+    yields (path, [sha256 in stream i | None, ...]).
+    """
+    n = len(streams)
+    cur: Optional[str] = None
+    row: List[Optional[str]] = []
+    for p, i, h in heapq.merge(*[_tag(s, i) for i, s in enumerate(streams)]):
+        if p != cur:
+            if cur is not None:
+                yield cur, row
+            cur, row = p, [None] * n
+        row[i] = h
+    if cur is not None:
+        yield cur, row
@@ -17,7 +17,7 @@ def pick_signature_for_inventory(inventory_path: str, sigdir: str | None = None)
         return cand2
     raise FileNotFoundError(f"no_signature_found for {base} in {d}")
 
-def verify_inventory(pubkey_path: str, inventory_path: str, sigdir: str | None = None):
+def verify_inventory(pubkey_path: str, inventory_path: str, sigdir: str | None = None, backend: str = "native"):
     sig = pick_signature_for_inventory(inventory_path, sigdir=sigdir)
-    ok, info = verify_minisign_detached(pubkey_path, inventory_path, str(sig))
+    ok, info = verify_minisign_detached(pubkey_path, inventory_path, str(sig), backend=backend)
     return ok, info, str(sig)
@@ -1,43 +1,172 @@
-from __future__ import annotations
-
-import json
-from dataclasses import dataclass
-from datetime import datetime, timezone
-from pathlib import Path
-
-
-def _parse_dt(s: str) -> datetime:
-    if s.endswith("Z"):
-        s = s[:-1] + "+00:00"
-    return datetime.fromisoformat(s).astimezone(timezone.utc)
-
-
-@dataclass
-class KeyDecision:
-    ok: bool
-    reason: str
-    kid: str | None = None
-
-
-def check_key_epoch(key_history_path: str, kid: str, at_iso: str) -> KeyDecision:
-    data = json.loads(Path(key_history_path).read_text(encoding="utf-8"))
-    at = _parse_dt(at_iso)
-
-    for k in data.get("keys", []):
-        if k.get("kid") != kid:
-            continue
-
-        status = k.get("status")
-        nb = _parse_dt(k["not_before"])
-        na = _parse_dt(k["not_after"]) if k.get("not_after") else None
-
-        if status == "revoked":
-            return KeyDecision(False, "kid_revoked", kid=kid)
-        if at < nb:
-            return KeyDecision(False, "before_not_before", kid=kid)
-        if na and at > na:
-            return KeyDecision(False, "after_not_after", kid=kid)
-
-        return KeyDecision(True, "ok", kid=kid)
-
-    return KeyDecision(False, "kid_not_found", kid=kid)
+from __future__ import annotations
+
+import bisect
+import json
+import os
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+
+def _parse_dt(s: str) -> datetime:
+    if s.endswith("Z"):
+        s = s[:-1] + "+00:00"
+    return datetime.fromisoformat(s).astimezone(timezone.utc)
+
+
+@lru_cache(maxsize=4096)
+def _ts(s: str) -> float:
+    """ISO8601 -> POSIX seconds; query times repeat a lot in batches."""
+    return _parse_dt(s).timestamp()
+
+
+@dataclass
+class KeyDecision:
+    ok: bool
+    reason: str
+    kid: str | None = None
+
+
+@dataclass(frozen=True)
+class _Epoch:
+    not_before: float
+    not_after: Optional[float]
+    status: str
+    pubkey_path: Optional[str] = None
+
+
+class KeyHistoryIndex:
+    """
+    key-history.json parsed once: timestamps pre-parsed, epochs grouped by
+    kid and sorted by not_before so a lookup is a dict hit plus a bisect.
+
+    The file is re-stat'ed at most every `check_interval` seconds and
+    reloaded when its mtime or size changed.
+
+    A kid with several epochs is valid at `at` when the latest epoch that
+    started at or before `at` has not ended; a revoked epoch revokes the kid.
+    """
+
+    def __init__(self, path: str | os.PathLike, check_interval: float = 1.0):
+        self.path = os.path.abspath(path)
+        self.check_interval = check_interval
+        self._sig: Optional[Tuple[int, int]] = None
+        self._checked = 0.0
+        self._lock = threading.Lock()
+        # (kid -> sorted epochs, kid -> their not_before values, revoked kids);
+        # swapped as one tuple so readers never see half a reload
+        self._state: Tuple[Dict[str, List[_Epoch]], Dict[str, List[float]], set] = ({}, {}, set())
+        self.reload()
+
+    @staticmethod
+    def _index(data: Dict) -> Tuple[Dict[str, List[_Epoch]], Dict[str, List[float]], set]:
+        epochs: Dict[str, List[_Epoch]] = {}
+        revoked = set()
+        for k in data.get("keys", []):
+            kid = k.get("kid")
+            status = k.get("status")
+            if status == "revoked":
+                revoked.add(kid)
+            na = k.get("not_after")
+            epochs.setdefault(kid, []).append(
+                _Epoch(_ts(k["not_before"]), _ts(na) if na else None, status, k.get("pubkey_path"))
+            )
+        for eps in epochs.values():
+            eps.sort(key=lambda e: e.not_before)
+        starts = {kid: [e.not_before for e in eps] for kid, eps in epochs.items()}
+        return epochs, starts, revoked
+
+    @classmethod
+    def from_document(cls, data: Dict) -> "KeyHistoryIndex":
+        """Index of an already parsed key-history document (e.g. fetched); never reloaded."""
+        idx = cls.__new__(cls)
+        idx.path = None
+        idx.check_interval = float("inf")
+        idx._sig = None
+        idx._checked = 0.0
+        idx._lock = threading.Lock()
+        idx._state = cls._index(data)
+        return idx
+
+    def reload(self) -> None:
+        with self._lock:
+            st = os.stat(self.path)
+            self._state = self._index(json.loads(Path(self.path).read_text(encoding="utf-8")))
+            self._sig = (st.st_mtime_ns, st.st_size)
+            self._checked = time.monotonic()
+
+    def kids_for(self, refs: Iterable[str]) -> List[str]:
+        """Kids whose id or any epoch's pubkey_path is in `refs`."""
+        refs = set(refs)
+        epochs = self._state[0]
+        return [kid for kid, eps in epochs.items() if kid in refs or any(e.pubkey_path in refs for e in eps)]
+
+    def _maybe_reload(self) -> None:
+        if self.path is None:
+            return
+        now = time.monotonic()
+        if now - self._checked < self.check_interval:
+            return
+        st = os.stat(self.path)
+        if (st.st_mtime_ns, st.st_size) != self._sig:
+            self.reload()
+        else:
+            self._checked = now
+
+    @staticmethod
+    def _decide(state, kid: str, at: float) -> KeyDecision:
+        epochs, all_starts, revoked = state
+        starts = all_starts.get(kid)
+        if starts is None:
+            return KeyDecision(False, "kid_not_found", kid=kid)
+        if kid in revoked:
+            return KeyDecision(False, "kid_revoked", kid=kid)
+        i = bisect.bisect_right(starts, at) - 1
+        if i < 0:
+            return KeyDecision(False, "before_not_before", kid=kid)
+        na = epochs[kid][i].not_after
+        if na is not None and at > na:
+            return KeyDecision(False, "after_not_after", kid=kid)
+        return KeyDecision(True, "ok", kid=kid)
+
+    def check(self, kid: str, at_iso: str) -> KeyDecision:
+        self._maybe_reload()
+        return self._decide(self._state, kid, _ts(at_iso))
+
+    def check_many(self, pairs: Iterable[Tuple[str, str]]) -> List[KeyDecision]:
+        """One decision per (kid, at_iso) pair, against a single snapshot of the file."""
+        self._maybe_reload()
+        state = self._state
+        out = []
+        for kid, at_iso in pairs:
+            try:
+                at = _ts(at_iso)
+            except ValueError:
+                out.append(KeyDecision(False, "invalid_time", kid=kid))
+                continue
+            out.append(self._decide(state, kid, at))
+        return out
+
+
+_indexes: Dict[str, KeyHistoryIndex] = {}
+_indexes_lock = threading.Lock()
+
+
+def get_index(key_history_path: str | os.PathLike) -> KeyHistoryIndex:
+    """Process-wide index for a key-history file."""
+    key = os.path.abspath(key_history_path)
+    idx = _indexes.get(key)
+    if idx is None:
+        with _indexes_lock:
+            idx = _indexes.get(key)
+            if idx is None:
+                idx = _indexes[key] = KeyHistoryIndex(key)
+    return idx
+
+
+def check_key_epoch(key_history_path: str, kid: str, at_iso: str) -> KeyDecision:
+    return get_index(key_history_path).check(kid, at_iso)
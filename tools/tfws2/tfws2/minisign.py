@@ -0,0 +1,208 @@
+"""
+In-process minisign verification.
+
+Public key (second line of minisign.pub, base64):
+    "Ed" | key_id (8) | ed25519 public key (32)
+
+Signature (.minisig):
+    untrusted comment: ...
+    base64("Ed"|"ED" | key_id (8) | signature (64))
+    trusted comment: ...
+    base64(global signature (64))
+
+"ED" signatures are over BLAKE2b-512(message) ("hashed" in minisign output),
+"Ed" (legacy) over the raw message. The global signature covers
+signature || trusted comment and is always checked.
+"""
+from __future__ import annotations
+
+import base64
+import binascii
+import hashlib
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Tuple
+
+from . import _ed25519
+
+ALG_LEGACY = b"Ed"
+ALG_HASHED = b"ED"
+
+_TRUSTED_PREFIX = "trusted comment: "
+
+
+class MinisignError(ValueError):
+    pass
+
+
+def _load_ed25519_backend():
+    try:
+        from cryptography.exceptions import InvalidSignature
+        from cryptography.hazmat.primitives.asymmetric.ed25519 import Ed25519PublicKey
+
+        load = lru_cache(maxsize=256)(Ed25519PublicKey.from_public_bytes)
+
+        def verify(pk: bytes, msg: bytes, sig: bytes) -> bool:
+            try:
+                load(pk).verify(sig, msg)
+            except InvalidSignature:
+                return False
+            return True
+
+        return "cryptography", verify
+    except ImportError:
+        pass
+    try:
+        from nacl.exceptions import BadSignatureError
+        from nacl.signing import VerifyKey
+
+        load = lru_cache(maxsize=256)(VerifyKey)
+
+        def verify(pk: bytes, msg: bytes, sig: bytes) -> bool:
+            try:
+                load(pk).verify(msg, sig)
+            except BadSignatureError:
+                return False
+            return True
+
+        return "pynacl", verify
+    except ImportError:
+        pass
+    return "python", _ed25519.verify
+
+
+BACKEND, _ed25519_verify = _load_ed25519_backend()
+
+
+@dataclass(frozen=True)
+class PublicKey:
+    key_id: bytes
+    key: bytes
+
+    @property
+    def key_id_hex(self) -> str:
+        # minisign prints key ids as big-endian hex of the little-endian bytes
+        return self.key_id[::-1].hex().upper()
+
+
+@dataclass(frozen=True)
+class Signature:
+    algorithm: bytes
+    key_id: bytes
+    signature: bytes
+    trusted_comment: bytes
+    global_signature: bytes
+
+    @property
+    def prehashed(self) -> bool:
+        return self.algorithm == ALG_HASHED
+
+
+def _b64(s: str, what: str) -> bytes:
+    try:
+        return base64.b64decode(s.strip(), validate=True)
+    except (binascii.Error, ValueError):
+        raise MinisignError(f"malformed_{what}")
+
+
+def _lines(data: bytes | str) -> list[str]:
+    if not isinstance(data, str):
+        try:
+            data = bytes(data).decode("utf-8")
+        except UnicodeDecodeError:
+            raise MinisignError("malformed_encoding")
+    return [ln.rstrip("\r") for ln in data.split("\n")]
+
+
+def parse_public_key(data: bytes | str) -> PublicKey:
+    """Accepts a minisign.pub file body or the bare base64 key line."""
+    lines = [ln for ln in _lines(data) if ln.strip() and not ln.startswith("untrusted comment:")]
+    if not lines:
+        raise MinisignError("malformed_pubkey")
+    raw = _b64(lines[0], "pubkey")
+    if len(raw) != 42 or raw[:2] != ALG_LEGACY:
+        raise MinisignError("malformed_pubkey")
+    return PublicKey(key_id=raw[2:10], key=raw[10:])
+
+
+def parse_signature(data: bytes | str) -> Signature:
+    lines = _lines(data)
+    if len(lines) < 4 or not lines[2].startswith(_TRUSTED_PREFIX):
+        raise MinisignError("malformed_signature")
+    raw = _b64(lines[1], "signature")
+    if len(raw) != 74:
+        raise MinisignError("malformed_signature")
+    if raw[:2] not in (ALG_LEGACY, ALG_HASHED):
+        raise MinisignError("unsupported_algorithm")
+    global_sig = _b64(lines[3], "signature")
+    if len(global_sig) != 64:
+        raise MinisignError("malformed_signature")
+    return Signature(
+        algorithm=raw[:2],
+        key_id=raw[2:10],
+        signature=raw[10:],
+        trusted_comment=lines[2][len(_TRUSTED_PREFIX):].encode("utf-8"),
+        global_signature=global_sig,
+    )
+
+
+Buffer = bytes | bytearray | memoryview
+
+# Legacy ("Ed") signatures cover the raw message, so it has to be held in
+# memory; prehashed ("ED") ones only need the running BLAKE2b state.
+LEGACY_MAX_MESSAGE = 8 * 1024 * 1024
+
+
+def _check(pubkey: PublicKey, signed: Buffer, sig: Signature) -> Tuple[bool, str]:
+    if sig.key_id != pubkey.key_id:
+        return False, "key_id_mismatch"
+    if not _ed25519_verify(pubkey.key, bytes(signed), sig.signature):
+        return False, "signature_verification_failed"
+    if not _ed25519_verify(pubkey.key, sig.signature + sig.trusted_comment, sig.global_signature):
+        return False, "trusted_comment_verification_failed"
+    return True, "ok"
+
+
+def verify(pubkey: PublicKey, message: Buffer, sig: Signature) -> Tuple[bool, str]:
+    """
+    Verify `message` (any bytes-like buffer) against a parsed signature.
+    Returns (ok, info) like verify_minisign_detached.
+    """
+    signed = hashlib.blake2b(message, digest_size=64).digest() if sig.prehashed else message
+    return _check(pubkey, signed, sig)
+
+
+class MessageHasher:
+    """
+    Incremental message input for verification, fed chunk by chunk.
+
+    Memory stays constant for prehashed signatures. Raw bytes are kept only
+    up to `keep_raw` bytes, for legacy signatures; use for_signature() when
+    the signature is known up front to skip that entirely.
+    """
+
+    def __init__(self, keep_raw: int = LEGACY_MAX_MESSAGE):
+        self._hash = hashlib.blake2b(digest_size=64)
+        self._keep_raw = keep_raw
+        self._raw: bytearray | None = bytearray() if keep_raw > 0 else None
+        self.size = 0
+
+    @classmethod
+    def for_signature(cls, sig: Signature) -> "MessageHasher":
+        return cls(keep_raw=0 if sig.prehashed else LEGACY_MAX_MESSAGE)
+
+    def update(self, chunk: Buffer) -> None:
+        self._hash.update(chunk)
+        self.size += len(chunk)
+        if self._raw is not None:
+            if self.size > self._keep_raw:
+                self._raw = None
+            else:
+                self._raw += chunk
+
+    def verify(self, pubkey: PublicKey, sig: Signature) -> Tuple[bool, str]:
+        if sig.prehashed:
+            return _check(pubkey, self._hash.digest(), sig)
+        if self._raw is None:
+            return False, "legacy_signature_message_too_large"
+        return _check(pubkey, self._raw, sig)
@@ -1,9 +1,29 @@
 import subprocess
 from pathlib import Path
 
-def verify_minisign_detached(pubkey_path: str, message_path: str, sig_path: str):
+from .minisign import Buffer, MessageHasher, MinisignError, parse_public_key, parse_signature, verify
+
+CHUNK = 1024 * 1024
+
+
+def _verify_cli(pubkey: Path, msg: Path, sig: Path):
+    cmd = ["minisign", "-V", "-p", str(pubkey), "-m", str(msg), "-x", str(sig)]
+    try:
+        r = subprocess.run(cmd, capture_output=True, text=True)
+    except FileNotFoundError:
+        return False, "minisign_not_in_path"
+
+    if r.returncode == 0:
+        return True, "ok"
+    detail = (r.stderr or r.stdout or "").strip()
+    return False, detail[:400] if detail else "verify_failed"
+
+
+def verify_minisign_detached(pubkey_path: str, message_path: str, sig_path: str, backend: str = "native"):
     """
-    Verifies a detached minisign signature using the minisign CLI.
+    Verifies a detached minisign signature.
+    backend="native" verifies in-process (tfws2.minisign); backend="cli" runs
+    the minisign binary.
     Returns (ok: bool, info: str).
     """
     pubkey = Path(pubkey_path)
@@ -17,13 +37,35 @@ def verify_minisign_detached(pubkey_path: str, message_path: str, sig_path: str)
     if not sig.exists():
         return False, "sig_not_found"
 
-    cmd = ["minisign", "-V", "-p", str(pubkey), "-m", str(msg), "-x", str(sig)]
+    if backend == "cli":
+        return _verify_cli(pubkey, msg, sig)
+
     try:
-        r = subprocess.run(cmd, capture_output=True, text=True)
-    except FileNotFoundError:
-        return False, "minisign_not_in_path"
+        pk = parse_public_key(pubkey.read_bytes())
+        s = parse_signature(sig.read_bytes())
+    except MinisignError as e:
+        return False, str(e)
 
-    if r.returncode == 0:
-        return True, "ok"
-    detail = (r.stderr or r.stdout or "").strip()
-    return False, detail[:400] if detail else "verify_failed"
+    if not s.prehashed:
+        return verify(pk, msg.read_bytes(), s)
+
+    # Stream the message so large inventories verify in constant memory.
+    hasher = MessageHasher.for_signature(s)
+    with msg.open("rb") as f:
+        for chunk in iter(lambda: f.read(CHUNK), b""):
+            hasher.update(chunk)
+    return hasher.verify(pk, s)
+
+
+def verify_minisign_bytes(pubkey: Buffer, message: Buffer, sig: Buffer):
+    """
+    Same as verify_minisign_detached, over in-memory buffers (bytes,
+    bytearray or memoryview) instead of paths. Nothing touches disk.
+    Returns (ok: bool, info: str).
+    """
+    try:
+        pk = parse_public_key(pubkey)
+        s = parse_signature(sig)
+    except MinisignError as e:
+        return False, str(e)
+    return verify(pk, message, s)
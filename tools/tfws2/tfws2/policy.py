@@ -0,0 +1,260 @@
+from __future__ import annotations
+
+import json
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Tuple
+
+GRADE_ORDER = ["A", "B", "C", "D", "E", "F", "UNKNOWN"]
+
+ACTIONS = ("allow", "warn", "quarantine", "block")
+ALLOW, WARN, QUARANTINE, BLOCK = range(4)
+
+# results that trigger a bare `code` entry of each list; `code:result` entries match exactly
+DEFAULT_RESULTS = {
+    "block_on": ("fail", "warn"),
+    "quarantine_on": ("fail", "warn", "unknown"),
+    "warn_on": ("fail", "warn", "unknown"),
+}
+LIST_ACTIONS = (("block_on", BLOCK), ("quarantine_on", QUARANTINE), ("warn_on", WARN))
+
+GRADE_REASON = "policy:grade_too_low"
+CONFIDENCE_REASON = "policy:low_confidence"
+PASS_REASON = "policy:pass"
+
+
+def _grade_index(grade: Any) -> int:
+    try:
+        return GRADE_ORDER.index(grade)
+    except ValueError:
+        return len(GRADE_ORDER) - 1
+
+
+def observed_codes(trust_state: Dict[str, Any]) -> List[str]:
+    return [f"{s.get('code')}:{s.get('result')}" for s in trust_state.get("signals") or [] if s.get("code")]
+
+
+@dataclass
+class CompiledPolicy:
+    """
+    A policy file turned into lookup tables.
+
+    Rules are ranked in evaluation order (block_on, quarantine_on, warn_on,
+    each in file order). `rules` maps (code, result) to the best rank that
+    fires on it; `by_code` holds the same as code -> result -> rank, so a
+    signal costs two dict hits and no key building, plus the precomputed
+    grade gate per trust-state.
+
+    For throughput, decide_batch() handles many trust-states per call and
+    encode() + decide_columns() (NumPy) many more; benchmarks/bench_policy.py
+    measures both on the current machine.
+
+    Semantics: the first firing block/quarantine rule wins; otherwise a
+    grade below min_grade_allow blocks, confidence below
+    min_confidence_allow warns, then warn rules; otherwise allow.
+    """
+
+    rules: Dict[Tuple[str, str], int]
+    by_code: Dict[str, Dict[str, int]]
+    actions: List[int]          # rank -> action
+    reasons: List[str]          # rank -> reason; gate and pass reasons follow the rules
+    grade_ok: Dict[str, bool]
+    unknown_grade_ok: bool
+    min_confidence: float
+    n_hard: int                 # ranks below this are block/quarantine rules
+
+    @classmethod
+    def compile(cls, policy: Dict[str, Any]) -> "CompiledPolicy":
+        ranked: List[Tuple[int, str, str, Tuple[str, ...]]] = []
+        for name, action in LIST_ACTIONS:
+            for entry in policy.get(name) or []:
+                code, sep, result = str(entry).partition(":")
+                ranked.append((action, f"policy:{name}:{entry}", code, (result,) if sep else DEFAULT_RESULTS[name]))
+
+        rules: Dict[Tuple[str, str], int] = {}
+        for rank, (_, _, code, results) in enumerate(ranked):
+            for r in results:
+                rules.setdefault((code, r), rank)
+
+        by_code: Dict[str, Dict[str, int]] = {}
+        for (code, r), rank in rules.items():
+            by_code.setdefault(code, {})[r] = rank
+
+        min_idx = _grade_index(policy.get("min_grade_allow", "B"))
+        grade_ok = {g: i <= min_idx for i, g in enumerate(GRADE_ORDER)}
+        return cls(
+            rules=rules,
+            by_code=by_code,
+            actions=[a for a, _, _, _ in ranked],
+            reasons=[r for _, r, _, _ in ranked],
+            grade_ok=grade_ok,
+            unknown_grade_ok=grade_ok["UNKNOWN"],
+            min_confidence=float(policy.get("min_confidence_allow", 0.6)),
+            n_hard=sum(1 for a, _, _, _ in ranked if a != WARN),
+        )
+
+    def _best(self, trust_state: Dict[str, Any]) -> int:
+        """Best firing rank among the signals (len(actions): none fires)."""
+        best = none = len(self.actions)
+        by_code = self.by_code
+        for s in trust_state.get("signals") or ():
+            results = by_code.get(s.get("code"))
+            if results is not None:
+                rank = results.get(s.get("result"), none)
+                if rank < best:
+                    best = rank
+        return best
+
+    def _evaluate(self, trust_state: Dict[str, Any]) -> Tuple[int, str, Any, float]:
+        score = trust_state.get("score") or {}
+        grade = score.get("grade", "UNKNOWN")
+        confidence = float(score.get("confidence", 0.0))
+
+        best = self._best(trust_state)
+        if best < self.n_hard:
+            return self.actions[best], self.reasons[best], grade, confidence
+        if not self.grade_ok.get(grade, self.unknown_grade_ok):
+            return BLOCK, GRADE_REASON, grade, confidence
+        if confidence < self.min_confidence:
+            return WARN, CONFIDENCE_REASON, grade, confidence
+        if best < len(self.actions):
+            return WARN, self.reasons[best], grade, confidence
+        return ALLOW, PASS_REASON, grade, confidence
+
+    def decide(self, trust_state: Dict[str, Any]) -> Dict[str, Any]:
+        action, reason, grade, confidence = self._evaluate(trust_state)
+        return {
+            "decision": ACTIONS[action],
+            "reason": reason,
+            "observed": observed_codes(trust_state),
+            "grade": grade,
+            "confidence": confidence,
+        }
+
+    def decide_batch(self, trust_states: Iterable[Dict[str, Any]], full: bool = False) -> List[Any]:
+        """Decisions for many trust-states: action names, or full results with `full`."""
+        if full:
+            return [self.decide(ts) for ts in trust_states]
+        # _evaluate() inlined with everything bound to locals: this is the hot loop
+        best_of, n_rules, n_hard = self._best, len(self.actions), self.n_hard
+        rule_names = [ACTIONS[a] for a in self.actions]
+        grade_ok, unknown_ok, min_confidence = self.grade_ok, self.unknown_grade_ok, self.min_confidence
+        block, warn, allow = ACTIONS[BLOCK], ACTIONS[WARN], ACTIONS[ALLOW]
+        out = []
+        append = out.append
+        for ts in trust_states:
+            best = best_of(ts)
+            if best < n_hard:
+                append(rule_names[best])
+                continue
+            score = ts.get("score") or {}
+            if not grade_ok.get(score.get("grade", "UNKNOWN"), unknown_ok):
+                append(block)
+            elif float(score.get("confidence", 0.0)) < min_confidence or best < n_rules:
+                append(warn)
+            else:
+                append(allow)
+        return out
+
+    # -- columnar evaluation (NumPy) --------------------------------------
+
+    def encode(self, trust_states: Iterable[Dict[str, Any]]):
+        """
+        Encode trust-states as columns for decide_columns(): grade index,
+        confidence, and per-state best firing rank (len(actions) = none).
+        """
+        import numpy as np
+
+        states = list(trust_states)
+        grade_idx = np.empty(len(states), dtype=np.int8)
+        confidence = np.empty(len(states), dtype=np.float64)
+        best = np.empty(len(states), dtype=np.int32)
+        for i, ts in enumerate(states):
+            score = ts.get("score") or {}
+            grade_idx[i] = _grade_index(score.get("grade", "UNKNOWN"))
+            confidence[i] = float(score.get("confidence", 0.0))
+            best[i] = self._best(ts)
+        return grade_idx, confidence, best
+
+    def decide_columns(self, grade_idx, confidence, best):
+        """
+        Vectorised decide over encoded columns. Returns (action, reason_id)
+        arrays; reason_id indexes reason_names().
+        """
+        import numpy as np
+
+        n_rules = len(self.actions)
+        grade_ok = np.array([self.grade_ok[g] for g in GRADE_ORDER], dtype=bool)
+        rule_action = np.array(self.actions + [ALLOW], dtype=np.int8)
+
+        hard = best < self.n_hard
+        bad_grade = ~grade_ok[grade_idx]
+        low_conf = confidence < self.min_confidence
+        warned = best < n_rules
+
+        action = np.select(
+            [hard, bad_grade, low_conf, warned],
+            [rule_action[best], BLOCK, WARN, WARN],
+            ALLOW,
+        ).astype(np.int8)
+        reason = np.select(
+            [hard, bad_grade, low_conf, warned],
+            [best, n_rules, n_rules + 1, best],
+            n_rules + 2,
+        ).astype(np.int32)
+        return action, reason
+
+    def reason_names(self) -> List[str]:
+        return self.reasons + [GRADE_REASON, CONFIDENCE_REASON, PASS_REASON]
+
+
+def compile_policy(policy: Dict[str, Any]) -> CompiledPolicy:
+    return CompiledPolicy.compile(policy)
+
+
+class PolicyStore:
+    """
+    Compiled policies by file path. A file is re-stat'ed at most every
+    `check_interval` seconds and recompiled only when its mtime or size changed.
+    """
+
+    def __init__(self, check_interval: float = 1.0):
+        self.check_interval = check_interval
+        # abspath -> (stat signature, last stat time, compiled policy)
+        self._entries: Dict[str, Tuple[Tuple[int, int], float, CompiledPolicy]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, path: str | os.PathLike) -> CompiledPolicy:
+        key = os.path.abspath(path)
+        now = time.monotonic()
+        hit = self._entries.get(key)
+        if hit is not None and now - hit[1] < self.check_interval:
+            return hit[2]
+
+        st = os.stat(key)
+        sig = (st.st_mtime_ns, st.st_size)
+        with self._lock:
+            hit = self._entries.get(key)
+            if hit is not None and hit[0] == sig:
+                self._entries[key] = (sig, now, hit[2])
+                return hit[2]
+            with open(key, "r", encoding="utf-8") as f:
+                compiled = CompiledPolicy.compile(json.load(f))
+            self._entries[key] = (sig, now, compiled)
+            return compiled
+
+
+_store = PolicyStore()
+
+
+def load_policy(path: str | os.PathLike) -> CompiledPolicy:
+    """Process-wide compiled policy for a policy file."""
+    return _store.get(path)
+
+
+def decide(trust_state: Dict[str, Any], policy: Dict[str, Any] | CompiledPolicy) -> Dict[str, Any]:
+    if not isinstance(policy, CompiledPolicy):
+        policy = CompiledPolicy.compile(policy)
+    return policy.decide(trust_state)
@@ -0,0 +1,58 @@
+from __future__ import annotations
+
+import json
+import os
+import threading
+import time
+from typing import Dict, Tuple
+
+from jsonschema import Draft202012Validator
+
+
+class SchemaRegistry:
+    """
+    Loads, checks (check_schema) and compiles each schema file once per
+    process and hands out the same validator on every call.
+
+    A schema file is re-stat'ed at most every `check_interval` seconds and
+    recompiled when its mtime or size changed.
+    """
+
+    def __init__(self, check_interval: float = 1.0):
+        self.check_interval = check_interval
+        # abspath -> (stat signature, last stat time, validator)
+        self._entries: Dict[str, Tuple[Tuple[int, int], float, Draft202012Validator]] = {}
+        self._lock = threading.Lock()
+
+    def validator(self, schema_path: str | os.PathLike) -> Draft202012Validator:
+        key = os.path.abspath(schema_path)
+        now = time.monotonic()
+        hit = self._entries.get(key)
+        if hit is not None and now - hit[1] < self.check_interval:
+            return hit[2]
+
+        st = os.stat(key)
+        sig = (st.st_mtime_ns, st.st_size)
+        with self._lock:
+            hit = self._entries.get(key)
+            if hit is not None and hit[0] == sig:
+                self._entries[key] = (sig, now, hit[2])
+                return hit[2]
+            with open(key, "r", encoding="utf-8") as f:
+                schema = json.load(f)
+            Draft202012Validator.check_schema(schema)
+            v = Draft202012Validator(schema)
+            self._entries[key] = (sig, now, v)
+            return v
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+_registry = SchemaRegistry()
+
+
+def get_validator(schema_path: str | os.PathLike) -> Draft202012Validator:
+    """Process-wide compiled validator for a schema file."""
+    return _registry.validator(schema_path)
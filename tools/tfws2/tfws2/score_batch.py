@@ -0,0 +1,59 @@
+from __future__ import annotations
+
+import json
+import sys
+from typing import IO, Iterable, Iterator, List
+
+
+def read_domains(stream: IO[str]) -> Iterator[str]:
+    """One domain per line; blank lines and '#' comments are skipped."""
+    for line in stream:
+        d = line.split("#", 1)[0].strip()
+        if d:
+            yield d
+
+
+def _chunks(domains: Iterable[str], size: int) -> Iterator[List[str]]:
+    chunk: List[str] = []
+    for d in domains:
+        chunk.append(d)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def score_batch(
+    api_base: str,
+    domains: Iterable[str],
+    out: IO[str] = sys.stdout,
+    chunk_size: int = 5000,
+    concurrency: int = 64,
+    per_host: int = 4,
+    timeout: float = 600.0,
+) -> dict:
+    """
+    Send domains to POST /api/v1/trust/batch in chunks and copy the streamed
+    NDJSON results to `out` as they arrive. Returns {"ok": n, "error": n}.
+    """
+    try:
+        import httpx
+    except ImportError:
+        raise ImportError("score-batch requires httpx (pip install 'tfws2[http]')")
+
+    url = api_base.rstrip("/") + "/api/v1/trust/batch"
+    counts = {"ok": 0, "error": 0}
+    with httpx.Client(timeout=httpx.Timeout(timeout, connect=10.0)) as client:
+        for chunk in _chunks(domains, chunk_size):
+            body = {"domains": chunk, "concurrency": concurrency, "per_host": per_host}
+            with client.stream("POST", url, json=body) as r:
+                r.raise_for_status()
+                for line in r.iter_lines():
+                    if not line:
+                        continue
+                    status = json.loads(line).get("status")
+                    counts["ok" if status == "ok" else "error"] += 1
+                    out.write(line + "\n")
+                out.flush()
+    return counts
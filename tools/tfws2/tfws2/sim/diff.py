@@ -0,0 +1,155 @@
+from __future__ import annotations
+
+import json
+from dataclasses import asdict, dataclass, field, fields
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from ..inventory import join_many, sorted_entries
+
+
+@dataclass
+class ScoringPolicy:
+    """
+    Points added per indicator; the total is mapped to a decision.
+    Defaults reproduce the original simulate-rollback scoring.
+    """
+
+    shrink: int = 2              # candidate lists fewer files than current
+    removed: int = 2             # any current file missing from candidate
+    changed: int = 1             # more than max(changed_min, cur // changed_divisor) files changed
+    changed_min: int = 3
+    changed_divisor: int = 20
+    added: int = 0               # any file not in current
+    reverted: int = 2            # a changed file's candidate hash appears in a historic inventory
+    replay: int = 3              # candidate is identical to a historic inventory
+    suspect_at: int = 3
+    possible_at: int = 1
+
+    @classmethod
+    def from_file(cls, path: str) -> "ScoringPolicy":
+        data = json.loads(Path(path).read_text(encoding="utf-8"))
+        known = {f.name for f in fields(cls)}
+        unknown = sorted(set(data) - known)
+        if unknown:
+            raise ValueError(f"unknown scoring policy keys: {', '.join(unknown)}")
+        return cls(**data)
+
+
+@dataclass
+class PathSet:
+    count: int = 0
+    paths: List[str] = field(default_factory=list)
+
+    def add(self, path: str, limit: Optional[int]) -> None:
+        self.count += 1
+        if limit is None or len(self.paths) < limit:
+            self.paths.append(path)
+
+
+@dataclass
+class DiffReport:
+    current: str
+    candidate: str
+    history: List[str]
+    current_count: int = 0
+    candidate_count: int = 0
+    added: PathSet = field(default_factory=PathSet)
+    removed: PathSet = field(default_factory=PathSet)
+    changed: PathSet = field(default_factory=PathSet)
+    reverted: PathSet = field(default_factory=PathSet)
+    replay_of: Optional[str] = None
+    decision: str = "OK"
+    score: int = 0
+    reasons: List[str] = field(default_factory=list)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+    def summary(self, mode: str) -> str:
+        s = (
+            f"{self.decision} mode={mode} cur={self.current_count} cand={self.candidate_count} "
+            f"missing={self.removed.count} changed={self.changed.count}"
+        )
+        if self.history:
+            s += f" reverted={self.reverted.count} replay_of={self.replay_of or '-'}"
+        return s
+
+
+def diff_inventories(
+    current_path: str,
+    candidate_path: str,
+    history: Optional[List[str]] = None,
+    max_paths: Optional[int] = None,
+) -> DiffReport:
+    """
+    Compare candidate against current (and optionally older releases) in a
+    single merge pass over path-sorted streams. Extra memory is constant for
+    sorted inputs, apart from up to `max_paths` example paths per category.
+    """
+    history = list(history or [])
+    report = DiffReport(current=current_path, candidate=candidate_path, history=history)
+    streams = [sorted_entries(current_path), sorted_entries(candidate_path)] + [sorted_entries(h) for h in history]
+    # history[i] stays a replay candidate until any path differs from the candidate
+    same_as_history = [True] * len(history)
+
+    for path, row in join_many(streams):
+        cur, cand, old = row[0], row[1], row[2:]
+        if cur is not None:
+            report.current_count += 1
+        if cand is not None:
+            report.candidate_count += 1
+
+        if cur is None and cand is not None:
+            report.added.add(path, max_paths)
+        elif cur is not None and cand is None:
+            report.removed.add(path, max_paths)
+        elif cur != cand:
+            report.changed.add(path, max_paths)
+            if cand in old:
+                report.reverted.add(path, max_paths)
+
+        for i, h in enumerate(old):
+            if h != cand:
+                same_as_history[i] = False
+
+    for i, same in enumerate(same_as_history):
+        if same and (report.changed.count or report.added.count or report.removed.count):
+            report.replay_of = history[i]
+            break
+    return report
+
+
+def score_diff(report: DiffReport, policy: Optional[ScoringPolicy] = None) -> DiffReport:
+    policy = policy or ScoringPolicy()
+    reasons = []
+    score = 0
+
+    def hit(name: str, points: int) -> None:
+        nonlocal score
+        if points:
+            score += points
+            reasons.append(name)
+
+    if report.candidate_count < report.current_count:
+        hit("shrink", policy.shrink)
+    if report.removed.count > 0:
+        hit("removed", policy.removed)
+    if report.changed.count > max(policy.changed_min, report.current_count // policy.changed_divisor):
+        hit("changed", policy.changed)
+    if report.added.count > 0:
+        hit("added", policy.added)
+    if report.reverted.count > 0:
+        hit("reverted", policy.reverted)
+    if report.replay_of is not None:
+        hit("replay", policy.replay)
+
+    if score >= policy.suspect_at:
+        report.decision = "ROLLBACK_SUSPECT"
+    elif score >= policy.possible_at:
+        report.decision = "ROLLBACK_POSSIBLE"
+    else:
+        report.decision = "OK"
+    report.score = score
+    report.reasons = reasons
+    return report
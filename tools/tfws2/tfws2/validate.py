@@ -1,14 +1,188 @@
+import glob
 import json
-from jsonschema import Draft202012Validator
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from jsonschema.exceptions import SchemaError
+
+from .schemas import get_validator
 
 def validate_json(schema_path: str, json_path: str) -> None:
-    with open(schema_path, "r", encoding="utf-8") as f:
-        schema = json.load(f)
     with open(json_path, "r", encoding="utf-8") as f:
         data = json.load(f)
 
-    v = Draft202012Validator(schema)
+    v = get_validator(schema_path)
     errors = sorted(v.iter_errors(data), key=lambda e: e.path)
     if errors:
         msg = "\n".join([f"- {list(e.path)}: {e.message}" for e in errors[:50]])
         raise SystemExit(f"Validation failed:\n{msg}")
+
+
+# (schema_version, document type) -> schema file name inside the schemas dir
+SCHEMA_FILES = {
+    ("2.0", "trust-state"): "trust-state.schema.json",
+    ("2.0", "incident"): "incident.schema.json",
+    ("2.0", "key-history"): "key-history.schema.json",
+}
+
+CHUNK_DOCS = 256
+
+
+def detect_type(doc: Any) -> Optional[str]:
+    """Document type from an explicit `type` field, else from its required keys."""
+    if not isinstance(doc, dict):
+        return None
+    t = doc.get("type")
+    if isinstance(t, str) and any(t == name for _, name in SCHEMA_FILES):
+        return t
+    if "signals" in doc or "subject" in doc:
+        return "trust-state"
+    if "keys" in doc:
+        return "key-history"
+    if "opened_at" in doc or "impact" in doc:
+        return "incident"
+    return None
+
+
+def _check(source: str, text: str, schemas_dir: str, forced_schema: Optional[str]) -> Dict[str, Any]:
+    try:
+        doc = json.loads(text)
+    except ValueError as e:
+        return {"source": source, "schema": None, "ok": False, "errors": [f"invalid JSON: {e}"]}
+
+    if forced_schema:
+        schema_path, name = forced_schema, os.path.basename(forced_schema)
+    else:
+        name = detect_type(doc)
+        version = doc.get("schema_version") if isinstance(doc, dict) else None
+        fname = SCHEMA_FILES.get((version, name))
+        if fname is None:
+            return {"source": source, "schema": None, "ok": False,
+                    "errors": [f"no schema for schema_version={version!r} type={name!r}"]}
+        schema_path = os.path.join(schemas_dir, fname)
+
+    try:
+        v = get_validator(schema_path)
+    except (OSError, ValueError, SchemaError) as e:
+        # one document naming a missing or broken schema must not end the run
+        reason = e.message if isinstance(e, SchemaError) else e
+        return {"source": source, "schema": name, "ok": False, "errors": [f"schema {schema_path}: {reason}"]}
+    errors = sorted(v.iter_errors(doc), key=lambda e: list(e.path))
+    return {"source": source, "schema": name, "ok": not errors,
+            "errors": [f"{list(e.path)}: {e.message}" for e in errors[:50]]}
+
+
+def _run_chunk(task: Tuple) -> List[Dict[str, Any]]:
+    """Worker entry point. Validators are compiled once per worker process."""
+    kind, items, schemas_dir, forced_schema = task
+    out = []
+    for source, payload in items:
+        if kind == "files":
+            try:
+                with open(payload, "r", encoding="utf-8") as f:
+                    payload = f.read()
+            except OSError as e:
+                out.append({"source": source, "schema": None, "ok": False, "errors": [str(e)]})
+                continue
+        out.append(_check(source, payload, schemas_dir, forced_schema))
+    return out
+
+
+def _expand(inputs: Iterable[str]) -> Iterator[str]:
+    for item in inputs:
+        if item == "-":
+            yield item
+        elif os.path.isdir(item):
+            for dirpath, _, names in os.walk(item):
+                for n in sorted(names):
+                    if n.endswith((".json", ".ndjson", ".jsonl")):
+                        yield os.path.join(dirpath, n)
+        else:
+            yield from sorted(glob.glob(item, recursive=True)) or [item]
+
+
+def _ndjson_docs(f, name: str) -> Iterator[Tuple[str, str]]:
+    for i, line in enumerate(f, 1):
+        if line.strip():
+            yield f"{name}:{i}", line
+
+
+def _tasks(inputs: Iterable[str], schemas_dir: str, forced_schema: Optional[str]) -> Iterator[Tuple]:
+    files: List[Tuple[str, str]] = []
+    for path in _expand(inputs):
+        if path == "-" or path.endswith((".ndjson", ".jsonl")):
+            if files:
+                yield "files", files, schemas_dir, forced_schema
+                files = []
+            f = sys.stdin if path == "-" else open(path, "r", encoding="utf-8")
+            try:
+                lines: List[Tuple[str, str]] = []
+                for doc in _ndjson_docs(f, "stdin" if path == "-" else path):
+                    lines.append(doc)
+                    if len(lines) >= CHUNK_DOCS:
+                        yield "lines", lines, schemas_dir, forced_schema
+                        lines = []
+                if lines:
+                    yield "lines", lines, schemas_dir, forced_schema
+            finally:
+                if f is not sys.stdin:
+                    f.close()
+        else:
+            files.append((path, path))
+            if len(files) >= CHUNK_DOCS:
+                yield "files", files, schemas_dir, forced_schema
+                files = []
+    if files:
+        yield "files", files, schemas_dir, forced_schema
+
+
+def _bounded_map(pool: ProcessPoolExecutor, fn, tasks: Iterable, window: int) -> Iterator:
+    """Like pool.map, but keeps at most `window` tasks in flight (stdin may be endless)."""
+    pending = []
+    for t in tasks:
+        pending.append(pool.submit(fn, t))
+        if len(pending) >= window:
+            yield pending.pop(0).result()
+    for fut in pending:
+        yield fut.result()
+
+
+def bulk_validate(
+    inputs: Iterable[str],
+    schemas_dir: str = "schemas",
+    schema: Optional[str] = None,
+    jobs: Optional[int] = None,
+) -> Iterator[Dict[str, Any]]:
+    """
+    Validate documents from files, directories, globs, NDJSON files or "-"
+    (NDJSON on stdin). Each document is matched to a schema in `schemas_dir`
+    by schema_version and type unless `schema` forces one. Yields one
+    result per document, in input order.
+    """
+    tasks = _tasks(inputs, schemas_dir, schema)
+    jobs = jobs or os.cpu_count() or 1
+    if jobs == 1:
+        for t in tasks:
+            yield from _run_chunk(t)
+        return
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        for results in _bounded_map(pool, _run_chunk, tasks, window=4 * jobs):
+            yield from results
+
+
+def run_bulk(inputs, schemas_dir="schemas", schema=None, jobs=None, quiet=False, out=sys.stdout) -> Dict[str, Any]:
+    """Stream results as NDJSON to `out` and return a summary with docs/sec."""
+    t0 = time.perf_counter()
+    total = failed = 0
+    for r in bulk_validate(inputs, schemas_dir=schemas_dir, schema=schema, jobs=jobs):
+        total += 1
+        if not r["ok"]:
+            failed += 1
+        if not quiet or not r["ok"]:
+            out.write(json.dumps(r, ensure_ascii=False) + "\n")
+    seconds = time.perf_counter() - t0
+    return {"documents": total, "ok": total - failed, "failed": failed, "seconds": round(seconds, 3),
+            "docs_per_sec": round(total / seconds, 1) if seconds else 0.0}
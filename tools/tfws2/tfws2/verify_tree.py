@@ -0,0 +1,126 @@
+from __future__ import annotations
+
+import fnmatch
+import os
+import shutil
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass, field
+from typing import Any, Dict, Iterable, List, Optional
+
+from .hashwalk import _batched, _sha256_file, _walk
+from .inventory import ExternalSorter, join_sorted, sorted_entries
+from .inventory_verify import pick_signature_for_inventory
+from .minisign_verify import verify_minisign_detached
+
+
+@dataclass
+class TreeReport:
+    signature_ok: bool
+    signature_info: str
+    sig: Optional[str] = None
+    checked: int = 0
+    mismatched: List[str] = field(default_factory=list)
+    missing: List[str] = field(default_factory=list)
+    extra: List[str] = field(default_factory=list)
+    stopped_early: bool = False
+
+    @property
+    def tampered(self) -> bool:
+        return bool(self.mismatched or self.missing or self.extra)
+
+    @property
+    def ok(self) -> bool:
+        return self.signature_ok and not self.tampered and not self.stopped_early
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"ok": self.ok, **asdict(self)}
+
+
+def _hash_or_none(path: str) -> Optional[str]:
+    try:
+        return _sha256_file(path)
+    except FileNotFoundError:
+        return None
+
+
+def _rel_inside(path: str, root: str) -> Optional[str]:
+    rel = os.path.relpath(os.path.abspath(path), os.path.abspath(root)).replace("\\", "/")
+    return None if rel.startswith("../") else rel
+
+
+def verify_tree(
+    pubkey_path: str,
+    inventory_path: str,
+    root: str | None = None,
+    sigdir: str | None = None,
+    jobs: int | None = None,
+    fail_fast: bool = False,
+    ignore: Iterable[str] = (),
+    backend: str = "native",
+) -> TreeReport:
+    """
+    Verify the inventory signature once, then re-hash every listed file
+    under `root` (default: the inventory's directory) on a thread pool.
+
+    Reports files whose hash differs (mismatched), listed files that are
+    absent (missing) and unlisted files (extra; `ignore` globs exempt
+    paths). The inventory and its signature are never counted as extra.
+    With fail_fast, stops after the first (small) batch containing a
+    tampered file.
+
+    The inventory is copied once to a private temporary file, and both the
+    signature check and the listing read that copy, so a file replaced
+    after it was verified is never trusted.
+    """
+    root = root if root is not None else (os.path.dirname(inventory_path) or ".")
+    try:
+        sig = str(pick_signature_for_inventory(inventory_path, sigdir=sigdir))
+    except FileNotFoundError as e:
+        return TreeReport(False, str(e))
+
+    with tempfile.TemporaryDirectory(prefix="tfws2-verify-") as tmp:
+        inventory = os.path.join(tmp, os.path.basename(inventory_path))  # the name selects the format
+        try:
+            shutil.copyfile(inventory_path, inventory)
+        except FileNotFoundError:
+            return TreeReport(False, "message_not_found", sig)
+        ok, info = verify_minisign_detached(pubkey_path, inventory, sig, backend=backend)
+        report = TreeReport(ok, info, sig)
+        if ok:
+            _compare_tree(report, inventory, root, {_rel_inside(inventory_path, root), _rel_inside(sig, root)},
+                          list(ignore), jobs or os.cpu_count() or 1, fail_fast)
+    return report
+
+
+def _compare_tree(report: TreeReport, inventory: str, root: str, skip: set, patterns: List[str],
+                  workers: int, fail_fast: bool) -> None:
+    batch_size = 4 * workers if fail_fast else 512
+
+    with ExternalSorter() as present, ThreadPoolExecutor(max_workers=workers) as pool:
+        for rel, _ in _walk(root):
+            if rel not in skip:
+                present.add(rel, "")
+
+        for batch in _batched(join_sorted(sorted_entries(inventory), present), batch_size):
+            to_hash = []
+            for path, listed, here in batch:
+                if listed is None:
+                    if not any(fnmatch.fnmatch(path, pat) for pat in patterns):
+                        report.extra.append(path)
+                elif here is None:
+                    report.missing.append(path)
+                else:
+                    to_hash.append((path, listed))
+
+            digests = pool.map(_hash_or_none, [os.path.join(root, p) for p, _ in to_hash])
+            for (path, listed), digest in zip(to_hash, digests):
+                report.checked += 1
+                if digest is None:
+                    report.missing.append(path)
+                elif digest != listed.lower():
+                    report.mismatched.append(path)
+
+            if fail_fast and report.tampered:
+                report.stopped_early = True
+                break